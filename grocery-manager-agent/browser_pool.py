@@ -0,0 +1,278 @@
+"""A pool of isolated browser sessions for processing grocery items in parallel.
+
+Each session is its own Portia instance with its own browser tools, running its own local Chrome with its own
+profile directory and remote-debugging port. The user logs in to the store once, on the primary session, and every other session starts from a
+copy of that profile, so they all share the logged-in cookies without sharing a browser. The primary browser is
+shut down before the copy, so its cookies are on disk.
+
+Browser tasks go through a per-site rate limiter, so parallel sessions don't hammer the store. The plans'
+add-to-cart steps use the cart browser tool, and stores that don't cope with concurrent cart updates have its
+tasks run one at a time.
+"""
+
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List
+from urllib.parse import urlparse
+
+from browser_use import Browser, BrowserConfig
+from portia import Config, ExecutionHooks, Portia, Tool, ToolRegistry, ToolRunContext
+from portia.cli_clarification_handler import CLIClarificationHandler
+from portia.open_source_tools.browser_tool import (
+    BrowserInfrastructureProviderLocal,
+    BrowserTool,
+)
+
+DEFAULT_PROFILE_DIR = ".portia/browser_profiles"
+# Chrome's lock files and caches aren't needed (or safe) in a copied profile.
+PROFILE_COPY_IGNORE = shutil.ignore_patterns("Singleton*", "Cache", "Code Cache", "GPUCache")
+# Chrome keeps this symlink ("<host>-<pid>") in its profile directory while it is running.
+PROFILE_LOCK = "SingletonLock"
+BROWSER_EXIT_TIMEOUT_SECONDS = 10.0
+BROWSER_START_TIMEOUT_SECONDS = 20.0
+CART_BROWSER_TOOL_ID = "cart_browser_tool"
+
+
+@dataclass
+class SiteLimits:
+    """How hard the browser sessions may use a site."""
+
+    min_interval: float = 1.0  # Seconds between the starts of two browser tasks on the site
+    serialise_cart: bool = False  # Whether only one session at a time may change the cart
+
+
+SITE_LIMITS: Dict[str, SiteLimits] = {
+    "groceries.morrisons.com": SiteLimits(min_interval=2.0, serialise_cart=True),
+}
+DEFAULT_SITE_LIMITS = SiteLimits()
+
+
+class SiteRateLimiter:
+    """Spaces out browser tasks on each site and serialises cart changes where the site requires it."""
+
+    def __init__(self, limits: Dict[str, SiteLimits] = SITE_LIMITS):
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._next_start: Dict[str, float] = {}
+        self._cart_locks: Dict[str, threading.Lock] = {}
+
+    def _limits(self, host: str) -> SiteLimits:
+        return self.limits.get(host.removeprefix("www."), DEFAULT_SITE_LIMITS)
+
+    def wait(self, host: str) -> None:
+        """Block until the site's next task slot."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            # Reserve the slot before sleeping, so waiting sessions queue up behind each other.
+            self._next_start[host] = start + self._limits(host).min_interval
+            self._cart_locks.setdefault(host, threading.Lock())
+        time.sleep(start - now)
+
+    @contextmanager
+    def task(self, host: str, changes_cart: bool) -> Iterator[None]:
+        """Run a browser task on the site within its limits."""
+        self.wait(host)
+        if changes_cart and self._limits(host).serialise_cart:
+            with self._cart_locks[host]:
+                yield
+        else:
+            yield
+
+
+site_rate_limiter = SiteRateLimiter()
+
+
+class RateLimitedBrowserTool(BrowserTool):
+    """A BrowserTool whose tasks go through the site rate limiter."""
+
+    changes_cart: bool = False
+
+    def run(self, ctx: ToolRunContext, url: str, task: str, **kwargs: Any) -> Any:
+        host = urlparse(url).netloc
+        with site_rate_limiter.task(host, changes_cart=self.changes_cart):
+            return super().run(ctx, url, task, **kwargs)
+
+
+def cart_browser_tool(**kwargs: Any) -> RateLimitedBrowserTool:
+    """The browser tool for the plan steps that change the cart, which are serialised on stores that need it."""
+    return RateLimitedBrowserTool(
+        id=CART_BROWSER_TOOL_ID,
+        name="Cart Browser Tool",
+        description="Adds products to, or removes them from, the cart on a grocery store website. "
+        + BrowserTool.model_fields["description"].default,
+        changes_cart=True,
+        **kwargs,
+    )
+
+
+def free_port() -> int:
+    """A local TCP port that nothing is listening on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SessionBrowserProvider(BrowserInfrastructureProviderLocal):
+    """Runs a session's own Chrome, on the session's profile and its own remote-debugging port.
+
+    With a local Chrome, browser_use always launches it on port 9222, and connects to whatever browser is already
+    listening there, so every session would end up driving the same Chrome. This provider starts the session's
+    Chrome itself, on a port of its own, and hands browser_use that browser's CDP URL instead.
+    """
+
+    def __init__(self, user_data_dir: str):
+        super().__init__(extra_chromium_args=[f"--user-data-dir={user_data_dir}"])
+        self.user_data_dir = user_data_dir
+        self.port = free_port()
+        self._lock = threading.Lock()
+
+    @property
+    def cdp_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def is_running(self) -> bool:
+        try:
+            with urllib.request.urlopen(f"{self.cdp_url}/json/version", timeout=2):
+                return True
+        except OSError:
+            return False
+
+    def start_browser(self) -> None:
+        """Start the session's Chrome, unless it is already running (it stays up between browser tasks)."""
+        with self._lock:
+            if self.is_running():
+                return
+            subprocess.Popen(
+                [self.chrome_path, f"--remote-debugging-port={self.port}", *self.extra_chromium_args],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            deadline = time.monotonic() + BROWSER_START_TIMEOUT_SECONDS
+            while not self.is_running():
+                if time.monotonic() >= deadline:
+                    # Chrome hands over to, and exits for, a browser that already has the profile open.
+                    raise RuntimeError(
+                        f"Chrome didn't start on port {self.port}. "
+                        f"Close any browser using {self.user_data_dir} and try again"
+                    )
+                time.sleep(0.2)
+
+    def setup_browser(self, ctx: ToolRunContext) -> Browser:
+        self.start_browser()
+        return Browser(config=BrowserConfig(cdp_url=self.cdp_url))
+
+
+def release_profile(user_data_dir: str, timeout: float = BROWSER_EXIT_TIMEOUT_SECONDS) -> None:
+    """Make sure no Chrome is using the profile, so everything it holds in memory, like cookies, is on disk.
+
+    Chrome only writes all of its cookies when it shuts down. A browser that hasn't exited by the timeout is
+    sent SIGTERM, which shuts it down cleanly.
+    """
+    lock = os.path.join(user_data_dir, PROFILE_LOCK)
+    deadline = time.monotonic() + timeout
+    terminated = False
+    while os.path.lexists(lock):
+        if time.monotonic() >= deadline:
+            if terminated:
+                raise RuntimeError(f"Chrome is still using the browser profile {user_data_dir}")
+            try:
+                pid = int(os.readlink(lock).rsplit("-", 1)[-1])
+            except (OSError, ValueError):
+                raise RuntimeError(f"Close the browser using {user_data_dir} and try again")
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                # Left behind by a Chrome that crashed
+                os.remove(lock)
+            terminated = True
+            deadline = time.monotonic() + timeout
+        time.sleep(0.2)
+
+
+class SerialCLIClarificationHandler(CLIClarificationHandler):
+    """Asks the user one clarification at a time, however many sessions are waiting on them."""
+
+    _lock = threading.Lock()
+
+    def handle(self, clarification, on_resolution, on_error) -> None:
+        with self._lock:
+            super().handle(clarification, on_resolution, on_error)
+
+
+class BrowserSessionPool:
+    """A primary browser session for logging in, and a pool of sessions copied from it for parallel work."""
+
+    def __init__(
+        self,
+        config: Config,
+        execution_hooks: ExecutionHooks,
+        tools: List[Tool],
+        width: int,
+        profile_dir: str = DEFAULT_PROFILE_DIR,
+    ):
+        """Initialize the pool.
+
+        Args:
+            config: The Portia config shared by every session
+            execution_hooks: The execution hooks shared by every session
+            tools: The tools each session has besides its browser tool
+            width: The number of sessions that can process items at once
+            profile_dir: Where the sessions' Chrome profiles are kept
+        """
+        self.config = config
+        self.execution_hooks = execution_hooks
+        self.tools = tools
+        self.width = width
+        self.profile_dir = profile_dir
+        self.primary = self._session(self._profile("primary"))
+        self.started = False
+        self._idle: queue.Queue[Portia] = queue.Queue()
+
+    def _profile(self, name: str) -> str:
+        return os.path.abspath(os.path.join(self.profile_dir, name))
+
+    def _session(self, user_data_dir: str) -> Portia:
+        # Both browser tools drive the session's own Chrome, one task at a time.
+        provider = SessionBrowserProvider(user_data_dir)
+        browser_tools = [
+            make_tool(custom_infrastructure_provider=provider)
+            for make_tool in (RateLimitedBrowserTool, cart_browser_tool)
+        ]
+        return Portia(
+            config=self.config,
+            execution_hooks=self.execution_hooks,
+            tools=ToolRegistry([*browser_tools, *self.tools]),
+        )
+
+    def start(self) -> None:
+        """Create the parallel sessions from the primary session's logged-in profile."""
+        primary_profile = self._profile("primary")
+        if os.path.isdir(primary_profile):
+            release_profile(primary_profile)
+        for i in range(self.width):
+            profile = self._profile(f"session-{i}")
+            shutil.rmtree(profile, ignore_errors=True)
+            if os.path.isdir(primary_profile):
+                shutil.copytree(primary_profile, profile, ignore=PROFILE_COPY_IGNORE)
+            self._idle.put(self._session(profile))
+        self.started = True
+        print(f"🧭 Started {self.width} browser sessions")
+
+    @contextmanager
+    def session(self) -> Iterator[Portia]:
+        """Borrow an idle session, waiting for one if they're all busy."""
+        portia = self._idle.get()
+        try:
+            yield portia
+        finally:
+            self._idle.put(portia)
@@ -1,7 +1,21 @@
-from typing import Dict
+from typing import Dict, List, Tuple
 import json
+import re
 from pydantic import BaseModel, Field
-from portia import Tool, ToolRunContext, MultipleChoiceClarification
+from portia import Tool, ToolRunContext, InputClarification, MultipleChoiceClarification
+
+SKIP_CHOICES = {"0", "s", "skip"}
+
+
+def product_options(products: List[Dict[str, str]]) -> List[str]:
+    """Format up to five products with a name and price as "Name - £X.XX" options."""
+    options = []
+    for product in products[:5]:
+        name = product.get("name", "")
+        price = product.get("price", "")
+        if name and price:
+            options.append(f"{name} - {price}")
+    return options
 
 
 class GroceryAlternativesToolSchema(BaseModel):
@@ -89,14 +103,8 @@ class GroceryAlternativesTool(Tool[Dict[str, str]]):
             print(f"Failed to parse grocery items: {e}")
             return {"product": ""}
 
-        options = []
         print(f"🔍 Products: {products}")
-        for product in products[:5]:
-            name = product.get("name", "")
-            price = product.get("price", "")
-            print(f"🔍 Product: {name} - {price}")
-            if name and price:
-                options.append(f"{name} - {price}")
+        options = product_options(products)
         print(f"🔍 Options: {options}")
 
         if not options:
@@ -116,3 +124,133 @@ class GroceryAlternativesTool(Tool[Dict[str, str]]):
         )
         print("🔍 Creating clarification")
         return clarification
+
+
+class BatchGroceryAlternativesToolSchema(BaseModel):
+    """Schema defining the inputs for the BatchGroceryAlternativesTool.
+
+    This schema expects a JSON string containing the search results for several grocery
+    items, and handles the user's choices for all of the unavailable ones at once."""
+
+    options: str = Field(
+        ...,
+        description="JSON string containing a list of search results, one per grocery item, each in format: {'grocery_items': [...], 'alternative': bool, 'original_search_query': str}",
+    )
+    choices: str | None = Field(
+        None,
+        description="User's choices for the unavailable items, one number per item separated by commas",
+    )
+
+
+class BatchGroceryAlternativesTool(Tool[Dict[str, str]]):
+    """A tool for choosing alternatives for several unavailable grocery items with one question.
+
+    The tool expects a list of search results, each in the format the GroceryAlternativesTool
+    expects. Items whose products are available get their first product. The alternatives for
+    all of the unavailable items are presented together in a single InputClarification, and
+    the user answers with one choice per item, so they only have to wait once however many
+    items are unavailable.
+
+    The chosen products are keyed by the position of the item's search results in the list
+    ("0", "1", ...), so items with the same search query are kept apart.
+    """
+
+    id: str = "batch_alternatives"
+    name: str = "Batch Product Alternatives Tool"
+    description: str = "Used to display the alternatives for several unavailable items to the human user at once and retrieve their preferred choices."
+    args_schema: type[BaseModel] = BatchGroceryAlternativesToolSchema
+    output_schema: tuple[str, str] = (
+        json.dumps(
+            {
+                "type": "object",
+                "additionalProperties": {"type": "string"},
+            }
+        ),
+        "Returns the chosen product for each item by its position in the list, or an empty string for skipped items",
+    )
+
+    def run(
+        self, ctx: ToolRunContext, options: str, choices: str | None = None
+    ) -> Dict[str, str] | InputClarification:
+        """Handle the alternatives for several items through one user clarification.
+
+        Args:
+            ctx: The tool run context from Portia
+            options: JSON string containing the list of search results
+            choices: Optional user's selections from a previous clarification
+
+        Returns:
+            If every item is resolved: Dict mapping each item's position in the list to its
+            chosen product name (an empty string if skipped)
+            Otherwise: InputClarification to get the user's selections"""
+
+        try:
+            searches = json.loads(options)
+        except (json.JSONDecodeError, TypeError) as e:
+            print(f"Failed to parse grocery items: {e}")
+            return {}
+        if not isinstance(searches, list) or not all(isinstance(search, dict) for search in searches):
+            print(f"Expected a list of search results, got: {options}")
+            return {}
+
+        chosen: Dict[str, str] = {}
+        # The position, name and product options of each item that needs the user's choice
+        pending: List[Tuple[str, str, List[str]]] = []
+        for position, search in enumerate(searches):
+            key = str(position)
+            item = search.get("original_search_query", "")
+            products = search.get("grocery_items")
+            if not isinstance(products, list):
+                products = []
+            products = [product for product in products if isinstance(product, dict)]
+            if not search.get("alternative"):
+                chosen[key] = products[0].get("name", "") if products else ""
+                continue
+            item_options = product_options(products)
+            if item_options:
+                pending.append((key, item, item_options))
+            else:
+                chosen[key] = ""
+
+        if not pending:
+            return chosen
+
+        if choices:
+            selected = self.parse_choices(choices, pending)
+            if selected is not None:
+                chosen.update(selected)
+                print(f"User chose: {selected}")
+                return chosen
+
+        lines = [
+            f"{'Sorry, I could not read those choices. ' if choices else ''}"
+            "These items aren't available. Choose an alternative for each one by "
+            "number, or 0 to skip it, separated by commas (e.g. 1, 0, 2):"
+        ]
+        for number, (_, item, item_options) in enumerate(pending, start=1):
+            lines.append(f"\n{number}. {item}")
+            lines += [f"   {i}) {option}" for i, option in enumerate(item_options, start=1)]
+        print("🔍 Creating batch clarification")
+        return InputClarification(
+            user_guidance="\n".join(lines),
+            argument_name="choices",
+            plan_run_id=str(ctx.plan_run.id),
+        )
+
+    @staticmethod
+    def parse_choices(
+        choices: str, pending: List[Tuple[str, str, List[str]]]
+    ) -> Dict[str, str] | None:
+        """Map the user's answer to a product per item position, or None if it can't be read."""
+        answers = [answer for answer in re.split(r"[,\s]+", choices.strip().lower()) if answer]
+        if len(answers) != len(pending):
+            return None
+        selected = {}
+        for answer, (key, _, item_options) in zip(answers, pending):
+            if answer in SKIP_CHOICES:
+                selected[key] = ""
+            elif answer.isdigit() and 1 <= int(answer) <= len(item_options):
+                selected[key] = item_options[int(answer) - 1].split(" - ")[0]
+            else:
+                return None
+        return selected
@@ -1,3 +1,4 @@
+import argparse
 from typing import Tuple
 from portia import (
     Portia,
@@ -8,9 +9,11 @@ from portia.open_source_tools.browser_tool import (
     BrowserTool,
     BrowserInfrastructureOption,
 )
-from grocery_tool import GroceryAlternativesTool
+from browser_pool import BrowserSessionPool, SerialCLIClarificationHandler, cart_browser_tool
+from grocery_tool import BatchGroceryAlternativesTool, GroceryAlternativesTool
 from shopping_agent import ShoppingAgent
 from notes_agent import NotesAgent
+from product_cache import DEFAULT_TTL_HOURS, product_cache
 from portia.cli import CLIExecutionHooks
 
 
@@ -34,13 +37,48 @@ def get_user_preferences() -> Tuple[str, str]:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of grocery items to process at once, each in its own browser session.",
+    )
+    parser.add_argument(
+        "--measure-planning",
+        action="store_true",
+        help="Report the planner calls and time saved by reusing the shopping plan for every item.",
+    )
+    parser.add_argument(
+        "--product-ttl-hours",
+        type=float,
+        default=DEFAULT_TTL_HOURS,
+        help="How long products found for an item are reused before searching for it again.",
+    )
+    parser.add_argument(
+        "--batch-alternatives",
+        action="store_true",
+        help="Search for every item first, then choose alternatives for all unavailable items at once.",
+    )
+    args = parser.parse_args()
+    product_cache.ttl_seconds = args.product_ttl_hours * 60 * 60
+
     browser_tool = BrowserTool(infrastructure_option=BrowserInfrastructureOption.LOCAL)
+    # The shopping plans add products to the cart with their own browser tool
+    cart_tool = cart_browser_tool(infrastructure_option=BrowserInfrastructureOption.LOCAL)
     alternatives_tool = GroceryAlternativesTool()
+    batch_alternatives_tool = BatchGroceryAlternativesTool()
 
-    tool_registry = ToolRegistry([browser_tool, alternatives_tool])
+    tool_registry = ToolRegistry(
+        [browser_tool, cart_tool, alternatives_tool, batch_alternatives_tool]
+    )
+    config = Config.from_default()
+    execution_hooks = CLIExecutionHooks()
+    # Parallel sessions may need the user at the same time, so ask them one thing at a time
+    execution_hooks.clarification_handler = SerialCLIClarificationHandler()
     portia = Portia(
-        config=Config.from_default(),
-        execution_hooks=CLIExecutionHooks(),
+        config=config,
+        execution_hooks=execution_hooks,
         tools=tool_registry,
     )
 
@@ -56,6 +94,21 @@ if __name__ == "__main__":
 
     # Create and use the shopping agent
     print(f"🛒 Shopping at {grocery_website}")
-    agent = ShoppingAgent(portia, grocery_website, grocery_list)
+    session_pool = (
+        BrowserSessionPool(
+            config,
+            execution_hooks,
+            [alternatives_tool, batch_alternatives_tool],
+            args.concurrency,
+        )
+        if args.concurrency > 1
+        else None
+    )
+    agent = ShoppingAgent(
+        portia, grocery_website, grocery_list, session_pool, args.batch_alternatives
+    )
     agent.process_list()
+    print(f"📊 {product_cache.stats}")
+    if args.measure_planning:
+        agent.report_planning_savings()
     agent.notify_user()
@@ -0,0 +1,151 @@
+"""A local cache of product search results for the grocery agent.
+
+The same staples ("milk", "bread") are searched for every week, and each search is a slow browser agent run.
+The cache keeps the products found for each item, keyed by store and normalised item name, in a local SQLite
+store. An item with a fresh entry skips the search and goes straight to choosing a product and adding it to
+the cart.
+
+Only exact matches are cached. When an item was unavailable and alternatives were offered, it is searched for
+again next time, in case it's back in stock.
+
+    uv run product_cache.py list
+    uv run product_cache.py refresh milk bread    # search for these items again next time
+    uv run product_cache.py refresh               # search for everything again next time
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+DEFAULT_CACHE_PATH = ".portia/product_cache.sqlite"
+DEFAULT_TTL_HOURS = 72.0
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalise_store(grocery_website: str) -> str:
+    host = urlparse(grocery_website).netloc or grocery_website
+    return host.lower().removeprefix("www.")
+
+
+def normalise_item(item: str) -> str:
+    return " ".join(WORD.findall(item.lower()))
+
+
+@dataclass
+class ProductCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self):
+        return f"Product cache: {self.hit_rate:.0%} hit rate ({self.hits} cached, {self.misses} searched)"
+
+
+class ProductCache:
+    """Products found for each grocery item, stored in SQLite by store and normalised item, with a TTL."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_hours: float = DEFAULT_TTL_HOURS):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 60 * 60
+        self.stats = ProductCacheStats()
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS products (
+                    store TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    grocery_items TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    PRIMARY KEY (store, item)
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation keeps the cache safe to use from any thread.
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self, grocery_website: str, item: str) -> List[Dict[str, Any]] | None:
+        """The cached products for the item, or None if there is no fresh entry."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT grocery_items FROM products WHERE store = ? AND item = ? AND stored_at >= ?",
+                (normalise_store(grocery_website), normalise_item(item), time.time() - self.ttl_seconds),
+            ).fetchone()
+        with self._lock:
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+        return json.loads(row["grocery_items"])
+
+    def put(self, grocery_website: str, item: str, grocery_items: List[Dict[str, Any]]) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)",
+                (
+                    normalise_store(grocery_website),
+                    normalise_item(item),
+                    json.dumps(grocery_items),
+                    time.time(),
+                ),
+            )
+
+    def entries(self) -> List[sqlite3.Row]:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT * FROM products ORDER BY store, item").fetchall()
+
+    def refresh(self, items: List[str] | None = None) -> int:
+        """Drop the entries for the given items (or every entry), so they are searched for again."""
+        with closing(self._connect()) as conn, conn:
+            if not items:
+                cursor = conn.execute("DELETE FROM products")
+            else:
+                cursor = conn.executemany(
+                    "DELETE FROM products WHERE item = ?", [(normalise_item(item),) for item in items]
+                )
+        return cursor.rowcount
+
+
+product_cache = ProductCache()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cache-path", type=str, default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--ttl-hours", type=float, default=DEFAULT_TTL_HOURS)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the cached products.")
+    refresh = subparsers.add_parser("refresh", help="Search for items again on the next run.")
+    refresh.add_argument("items", nargs="*", help="The items to refresh (default: all of them).")
+
+    args = parser.parse_args()
+    cache = ProductCache(args.cache_path, args.ttl_hours)
+    if args.command == "list":
+        now = time.time()
+        for entry in cache.entries():
+            age = (now - entry["stored_at"]) / 3600
+            stale = " (stale)" if now - entry["stored_at"] > cache.ttl_seconds else ""
+            products = ", ".join(
+                f"{product['name']} {product['price']}" for product in json.loads(entry["grocery_items"])
+            )
+            print(f"{entry['store']}  {entry['item']}  {age:.0f}h old{stale}: {products}")
+    else:
+        print(f"Refreshed {cache.refresh(args.items)} cached items")
@@ -1,22 +1,59 @@
-from typing import List
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
 from portia import (
     Portia,
 )
+from browser_pool import BrowserSessionPool
+from product_cache import product_cache
+from shopping_plan import (
+    CHOSEN_PRODUCTS_OUTPUT,
+    GrocerySearchResults,
+    build_add_to_cart_plan,
+    build_cached_shopping_plan,
+    build_choice_plan,
+    build_search_plan,
+    build_shopping_plan,
+    chosen_products,
+    search_results,
+)
 
 
 class ShoppingAgent:
     """Agent responsible for managing grocery shopping tasks."""
 
-    def __init__(self, portia: Portia, grocery_website: str, grocery_list: List[str]):
-        """Initialize shopping agent with Portia instance and grocery website."""
+    def __init__(
+        self,
+        portia: Portia,
+        grocery_website: str,
+        grocery_list: List[str],
+        session_pool: BrowserSessionPool | None = None,
+        batch_alternatives: bool = False,
+    ):
+        """Initialize shopping agent with Portia instance and grocery website.
+
+        If a session pool is given, items are processed in parallel on its browser sessions.
+        If batch_alternatives is set, every item is searched for before the user is asked to
+        choose alternatives for all the unavailable ones at once."""
         self.portia = portia
         self.grocery_website = grocery_website
         self.grocery_list = grocery_list
+        self.session_pool = session_pool
+        self.batch_alternatives = batch_alternatives
+        # Built once and run for every item, so the planner isn't called per item
+        self.plan = build_shopping_plan(grocery_website)
+        self.cached_plan = build_cached_shopping_plan(grocery_website)
+        self.search_plan = build_search_plan(grocery_website)
+        self.choice_plan = build_choice_plan()
+        self.add_to_cart_plan = build_add_to_cart_plan(grocery_website)
+        self.item_seconds: List[float] = []
 
-    def process_item(self, item: str) -> None:
-        """Process a single grocery item."""
-        print(f"\n🛒 Processing item: {item}")
-        task = f"""
+    def item_task(self, item: str) -> str:
+        """The natural-language task the planner used to plan from scratch for every item.
+
+        The shopping plan replaces it. It's kept to measure what the reusable plan saves."""
+        return f"""
             For the item "{item}":
             1. Navigate to grocery store website ({self.grocery_website}).
             2. Make sure user is logged in.
@@ -37,16 +74,159 @@ class ShoppingAgent:
             7. Add the chosen product to cart (unless skipped).
             """
 
-        plan_run = self.portia.run(task)
+    def process_item(self, item: str, portia: Portia | None = None) -> None:
+        """Process a single grocery item, on the given Portia instance if there is one."""
+        print(f"\n🛒 Processing item: {item}")
+        portia = portia or self.portia
+        start = time.perf_counter()
+        cached = product_cache.get(self.grocery_website, item)
+        if cached is not None:
+            print(f"📦 Using cached products for {item}")
+            options = {"grocery_items": cached, "alternative": False, "original_search_query": item}
+            plan_run = portia.run_plan(
+                self.cached_plan,
+                plan_run_inputs={"item": item, "search_results": json.dumps(options)},
+            )
+        else:
+            plan_run = portia.run_plan(self.plan, plan_run_inputs={"item": item})
+            self._cache_search_results(item, search_results(plan_run))
+        self.item_seconds.append(time.perf_counter() - start)
 
         print(f"✅ Completed adding {item}")
         print(plan_run.model_dump_json(indent=2))
 
+    def _cache_search_results(self, item: str, results: GrocerySearchResults | None) -> None:
+        # Alternatives aren't cached, so an unavailable item is searched for again next time
+        if results and results.grocery_items and not results.alternative:
+            product_cache.put(
+                self.grocery_website,
+                item,
+                [product.model_dump() for product in results.grocery_items],
+            )
+
+    def search_item(self, item: str, portia: Portia) -> GrocerySearchResults | None:
+        """Find the products for a grocery item, from the cache or by searching, without adding any to the cart."""
+        cached = product_cache.get(self.grocery_website, item)
+        if cached is not None:
+            print(f"📦 Using cached products for {item}")
+            return GrocerySearchResults(
+                grocery_items=cached, alternative=False, original_search_query=item
+            )
+        print(f"\n🔍 Searching for item: {item}")
+        start = time.perf_counter()
+        results = search_results(
+            portia.run_plan(self.search_plan, plan_run_inputs={"item": item})
+        )
+        self.item_seconds.append(time.perf_counter() - start)
+        self._cache_search_results(item, results)
+        return results
+
+    def choose_products(self, results: List[GrocerySearchResults]) -> Dict[str, str]:
+        """Ask the user to choose alternatives for all the unavailable items with one question.
+
+        Returns:
+            Dict[str, str]: The chosen product for each item, keyed by its position in results,
+            an empty string if it was skipped
+        """
+        plan_run = self.portia.run_plan(
+            self.choice_plan,
+            plan_run_inputs={
+                "search_results": json.dumps([result.model_dump() for result in results])
+            },
+        )
+        output = plan_run.outputs.step_outputs.get(CHOSEN_PRODUCTS_OUTPUT)
+        return chosen_products(output.get_value()) if output else {}
+
+    def add_to_cart(self, product: str, portia: Portia) -> None:
+        """Add a chosen product to the cart."""
+        start = time.perf_counter()
+        portia.run_plan(self.add_to_cart_plan, plan_run_inputs={"product": product})
+        self.item_seconds.append(time.perf_counter() - start)
+        print(f"✅ Completed adding {product}")
+
     def process_list(self) -> None:
         """Process a list of grocery items."""
-        for item in self.grocery_list:
-            self.process_item(item)
+        if self.batch_alternatives:
+            self._process_list_batched()
+        else:
+            self._for_each(self.grocery_list, self.process_item)
+
+    def _process_list_batched(self) -> None:
+        # Search for everything first, so browser work never waits on the user. Then ask
+        # about all of the unavailable items at once, and add all the choices to the cart.
+        found: Dict[str, GrocerySearchResults] = {}
+
+        def search(item: str, portia: Portia) -> None:
+            if (results := self.search_item(item, portia)) is not None:
+                found[item] = results
+
+        self._for_each(self.grocery_list, search)
+        if not found:
+            return
+        searched = [item for item in self.grocery_list if item in found]
+        choices = self.choose_products([found[item] for item in searched])
+        products = []
+        for position, item in enumerate(searched):
+            product = choices.get(str(position))
+            if product:
+                products.append(product)
+            elif product is not None:
+                print(f"⏭️ Skipping {item}")
+            else:
+                print(f"⚠️ No product was chosen for {item}, so it won't be added to the cart")
+        self._for_each(products, self.add_to_cart)
+
+    def _for_each(self, items: List[str], process: Callable[[str, Portia], None]) -> None:
+        """Process each item, in parallel on the session pool if there is one."""
+        if self.session_pool is None:
+            for item in items:
+                self._process_one(process, item, self.portia)
+            return
+        if not items:
+            return
+
+        if not self.session_pool.started:
+            # The first item is processed on the primary session, where the user logs in.
+            # The other sessions are then created from its profile, so they start logged in.
+            first, *items = items
+            self._process_one(process, first, self.session_pool.primary)
+            self.session_pool.start()
+        with ThreadPoolExecutor(max_workers=self.session_pool.width) as executor:
+            futures = [executor.submit(self._process_in_session, process, item) for item in items]
+            for future in futures:
+                future.result()
+
+    def _process_in_session(self, process: Callable[[str, Portia], None], item: str) -> None:
+        with self.session_pool.session() as portia:
+            self._process_one(process, item, portia)
+
+    def _process_one(self, process: Callable[[str, Portia], None], item: str, portia: Portia) -> None:
+        """Process one item, so that a failure skips just that item rather than the rest of the list."""
+        try:
+            process(item, portia)
+        except Exception as e:
+            print(f"⚠️ Failed to process {item}: {e}")
+
+    def report_planning_savings(self) -> None:
+        """Compare the list just shopped with planning every item from scratch.
+
+        Plans the first item's task once, without running it, to time a planner call. The time saved is an
+        estimate: that one timing multiplied by the number of items."""
+        if not self.grocery_list:
+            return
+        start = time.perf_counter()
+        self.portia.plan(self.item_task(self.grocery_list[0]))
+        planning_seconds = time.perf_counter() - start
+
+        items = len(self.grocery_list)
+        print(f"📊 Shopped {items} items in {sum(self.item_seconds):.1f}s with 0 planner calls")
+        print(
+            f"📊 Planning each item would have taken {items} planner calls. One planner call took "
+            f"{planning_seconds:.1f}s, so an estimated ~{items * planning_seconds:.1f}s was saved"
+        )
 
     def notify_user(self):
         task = f"""Get cart summary from {self.grocery_website} and notify user of the details and to checkout"""
-        self.portia.run(task)
+        # The primary session is the one logged in to the store when processing in parallel
+        portia = self.session_pool.primary if self.session_pool else self.portia
+        portia.run(task)
@@ -0,0 +1,237 @@
+"""The shopping flow for one grocery item, built once as a plan and reused for every item.
+
+Running a natural-language task with `portia.run` asks the planner to work out the same procedure again for
+every item on the list. This plan takes the item as an input instead, so the whole list is shopped with a
+single plan and no planner calls. Items with cached products (see `product_cache.py`) use a second plan
+that skips the search.
+
+When alternatives are batched, the flow is split into three plans instead: every item is searched for, the
+user chooses the alternatives for all unavailable items at once, and then the chosen products are added to
+the cart.
+"""
+
+import json
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, Field
+
+from portia import Input, PlanBuilderV2, PlanRun, StepOutput
+from portia.builder.plan_v2 import PlanV2
+
+from browser_pool import CART_BROWSER_TOOL_ID
+
+# The output of the "search_for_item" step, the first step of the shopping and search plans
+SEARCH_RESULTS_OUTPUT = "$step_0_output"
+# The output of the "choose_products" step, the first step of the choice plan
+CHOSEN_PRODUCTS_OUTPUT = "$step_0_output"
+
+
+class GroceryItem(BaseModel):
+    """A product found on the grocery store website."""
+
+    name: str = Field(..., description="The product name")
+    price: str = Field(..., description="The product price, e.g. £1.25")
+
+
+class GrocerySearchResults(BaseModel):
+    """The products found when searching for a grocery item."""
+
+    grocery_items: List[GroceryItem] = Field(..., description="The products found")
+    alternative: bool = Field(
+        ...,
+        description="True if these are alternative products for the item, false if exact matches",
+    )
+    original_search_query: str = Field(..., description="The grocery item that was searched for")
+
+
+def chosen_product(choice: Any) -> str:
+    """Get the product name from the alternatives tool's output.
+
+    Args:
+        choice: The alternatives tool output, either as a dict or as a JSON string
+
+    Returns:
+        str: The chosen product name, or an empty string if the item was skipped
+    """
+    if isinstance(choice, str):
+        try:
+            choice = json.loads(choice)
+        except json.JSONDecodeError:
+            return choice
+    return choice.get("product", "") if isinstance(choice, dict) else ""
+
+
+def search_results(plan_run: PlanRun) -> GrocerySearchResults | None:
+    """Get the products found by a shopping plan run's search, if it got that far."""
+    output = plan_run.outputs.step_outputs.get(SEARCH_RESULTS_OUTPUT)
+    if output is None:
+        return None
+    value = output.get_value()
+    if isinstance(value, str):
+        return GrocerySearchResults.model_validate_json(value)
+    return GrocerySearchResults.model_validate(value)
+
+
+def chosen_products(choices: Any) -> Dict[str, str]:
+    """Get the product chosen for each item from the batch alternatives tool's output.
+
+    Args:
+        choices: The batch alternatives tool output, either as a dict or as a JSON string
+
+    Returns:
+        Dict[str, str]: The chosen product for each item, keyed by the position of its search results,
+        an empty string if it was skipped
+    """
+    if isinstance(choices, str):
+        try:
+            choices = json.loads(choices)
+        except json.JSONDecodeError:
+            return {}
+    return choices if isinstance(choices, dict) else {}
+
+
+def add_search_step(builder: PlanBuilderV2, grocery_website: str) -> PlanBuilderV2:
+    """Add the step that searches for the "item" input, or for alternatives if it isn't available."""
+    return builder.single_tool_agent_step(
+        step_name="search_for_item",
+        tool="browser_tool",
+        task=f"""
+        For the item "{Input("item")}":
+        1. Navigate to grocery store website ({grocery_website}).
+        2. Make sure user is logged in.
+        3. Search for it on grocery store website ({grocery_website}).
+        4. If the product is not available, search for alternative products. Like for example, if crocin is not available, search for paracetamol and add search results for the alternative product.
+        5. Extract the name and price of the search results, whether they are alternative products and the original search query.
+        """,
+        output_schema=GrocerySearchResults,
+    )
+
+
+def add_chosen_product_to_cart(builder: PlanBuilderV2, grocery_website: str) -> PlanBuilderV2:
+    """Add the steps that put the product chosen in the "choose_product" step in the cart."""
+    return (
+        builder.function_step(
+            step_name="chosen_product",
+            function=chosen_product,
+            args={"choice": StepOutput("choose_product")},
+        )
+        .if_(
+            condition=lambda product: bool(product),
+            args={"product": StepOutput("chosen_product")},
+        )
+        .single_tool_agent_step(
+            step_name="add_to_cart",
+            tool=CART_BROWSER_TOOL_ID,
+            task=f"Add {StepOutput('chosen_product')} to the cart on {grocery_website}.",
+        )
+        .endif()
+    )
+
+
+def build_shopping_plan(grocery_website: str) -> PlanV2:
+    """Build the plan that shops for one grocery item, given as the "item" input.
+
+    Args:
+        grocery_website: The grocery store website to shop on
+
+    Returns:
+        PlanV2: The plan, to be run once per item
+    """
+    builder = PlanBuilderV2(f"Add a grocery item to the cart on {grocery_website}").input(
+        name="item", description="The grocery item to shop for"
+    )
+    builder = add_search_step(builder, grocery_website).single_tool_agent_step(
+        step_name="choose_product",
+        tool="alternatives",
+        task="Call the alternatives tool with the search results as the options JSON.",
+        inputs=[StepOutput("search_for_item")],
+    )
+    return add_chosen_product_to_cart(builder, grocery_website).build()
+
+
+def build_cached_shopping_plan(grocery_website: str) -> PlanV2:
+    """Build the plan that shops for an item whose products were found on an earlier run.
+
+    It skips the search and passes the cached products (the "search_results" input) straight to the
+    alternatives tool.
+
+    Args:
+        grocery_website: The grocery store website to shop on
+
+    Returns:
+        PlanV2: The plan, to be run once per cached item
+    """
+    builder = (
+        PlanBuilderV2(f"Add a grocery item found earlier to the cart on {grocery_website}")
+        .input(name="item", description="The grocery item to shop for")
+        .input(
+            name="search_results",
+            description="The products found for the item earlier, as the alternatives tool's options JSON",
+        )
+        .invoke_tool_step(
+            step_name="choose_product",
+            tool="alternatives",
+            args={"options": Input("search_results")},
+        )
+    )
+    return add_chosen_product_to_cart(builder, grocery_website).build()
+
+
+def build_search_plan(grocery_website: str) -> PlanV2:
+    """Build the plan that only searches for a grocery item, given as the "item" input.
+
+    Used when batching the alternatives, so searches never wait on the user.
+
+    Args:
+        grocery_website: The grocery store website to search
+
+    Returns:
+        PlanV2: The plan, to be run once per item
+    """
+    builder = PlanBuilderV2(f"Search for a grocery item on {grocery_website}").input(
+        name="item", description="The grocery item to search for"
+    )
+    return add_search_step(builder, grocery_website).build()
+
+
+def build_choice_plan() -> PlanV2:
+    """Build the plan that asks the user to choose alternatives for all unavailable items at once.
+
+    Returns:
+        PlanV2: The plan, to be run once with the search results for every item
+    """
+    return (
+        PlanBuilderV2("Choose products for a list of grocery items")
+        .input(
+            name="search_results",
+            description="The search results for every item, as the batch alternatives tool's options JSON",
+        )
+        # Passed to the tool as they are, rather than copied out by an LLM that could truncate or reorder them.
+        .invoke_tool_step(
+            step_name="choose_products",
+            tool="batch_alternatives",
+            args={"options": Input("search_results")},
+        )
+        .build()
+    )
+
+
+def build_add_to_cart_plan(grocery_website: str) -> PlanV2:
+    """Build the plan that adds a chosen product, given as the "product" input, to the cart.
+
+    Args:
+        grocery_website: The grocery store website to shop on
+
+    Returns:
+        PlanV2: The plan, to be run once per chosen product
+    """
+    return (
+        PlanBuilderV2(f"Add a product to the cart on {grocery_website}")
+        .input(name="product", description="The product to add to the cart")
+        .single_tool_agent_step(
+            step_name="add_to_cart",
+            tool=CART_BROWSER_TOOL_ID,
+            task=f"Add {Input('product')} to the cart on {grocery_website}.",
+        )
+        .build()
+    )
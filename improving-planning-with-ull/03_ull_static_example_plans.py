@@ -10,6 +10,7 @@ It is part of a set of scripts designed to demonstrate how user-led learning can
 from portia.plan import PlanBuilder
 
 from common import init_portia
+from prompts import VAGUE_PROMPT
 
 # Example 1: Create refund given user email
 plan1 = (
@@ -44,21 +45,10 @@ plan1 = (
     .build()
 )
 
-vague_prompt = """
-Read the refund request email from the customer and decide if it should be approved or rejected.
-If you think the refund request should be approved, check with a human for final approval and then process the refund.
-
-To process the refund, you'll need to find the customer in Stripe and then find their payment intent.
-
-The refund policy can be found in the file: ./refund_policy.txt
-
-The refund request email can be found in "inbox.txt" file
-"""
-
-portia_instance = init_portia()
+portia_instance = init_portia(use_snapshot=True)
 
 plan = portia_instance.plan(
-    vague_prompt,
+    VAGUE_PROMPT,
     example_plans=[plan1],
 )
 
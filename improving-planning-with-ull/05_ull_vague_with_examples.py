@@ -9,21 +9,10 @@ This script is part of a set of scripts designed to demonstrate how user-led lea
 """
 
 from common import init_portia
+from prompts import VAGUE_PROMPT
 
-# Define the prompts for testing
-vague_prompt = """
-Read the refund request email from the customer and decide if it should be approved or rejected.
-If you think the refund request should be approved, check with a human for final approval and then process the refund.
-
-To process the refund, you'll need to find the customer in Stripe and then find their payment intent.
-
-The refund policy can be found in the file: ./refund_policy.txt
-
-The refund request email can be found in "inbox.txt" file
-"""
-
-portia_instance = init_portia()
-example_plans = portia_instance.storage.get_similar_plans(vague_prompt)
+portia_instance = init_portia(use_snapshot=True)
+example_plans = portia_instance.storage.get_similar_plans(VAGUE_PROMPT)
 if not example_plans:
     print(
         "No example plans were found in Portia storage. Did you remember to create and 'like' the plans from the previous step?"
@@ -31,7 +20,7 @@ if not example_plans:
 else:
     print(f"{len(example_plans)} similar plans were found.")
 plan = portia_instance.plan(
-    vague_prompt,
+    VAGUE_PROMPT,
     example_plans=example_plans,
 )
 print(plan.pretty_print())
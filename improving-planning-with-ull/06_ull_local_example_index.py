@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+"""
+This script shows how to retrieve relevant example plans from a local index, rather than sending every example to the planner.
+You must have run `04_ull_create_example_plans.py` before running this script, which adds the example plans to the local index.
+
+This script is part of a set of scripts designed to demonstrate how user-led learning can improve planning results.
+"""
+
+from common import init_portia
+from example_index import ExamplePlanIndex, plan_with_examples
+from prompts import VAGUE_PROMPT
+
+
+index = ExamplePlanIndex()
+if not len(index):
+    print(
+        "The local example plan index is empty. Did you remember to run `04_ull_create_example_plans.py`?"
+    )
+
+portia_instance = init_portia(use_snapshot=True)
+# Only the (at most) 2 most similar examples that fit within 1500 tokens are sent to the planner.
+plan = plan_with_examples(
+    portia_instance, VAGUE_PROMPT, index, top_k=2, token_budget=1500
+)
+print(plan.pretty_print())
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+
+"""
+This script shows how to plan with only the tools that are relevant to the prompt, rather than sending every registered tool's description to the planner.
+
+This script is part of a set of scripts designed to demonstrate how user-led learning can improve planning results.
+"""
+
+from common import init_portia
+from prompts import VAGUE_PROMPT
+from tool_selector import ToolSelector, plan_with_tool_subset
+
+
+portia_instance = init_portia(use_snapshot=True)
+selector = ToolSelector(portia_instance.tool_registry)
+# The planner sees the pinned refund tools plus the 8 tools most relevant to the prompt.
+plan = plan_with_tool_subset(portia_instance, VAGUE_PROMPT, selector, top_k=8)
+print(plan.pretty_print())
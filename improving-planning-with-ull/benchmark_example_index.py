@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+This script compares sending every example plan to the planner against retrieving the top-k most relevant
+examples from the local example plan index.
+
+To simulate a large library, the three refund example plans are mixed in with a number of unrelated
+example plans. For each strategy it reports the example tokens sent to the planner and the retrieval time,
+and (unless `--dry-run` is given) the planning latency, averaged over `--runs` calls to `portia.plan`.
+
+    uv run benchmark_example_index.py --library-size 200 --dry-run
+    uv run benchmark_example_index.py --library-size 50 --runs 3
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from portia.plan import Plan, PlanBuilder
+
+from example_index import TOKEN_ENCODING, ExamplePlanIndex, count_tokens
+from example_plans import example_plans
+from prompts import VAGUE_PROMPT
+
+# Unrelated tasks used to pad out the example library.
+DISTRACTOR_TASKS = [
+    ("Create an invoice for customer {email}", ["mcp:stripe:list_customers", "mcp:stripe:create_invoice"]),
+    ("List all subscriptions for customer {email}", ["mcp:stripe:list_customers", "mcp:stripe:list_subscriptions"]),
+    ("Cancel the subscription belonging to {email}", ["mcp:stripe:list_subscriptions", "mcp:stripe:cancel_subscription"]),
+    ("Create a product and a monthly price for plan {n}", ["mcp:stripe:create_product", "mcp:stripe:create_price"]),
+    ("Create a payment link for product {n}", ["mcp:stripe:list_products", "mcp:stripe:create_payment_link"]),
+    ("Email {email} a summary of their latest invoice", ["mcp:stripe:list_invoices", "portia:google:gmail:send_email"]),
+    ("Post the account balance to the #finance Slack channel ({n})", ["mcp:stripe:retrieve_balance", "portia:slack:bot:send_message"]),
+]
+
+
+def build_library(size: int) -> list[Plan]:
+    """The refund example plans plus enough distractor plans to make up the library size."""
+    library = list(example_plans)
+    n = 0
+    while len(library) < size:
+        query_template, tools = DISTRACTOR_TASKS[n % len(DISTRACTOR_TASKS)]
+        query = query_template.format(email=f"customer{n}@example.com", n=n)
+        builder = PlanBuilder(query)
+        for i, tool_id in enumerate(tools):
+            builder = builder.step(f"{query} (step {i + 1})", tool_id, f"$output_{i}")
+        library.append(builder.build())
+        n += 1
+    return library
+
+
+def main(library_size: int, top_k: int, token_budget: int, runs: int, dry_run: bool):
+    library = build_library(library_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ExamplePlanIndex(f"{tmp}/example_plans.json")
+        for plan in library:
+            index.add(plan)
+
+        start = time.perf_counter()
+        retrieved = index.search(VAGUE_PROMPT, top_k=top_k, token_budget=token_budget)
+        retrieval_ms = (time.perf_counter() - start) * 1000
+
+    strategies = {"send-all": (library, 0.0), f"top-{top_k}": (retrieved, retrieval_ms)}
+
+    portia_instance = None
+    if not dry_run:
+        from common import init_portia
+
+        portia_instance = init_portia(use_snapshot=True)
+
+    print(f"Library size: {len(library)} example plans")
+    print(f"Example tokens use tiktoken's {TOKEN_ENCODING} encoding.")
+    print(f"{'strategy':<10} {'examples':>8} {'example tokens':>15} {'retrieval ms':>13} {'plan latency s':>15}")
+    for name, (examples, retrieval) in strategies.items():
+        tokens = sum(count_tokens(plan.model_dump_json()) for plan in examples)
+        latency = "-"
+        if portia_instance:
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                portia_instance.plan(VAGUE_PROMPT, example_plans=examples)
+                timings.append(time.perf_counter() - start)
+            latency = f"{statistics.fmean(timings):.2f}"
+        print(f"{name:<10} {len(examples):>8} {tokens:>15} {retrieval:>13.2f} {latency:>15}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--library-size", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--token-budget", type=int, default=1500)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only measure example tokens and retrieval time, without calling the planner.",
+    )
+    args = parser.parse_args()
+    main(args.library_size, args.top_k, args.token_budget, args.runs, args.dry_run)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""
+This script benchmarks the planner across the prompting strategies demonstrated by the numbered scripts,
+so that we can pick the cheapest strategy that still produces correct plans.
+
+Each variant is planned `--runs` times against the mock tools and the tool snapshot (see `tool_snapshot.py`),
+and the script reports the planner latency, prompt tokens, plan length and a structural score that compares the
+sequence of tools in each plan against a reference plan (1.0 is a perfect match).
+
+LLM responses are recorded to a cassette file, so the benchmark can be replayed offline:
+
+    # Record responses from the real planning model (needs your LLM API key):
+    uv run benchmark_planning.py --mode record --runs 5
+    # Replay them, with no network access:
+    uv run benchmark_planning.py --runs 5
+
+No cassette is committed, as the responses depend on your planning model: record one before replaying.
+
+In replay mode, the reported latency is the local planning overhead plus the LLM latency that was recorded.
+"""
+
+import argparse
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+from portia import Config, Portia, StorageClass, ToolRegistry
+from portia.plan import Plan
+
+from common import load_offline_tools
+from example_index import TOKEN_ENCODING
+from example_plans import example_plans
+from prompts import GOOD_PROMPT, VAGUE_PROMPT
+from replay_model import RECORD, REPLAY, ReplayModel, require_cassette
+
+DEFAULT_CASSETTE_PATH = "cassettes/planning.json"
+DEFAULT_OUTPUT_PATH = "benchmark_planning_results.md"
+
+# The tools that a correct refund plan uses, in order.
+REFERENCE_TOOL_IDS = [
+    "file_reader_tool",
+    "file_reader_tool",
+    "refund_reviewer",
+    "human_approval",
+    "mcp:stripe:list_customers",
+    "mcp:stripe:list_payment_intents",
+    "mcp:stripe:create_refund",
+]
+
+VARIANTS: dict[str, tuple[str, list[Plan]]] = {
+    "01 vague prompt": (VAGUE_PROMPT, []),
+    "02 good prompt": (GOOD_PROMPT, []),
+    "03 static example": (VAGUE_PROMPT, example_plans[:1]),
+    "05 vague with examples": (VAGUE_PROMPT, example_plans),
+}
+
+
+def structural_score(plan: Plan, reference: list[str] = REFERENCE_TOOL_IDS) -> float:
+    """Similarity of the plan's tool sequence to the reference: 2 * LCS / (len(plan) + len(reference))."""
+    tool_ids = [step.tool_id or "" for step in plan.steps]
+    if not tool_ids and not reference:
+        return 1.0
+    lcs = [[0] * (len(reference) + 1) for _ in range(len(tool_ids) + 1)]
+    for i, tool_id in enumerate(tool_ids):
+        for j, reference_id in enumerate(reference):
+            lcs[i + 1][j + 1] = (
+                lcs[i][j] + 1
+                if tool_id == reference_id
+                else max(lcs[i][j + 1], lcs[i + 1][j])
+            )
+    return 2 * lcs[-1][-1] / (len(tool_ids) + len(reference))
+
+
+@dataclass
+class VariantResult:
+    latencies: list[float] = field(default_factory=list)
+    prompt_tokens: list[int] = field(default_factory=list)
+    plan_lengths: list[int] = field(default_factory=list)
+    scores: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def row(self, name: str) -> list[str]:
+        def mean(values: list[float]) -> str:
+            return f"{statistics.fmean(values):.2f}" if values else "-"
+
+        return [
+            name,
+            str(len(self.latencies) + self.errors),
+            str(self.errors),
+            mean(self.latencies),
+            mean(self.prompt_tokens),
+            mean(self.plan_lengths),
+            mean(self.scores),
+        ]
+
+
+def run_benchmark(model: ReplayModel, runs: int, tools: ToolRegistry) -> dict[str, VariantResult]:
+    config = Config.from_default(
+        storage_class=StorageClass.MEMORY,
+        default_log_level="WARNING",
+        default_model=model,
+        planning_model=model,
+    )
+    portia = Portia(config=config, tools=tools)
+
+    results = {}
+    for name, (prompt, examples) in VARIANTS.items():
+        result = results[name] = VariantResult()
+        for run in range(runs):
+            model.run_index = run
+            model.reset_usage()
+            start = time.perf_counter()
+            try:
+                plan = portia.plan(prompt, example_plans=examples)
+            except Exception as e:  # noqa: BLE001 - a failed plan is a result, not a crash
+                print(f"{name} run {run} failed: {e}")
+                result.errors += 1
+                continue
+            latency = time.perf_counter() - start
+            if model.mode == REPLAY:
+                latency += model.llm_seconds
+            result.latencies.append(latency)
+            result.prompt_tokens.append(model.prompt_tokens)
+            result.plan_lengths.append(len(plan.steps))
+            result.scores.append(structural_score(plan))
+    return results
+
+
+def format_table(results: dict[str, VariantResult]) -> str:
+    header = ["variant", "runs", "errors", "latency (s)", "prompt tokens", "plan length", "score"]
+    rows = [header, ["---"] * len(header)]
+    rows += [result.row(name) for name, result in results.items()]
+    return "\n".join("| " + " | ".join(row) + " |" for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=[RECORD, REPLAY], default=REPLAY)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--cassette", type=str, default=DEFAULT_CASSETTE_PATH)
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT_PATH)
+    args = parser.parse_args()
+
+    if args.mode == REPLAY:
+        require_cassette(args.cassette, "benchmark_planning.py")
+    try:
+        tools = load_offline_tools()
+    except RuntimeError as e:
+        raise SystemExit(str(e)) from e
+
+    wrapped_model = None
+    if args.mode == RECORD:
+        load_dotenv(override=True)
+        wrapped_model = Config.from_default().get_planning_model()
+    model = ReplayModel(args.cassette, mode=args.mode, model=wrapped_model)
+
+    results = run_benchmark(model, args.runs, tools)
+    if args.mode == RECORD:
+        model.save()
+
+    table = format_table(results)
+    print(table)
+    print(f"\nPrompt tokens use tiktoken's {TOKEN_ENCODING} encoding.")
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(table + "\n")
+    print(f"\nResults written to {args.output}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+This script compares planning with every registered tool against planning with only the tools that the
+`ToolSelector` picks as relevant to the query (see `tool_selector.py`).
+
+For each prompt it reports the number of tools sent to the planner, the tokens spent describing them, the total
+planner prompt tokens, the planning latency and the structural score of the resulting plan. Like
+`benchmark_planning.py`, LLM responses are recorded to a cassette so the comparison can be replayed offline:
+
+    uv run benchmark_tool_selection.py --mode record
+    uv run benchmark_tool_selection.py
+"""
+
+import argparse
+import statistics
+import time
+
+from dotenv import load_dotenv
+from portia import Config, Portia, StorageClass
+
+from benchmark_planning import structural_score
+from common import load_offline_tools
+from prompts import GOOD_PROMPT, VAGUE_PROMPT
+from replay_model import RECORD, REPLAY, ReplayModel, require_cassette
+from tool_selector import ToolSelector, tool_prompt_tokens
+
+DEFAULT_CASSETTE_PATH = "cassettes/tool_selection.json"
+
+PROMPTS = {"vague prompt": VAGUE_PROMPT, "good prompt": GOOD_PROMPT}
+
+
+def mean(values: list[float], spec: str) -> str:
+    return format(statistics.fmean(values), spec) if values else "-"
+
+
+def main(model: ReplayModel, runs: int, top_k: int):
+    try:
+        tools = load_offline_tools()
+    except RuntimeError as e:
+        raise SystemExit(str(e)) from e
+    config = Config.from_default(
+        storage_class=StorageClass.MEMORY,
+        default_log_level="WARNING",
+        default_model=model,
+        planning_model=model,
+    )
+    portia = Portia(config=config, tools=tools)
+    selector = ToolSelector(tools)
+
+    header = [
+        "prompt", "tools", "count", "tool tokens", "runs", "errors", "prompt tokens", "latency (s)", "score"
+    ]
+    print("| " + " | ".join(header) + " |")
+    print("| " + " | ".join(["---"] * len(header)) + " |")
+    for prompt_name, prompt in PROMPTS.items():
+        strategies = {
+            "all": tools.get_tools(),
+            f"top-{top_k}": selector.select(prompt, top_k=top_k),
+        }
+        for strategy, selected in strategies.items():
+            latencies, prompt_tokens, scores = [], [], []
+            errors = 0
+            for run in range(runs):
+                model.run_index = run
+                model.reset_usage()
+                start = time.perf_counter()
+                try:
+                    plan = portia.plan(prompt, tools=selected)
+                except Exception as e:  # noqa: BLE001 - a failed plan is a result, not a crash
+                    print(f"{prompt_name} with {strategy} tools, run {run} failed: {e}")
+                    errors += 1
+                    continue
+                latency = time.perf_counter() - start
+                if model.mode == REPLAY:
+                    latency += model.llm_seconds
+                latencies.append(latency)
+                prompt_tokens.append(model.prompt_tokens)
+                scores.append(structural_score(plan))
+            row = [
+                prompt_name,
+                strategy,
+                str(len(selected)),
+                str(tool_prompt_tokens(selected)),
+                str(runs),
+                str(errors),
+                mean(prompt_tokens, ".0f"),
+                mean(latencies, ".2f"),
+                mean(scores, ".2f"),
+            ]
+            print("| " + " | ".join(row) + " |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=[RECORD, REPLAY], default=REPLAY)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--cassette", type=str, default=DEFAULT_CASSETTE_PATH)
+    args = parser.parse_args()
+
+    if args.mode == REPLAY:
+        require_cassette(args.cassette, "benchmark_tool_selection.py")
+
+    wrapped_model = None
+    if args.mode == RECORD:
+        load_dotenv(override=True)
+        wrapped_model = Config.from_default().get_planning_model()
+    model = ReplayModel(args.cassette, mode=args.mode, model=wrapped_model)
+    try:
+        main(model, args.runs, args.top_k)
+    finally:
+        if args.mode == RECORD:
+            model.save()
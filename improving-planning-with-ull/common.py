@@ -18,39 +18,83 @@ from portia import (
     InMemoryToolRegistry,
     McpToolRegistry,
     Portia,
+    ToolRegistry,
 )
 from portia.cli import CLIExecutionHooks
+from tool_snapshot import fingerprint, load_snapshot_registry, save_snapshot
 
 portia.tool.MAX_TOOL_DESCRIPTION_LENGTH = 2048
 
+STRIPE_MCP_ARGS = ["-y", "@stripe/mcp", "--tools=all"]
 
-def init_portia():
+
+def build_remote_tools(config: Config) -> ToolRegistry:
+    """
+    Build the registry of remote tools: this spawns the Stripe MCP server and fetches the Portia cloud tools.
+    """
+    return McpToolRegistry.from_stdio_connection(
+        server_name="stripe",
+        command="npx",
+        args=[*STRIPE_MCP_ARGS, f"--api-key={os.environ['STRIPE_TEST_API_KEY']}"],
+    ) + DefaultToolRegistry(
+        config=config,
+    )
+
+
+def _no_live_tools() -> ToolRegistry:
+    raise RuntimeError("Tools cannot be run in offline mode.")
+
+
+def load_offline_tools() -> ToolRegistry:
+    """
+    Return the local mock tools plus the remote tools from the snapshot, without any network access.
+
+    This is only good for planning: the snapshot must have been created by running one of the planning scripts first.
+    """
+    remote_tools = load_snapshot_registry(None, _no_live_tools, max_age_seconds=None)
+    if remote_tools is None:
+        raise RuntimeError(
+            "No tool snapshot found. Run `uv run 02_ull_good_prompt_no_examples.py` once to create it."
+        )
+    return remote_tools + InMemoryToolRegistry.from_local_tools(
+        [RefundReviewerTool(), RefundHumanApprovalTool()]
+    )
+
+
+def init_portia(use_snapshot: bool = False):
     """
     Load config from a `.env` file and return a configured instance of `Portia`.
+
+    Scripts that only plan can set `use_snapshot=True` to load the remote tools' schemas from a local snapshot
+    (see `tool_snapshot.py`) rather than connecting to the Stripe MCP server and Portia cloud on startup.
+    The live connections are only opened if one of the remote tools is actually run.
     """
 
     load_dotenv(override=True)
 
     config = Config.from_default(default_log_level="INFO")
+    local_tools = InMemoryToolRegistry.from_local_tools(
+        [RefundReviewerTool(), RefundHumanApprovalTool()]
+    )
 
-    tools = (
-        McpToolRegistry.from_stdio_connection(
-            server_name="stripe",
-            command="npx",
-            args=[
-                "-y",
-                "@stripe/mcp",
-                "--tools=all",
-                f"--api-key={os.environ['STRIPE_TEST_API_KEY']}",
-            ],
-        )
-        + DefaultToolRegistry(
-            config=config,
+    if use_snapshot:
+        tools_fingerprint = fingerprint(
+            STRIPE_MCP_ARGS,
+            portia.tool.MAX_TOOL_DESCRIPTION_LENGTH,
+            # Hashed by fingerprint(), so the keys themselves never reach the snapshot file.
+            os.environ["STRIPE_TEST_API_KEY"],
+            os.environ.get("PORTIA_API_KEY"),
         )
-        + InMemoryToolRegistry.from_local_tools(
-            [RefundReviewerTool(), RefundHumanApprovalTool()]
+        remote_tools = load_snapshot_registry(
+            tools_fingerprint, lambda: build_remote_tools(config)
         )
-    )
+        if remote_tools is None:
+            remote_tools = build_remote_tools(config)
+            save_snapshot(remote_tools, tools_fingerprint)
+    else:
+        remote_tools = build_remote_tools(config)
+
+    tools = remote_tools + local_tools
 
     portia_instance = Portia(
         config=config, tools=tools, execution_hooks=CLIExecutionHooks()
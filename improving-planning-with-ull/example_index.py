@@ -0,0 +1,140 @@
+"""
+example_index - A local index of example plans, used to pick the most relevant examples for a query.
+
+Passing every example plan to `portia.plan` works for a handful of examples, but with a large library the
+examples dominate the planner prompt. The `ExamplePlanIndex` stores each saved plan along with a small
+embedding of its query and steps. At plan time it retrieves the top-k most similar examples that fit within a
+token budget, so the planner only sees the examples that are likely to help.
+
+The embedding is a feature-hashed bag of words, so the index needs no API calls to build or search. Example
+sizes are counted with tiktoken.
+
+This code is not meant to be run directly.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+
+import tiktoken
+from portia import Portia
+from portia.plan import Plan
+
+DEFAULT_INDEX_PATH = ".portia/example_plans.json"
+EMBEDDING_DIMENSIONS = 1024
+# The tokenizer used to size examples against the token budget, and prompts in the benchmarks.
+TOKEN_ENCODING = "cl100k_base"
+
+WORD = re.compile(r"[a-z0-9_]+")
+
+
+def count_tokens(text: str) -> int:
+    """How many TOKEN_ENCODING tokens the text takes up in a planner prompt, e.g. an example plan's JSON."""
+    return len(tiktoken.get_encoding(TOKEN_ENCODING).encode(text))
+
+
+def embed(text: str) -> dict[int, float]:
+    """Embed text as an L2-normalised, feature-hashed bag of words (stored sparsely)."""
+    counts = Counter(WORD.findall(text.lower()))
+    vector: dict[int, float] = {}
+    for word, count in counts.items():
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest, "little") % EMBEDDING_DIMENSIONS
+        vector[bucket] = vector.get(bucket, 0.0) + 1 + math.log(count)
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {bucket: value / norm for bucket, value in vector.items()}
+
+
+def cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(bucket, 0.0) for bucket, value in a.items())
+
+
+def plan_text(plan: Plan) -> str:
+    """The text that represents a plan in the index: its query plus the task and tool of each step."""
+    steps = [f"{step.task} {step.tool_id or ''}" for step in plan.steps]
+    return "\n".join([plan.plan_context.query, *steps])
+
+
+class ExamplePlanIndex:
+    """A local, file-backed index of example plans."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self.entries: list[dict] = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self._plans = [Plan.model_validate_json(entry["plan"]) for entry in self.entries]
+        self._vectors = [
+            {int(bucket): value for bucket, value in entry["embedding"].items()}
+            for entry in self.entries
+        ]
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def plans(self) -> list[Plan]:
+        return list(self._plans)
+
+    def add(self, plan: Plan) -> None:
+        """Add an example plan to the index, replacing any plan for the same query. Call `save()` to persist it."""
+        serialised = plan.model_dump_json()
+        vector = embed(plan_text(plan))
+        entry = {
+            "query": plan.plan_context.query,
+            "plan": serialised,
+            "tokens": count_tokens(serialised),
+            "embedding": vector,
+        }
+        for i, existing in enumerate(self.entries):
+            if existing["query"] == entry["query"]:
+                self.entries[i], self._plans[i], self._vectors[i] = entry, plan, vector
+                return
+        self.entries.append(entry)
+        self._plans.append(plan)
+        self._vectors.append(vector)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+
+    def search(
+        self, query: str, top_k: int = 3, token_budget: int | None = 2000
+    ) -> list[Plan]:
+        """Return up to top_k example plans most similar to the query, within the token budget."""
+        query_vector = embed(query)
+        ranked = sorted(
+            range(len(self.entries)),
+            key=lambda i: cosine(query_vector, self._vectors[i]),
+            reverse=True,
+        )
+        selected: list[Plan] = []
+        tokens = 0
+        for i in ranked:
+            if len(selected) == top_k:
+                break
+            if token_budget is not None and tokens + self.entries[i]["tokens"] > token_budget:
+                continue
+            selected.append(self._plans[i])
+            tokens += self.entries[i]["tokens"]
+        return selected
+
+
+def plan_with_examples(
+    portia: Portia,
+    query: str,
+    index: ExamplePlanIndex,
+    top_k: int = 3,
+    token_budget: int | None = 2000,
+) -> Plan:
+    """Plan a query, supplying the most relevant example plans from the index automatically."""
+    return portia.plan(
+        query, example_plans=index.search(query, top_k=top_k, token_budget=token_budget)
+    )
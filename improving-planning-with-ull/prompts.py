@@ -0,0 +1,30 @@
+"""
+prompts - The refund prompts used by the example scripts and the benchmarks.
+
+This code is not meant to be run directly.
+"""
+
+VAGUE_PROMPT = """
+Read the refund request email from the customer and decide if it should be approved or rejected.
+If you think the refund request should be approved, check with a human for final approval and then process the refund.
+
+To process the refund, you'll need to find the customer in Stripe and then find their payment intent.
+
+The refund policy can be found in the file: ./refund_policy.txt
+
+The refund request email can be found in "inbox.txt" file
+"""
+
+GOOD_PROMPT = """
+Read the refund request email from the customer and decide if it should be approved or rejected.
+If you think the refund request should be approved, check with a human for final approval and then process the refund.
+
+Stripe instructions -- To create a refund in Stripe, you need to:
+* Find the Customer using their email address from the List of Customers in Stripe.
+* Find the Payment Intent ID using the Customer from the previous step, from the List of Payment Intents in Stripe.
+* Create a refund against the Payment Intent ID.
+
+The refund policy can be found in the file: ./refund_policy.txt
+
+The refund request email can be found in "inbox.txt" file
+"""
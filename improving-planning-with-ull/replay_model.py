@@ -0,0 +1,140 @@
+"""
+replay_model - A generative model that records LLM responses to a cassette file and replays them offline.
+
+In "record" mode, every request is passed through to the wrapped model and the response, along with how long
+the real call took, is stored in the cassette under a hash of the request. In "replay" mode, responses are
+served from the cassette without any network access, so benchmarks are repeatable and free to run. A request
+that is not in the cassette fails loudly rather than silently calling the LLM.
+
+This code is not meant to be run directly.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, TypeVar
+
+from portia.model import GenerativeModel, Message
+from pydantic import BaseModel
+
+from example_index import count_tokens
+
+BaseModelT = TypeVar("BaseModelT", bound=BaseModel)
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when a request has not been recorded."""
+
+
+class ReplayLangchainError(RuntimeError):
+    """Raised in replay mode when a Langchain model is requested, as its calls would bypass the cassette."""
+
+
+def require_cassette(cassette_path: str, script: str) -> None:
+    """Fail fast in replay mode when nothing has been recorded yet, rather than failing every request."""
+    if not os.path.exists(cassette_path):
+        raise SystemExit(
+            f"No cassette at {cassette_path}. Run `uv run {script} --mode record` first "
+            "(it needs an LLM API key, and the tool snapshot from running "
+            "`uv run 02_ull_good_prompt_no_examples.py` once)."
+        )
+
+
+class ReplayModel(GenerativeModel):
+    """Record responses from a real model, or replay them from a cassette file."""
+
+    def __init__(
+        self, cassette_path: str, mode: str = REPLAY, model: GenerativeModel | None = None
+    ):
+        if mode == RECORD and model is None:
+            raise ValueError("A model to record from is required in record mode.")
+        super().__init__(model_name=model.model_name if model else "replay")
+        self.cassette_path = cassette_path
+        self.mode = mode
+        self.model = model
+        # Included in the request key, so that repeated runs of the same prompt can be recorded separately.
+        self.run_index = 0
+        self.prompt_tokens = 0
+        self.llm_seconds = 0.0
+        self.cassette: dict[str, dict[str, Any]] = {}
+        if os.path.exists(cassette_path):
+            with open(cassette_path, encoding="utf-8") as f:
+                self.cassette = json.load(f)
+
+    def __str__(self):
+        return f"replay/{self.model_name}"
+
+    def reset_usage(self) -> None:
+        self.prompt_tokens = 0
+        self.llm_seconds = 0.0
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.cassette_path) or ".", exist_ok=True)
+        with open(self.cassette_path, "w", encoding="utf-8") as f:
+            json.dump(self.cassette, f, indent=2)
+
+    def _key(self, messages: list[Message], schema: type[BaseModel] | None) -> str:
+        payload = json.dumps(
+            {
+                "run": self.run_index,
+                "schema": schema.__name__ if schema else None,
+                "messages": [[m.role, m.content] for m in messages],
+            }
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _call(self, messages: list[Message], schema: type[BaseModel] | None, call) -> str:
+        self.prompt_tokens += sum(count_tokens(str(m.content)) for m in messages)
+        key = self._key(messages, schema)
+        if self.mode == REPLAY:
+            if key not in self.cassette:
+                raise CassetteMissError(
+                    f"No recorded response for this request in {self.cassette_path}. "
+                    "Re-record the cassette with --mode record."
+                )
+        else:
+            start = time.perf_counter()
+            content = call()
+            self.cassette[key] = {
+                "content": content,
+                "latency": time.perf_counter() - start,
+            }
+        self.llm_seconds += self.cassette[key]["latency"]
+        return self.cassette[key]["content"]
+
+    def get_response(self, messages: list[Message]) -> Message:
+        content = self._call(
+            messages, None, lambda: str(self.model.get_response(messages).content)
+        )
+        return Message(role="assistant", content=content)
+
+    def get_structured_response(
+        self, messages: list[Message], schema: type[BaseModelT], **kwargs: Any
+    ) -> BaseModelT:
+        content = self._call(
+            messages,
+            schema,
+            lambda: self.model.get_structured_response(
+                messages, schema, **kwargs
+            ).model_dump_json(),
+        )
+        return schema.model_validate_json(content)
+
+    async def aget_response(self, messages: list[Message]) -> Message:
+        return self.get_response(messages)
+
+    async def aget_structured_response(
+        self, messages: list[Message], schema: type[BaseModelT], **kwargs: Any
+    ) -> BaseModelT:
+        return self.get_structured_response(messages, schema, **kwargs)
+
+    def to_langchain(self):
+        if self.model is None:
+            raise ReplayLangchainError(
+                "Langchain models can't be replayed from a cassette. Use --mode record to call the real model."
+            )
+        return self.model.to_langchain()
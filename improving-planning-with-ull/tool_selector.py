@@ -0,0 +1,89 @@
+"""
+tool_selector - Pick the tools that are relevant to a query before planning.
+
+`init_portia()` registers every Stripe MCP tool, every Portia cloud tool and the local mocks, so by default each
+planner call carries every tool description. The `ToolSelector` indexes the tool descriptions locally, as
+bags of words, and picks the top-k tools most relevant to the query, plus a set of pinned tools that are always
+included, so the planner only sees a small subset.
+
+This code is not meant to be run directly.
+"""
+
+import json
+import math
+import re
+from collections import Counter
+
+from portia import Portia, Tool, ToolRegistry
+from portia.plan import Plan
+
+from example_index import count_tokens
+
+# Tools that the refund plans always need, whatever the query says.
+DEFAULT_PINNED_TOOLS = ["file_reader_tool", "refund_reviewer", "human_approval"]
+
+SEPARATORS = re.compile(r"[_:.\-]")
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def tool_text(tool: Tool) -> str:
+    """The text that represents a tool in the index, with IDs split into words (e.g. create_refund)."""
+    return SEPARATORS.sub(" ", f"{tool.id} {tool.name} {tool.description}")
+
+
+def token_vector(text: str) -> dict[str, float]:
+    """The text's words, log-weighted by count and L2-normalised.
+
+    Even a large registry only has a few thousand distinct words in its descriptions, so the words are used as
+    the vector's keys directly, rather than hashed into buckets where unrelated words can collide.
+    """
+    counts = Counter(WORD.findall(text.lower()))
+    vector = {word: 1 + math.log(count) for word, count in counts.items()}
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {word: value / norm for word, value in vector.items()}
+
+
+def cosine(a: dict[str, float], b: dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(word, 0.0) for word, value in a.items())
+
+
+def tool_prompt_tokens(tools: list[Tool]) -> int:
+    """Estimate how many prompt tokens the planner spends describing the given tools."""
+    return sum(
+        count_tokens(
+            f"{tool.id} {tool.name} {tool.description} "
+            + json.dumps(tool.args_schema.model_json_schema())
+        )
+        for tool in tools
+    )
+
+
+class ToolSelector:
+    """A local relevance index over the tools in a registry."""
+
+    def __init__(
+        self, tools: ToolRegistry, pinned: list[str] = DEFAULT_PINNED_TOOLS
+    ):
+        self.tools = tools.get_tools()
+        self.pinned = [tool for tool in self.tools if tool.id in pinned]
+        self.pinned_ids = {tool.id for tool in self.pinned}
+        self._vectors = [token_vector(tool_text(tool)) for tool in self.tools]
+
+    def select(self, query: str, top_k: int = 8) -> list[Tool]:
+        """Return the pinned tools plus the top_k tools most relevant to the query."""
+        query_vector = token_vector(query)
+        ranked = sorted(
+            (i for i, tool in enumerate(self.tools) if tool.id not in self.pinned_ids),
+            key=lambda i: cosine(query_vector, self._vectors[i]),
+            reverse=True,
+        )
+        return self.pinned + [self.tools[i] for i in ranked[:top_k]]
+
+
+def plan_with_tool_subset(
+    portia: Portia, query: str, selector: ToolSelector, top_k: int = 8, **kwargs
+) -> Plan:
+    """Plan a query with only the tools that the selector picks as relevant."""
+    return portia.plan(query, tools=selector.select(query, top_k=top_k), **kwargs)
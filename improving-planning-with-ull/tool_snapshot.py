@@ -0,0 +1,115 @@
+"""
+tool_snapshot - Cache tool schemas on disk so that planning-only scripts start up instantly.
+
+Building the tool registry spawns the Stripe MCP server and fetches the Portia cloud tools, which takes several
+seconds - even for scripts that only plan and never execute a tool. Planning only needs each tool's ID,
+description and argument schema, so this module serialises those to a local snapshot file, along with a
+fingerprint of everything that determines which tools are available.
+
+When the fingerprint matches, `load_snapshot_registry` returns a registry of lightweight `SnapshotTool`s built
+from the file in milliseconds. The live registry is only built if one of those tools is actually run.
+
+This code is not meant to be run directly.
+"""
+
+import functools
+import hashlib
+import importlib.metadata
+import json
+import os
+import time
+from typing import Any, Callable
+
+from portia import InMemoryToolRegistry, Tool, ToolRegistry, ToolRunContext
+from portia.tool_registry import generate_pydantic_model_from_json_schema
+from pydantic import Field
+
+DEFAULT_SNAPSHOT_PATH = ".portia/tool_snapshot.json"
+DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def fingerprint(*parts: Any) -> str:
+    """Fingerprint the inputs that determine the available tools.
+
+    Secrets (e.g. API keys) should be passed in as they are - only their hash ends up in the fingerprint.
+    """
+    payload = json.dumps(
+        [SNAPSHOT_FORMAT_VERSION, importlib.metadata.version("portia-sdk-python"), *parts],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SnapshotTool(Tool[Any]):
+    """A tool loaded from a snapshot. Running it builds the live registry and runs the real tool."""
+
+    live_registry: Callable[[], ToolRegistry] = Field(exclude=True)
+
+    def run(self, ctx: ToolRunContext, **kwargs: Any) -> Any:
+        return self.live_registry().get_tool(self.id).run(ctx, **kwargs)
+
+
+def save_snapshot(
+    tools: ToolRegistry, tools_fingerprint: str, path: str = DEFAULT_SNAPSHOT_PATH
+) -> None:
+    """Serialise the IDs, descriptions and schemas of the tools in the registry."""
+    snapshot = {
+        "fingerprint": tools_fingerprint,
+        "created_at": time.time(),
+        "tools": [
+            {
+                "id": tool.id,
+                "name": tool.name,
+                "description": tool.description,
+                "args_schema": tool.args_schema.model_json_schema(),
+                "output_schema": list(tool.output_schema),
+            }
+            for tool in tools.get_tools()
+        ],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+
+
+def load_snapshot_registry(
+    tools_fingerprint: str | None,
+    live_registry: Callable[[], ToolRegistry],
+    path: str = DEFAULT_SNAPSHOT_PATH,
+    max_age_seconds: float | None = DEFAULT_MAX_AGE_SECONDS,
+) -> ToolRegistry | None:
+    """Load a registry from the snapshot, or return None if it is missing, stale or for different tools.
+
+    Passing None for the fingerprint or maximum age skips that check, e.g. to plan fully offline.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if tools_fingerprint is not None and snapshot.get("fingerprint") != tools_fingerprint:
+        return None
+    if (
+        max_age_seconds is not None
+        and time.time() - snapshot.get("created_at", 0) > max_age_seconds
+    ):
+        return None
+
+    # Only ever build the live registry once, however many snapshot tools end up being run.
+    live_registry = functools.cache(live_registry)
+    return InMemoryToolRegistry.from_local_tools(
+        [
+            SnapshotTool(
+                id=tool["id"],
+                name=tool["name"],
+                description=tool["description"],
+                args_schema=generate_pydantic_model_from_json_schema(
+                    f"{tool['id']}_args", tool["args_schema"]
+                ),
+                output_schema=tuple(tool["output_schema"]),
+                live_registry=live_registry,
+            )
+            for tool in snapshot["tools"]
+        ]
+    )
@@ -0,0 +1,280 @@
+"""
+approval_queue - Park refund approvals in a local queue instead of blocking on a terminal prompt.
+
+With `CLIExecutionHooks`, every `create_refund` call waits for a human to type 'y' before the plan run can
+continue, so the agent can only go as fast as one operator can answer. The `ApprovalQueue` instead records
+each approval clarification in a local SQLite store and lets the plan run suspend in the
+`NEED_CLARIFICATION` state. A reviewer can then approve or reject many refunds at once, after which the
+affected plan runs are resumed in parallel.
+
+Queue refunds by running the agent with `--queue`:
+
+    uv run refund_agent.py --email "<stripe-email>" --queue
+
+Then review them in batch:
+
+    uv run approval_queue.py list
+    uv run approval_queue.py approve --all
+    uv run approval_queue.py reject <clarification-id> <clarification-id>
+    uv run approval_queue.py stats
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+from portia import Clarification, PlanRun, PlanRunState, Portia, Tool, logger
+from portia.execution_hooks import clarify_on_tool_calls
+from portia.plan import Step
+
+DEFAULT_QUEUE_PATH = ".portia/approvals.sqlite"
+
+PENDING = "PENDING"
+APPROVED = "APPROVED"
+REJECTED = "REJECTED"
+
+
+@dataclass
+class PendingApproval:
+    """A tool call that is waiting for a human decision."""
+
+    clarification_id: str
+    plan_run_id: str
+    tool_id: str
+    tool_args: dict[str, Any]
+    user_guidance: str
+    status: str
+    created_at: float
+    decided_at: float | None
+    resumed_at: float | None
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.decided_at or time.time()) - self.created_at
+
+    def __str__(self):
+        return (
+            f"{self.clarification_id} [{self.status}] plan run {self.plan_run_id}\n"
+            f"  {self.tool_id}({json.dumps(self.tool_args)})\n"
+            f"  {self.user_guidance}"
+        )
+
+
+class ApprovalQueue:
+    """A local SQLite store of tool calls that are waiting for human approval."""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS approvals (
+                    clarification_id TEXT PRIMARY KEY,
+                    plan_run_id TEXT NOT NULL,
+                    tool_id TEXT NOT NULL,
+                    tool_args TEXT NOT NULL,
+                    user_guidance TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    decided_at REAL,
+                    resumed_at REAL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation keeps the queue safe to use from the resume worker threads.
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def clarify_on_tool_calls(
+        self, tool: str | list[str]
+    ) -> Callable[[Tool, dict[str, Any], PlanRun, Step], Clarification | None]:
+        """A `before_tool_call` hook that raises an approval clarification and parks it in the queue.
+
+        This is a drop-in replacement for `portia.execution_hooks.clarify_on_tool_calls`. Use it with an
+        `ExecutionHooks` that has no clarification handler so that the plan run suspends rather than
+        waiting for an answer.
+        """
+        clarify = clarify_on_tool_calls(tool)
+
+        def before_tool_call(
+            tool: Tool, args: dict[str, Any], plan_run: PlanRun, step: Step
+        ) -> Clarification | None:
+            clarification = clarify(tool, args, plan_run, step)
+            if clarification is not None:
+                self.park(clarification, tool.id, args)
+            return clarification
+
+        return before_tool_call
+
+    def park(
+        self, clarification: Clarification, tool_id: str, tool_args: dict[str, Any]
+    ) -> None:
+        """Record a pending approval. Parking the same clarification twice is a no-op."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO approvals VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL)",
+                (
+                    str(clarification.id),
+                    str(clarification.plan_run_id),
+                    tool_id,
+                    json.dumps(tool_args, default=str),
+                    clarification.user_guidance,
+                    PENDING,
+                    time.time(),
+                ),
+            )
+
+    def approvals(self, status: str | None = None) -> list[PendingApproval]:
+        """List the approvals in the queue, oldest first."""
+        query = "SELECT * FROM approvals"
+        params: tuple[str, ...] = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query + " ORDER BY created_at", params).fetchall()
+        return [
+            PendingApproval(**{**dict(row), "tool_args": json.loads(row["tool_args"])})
+            for row in rows
+        ]
+
+    def decide(self, clarification_ids: list[str], status: str) -> list[str]:
+        """Approve or reject pending approvals, returning the IDs that were updated."""
+        decided = []
+        with closing(self._connect()) as conn, conn:
+            for clarification_id in clarification_ids:
+                cursor = conn.execute(
+                    "UPDATE approvals SET status = ?, decided_at = ? "
+                    "WHERE clarification_id = ? AND status = ?",
+                    (status, time.time(), clarification_id, PENDING),
+                )
+                if cursor.rowcount:
+                    decided.append(clarification_id)
+        return decided
+
+    def mark_resumed(self, clarification_id: str) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE approvals SET resumed_at = ? WHERE clarification_id = ?",
+                (time.time(), clarification_id),
+            )
+
+    def to_resume(self) -> list[PendingApproval]:
+        """Approvals that have been decided but whose plan run has not been resumed yet."""
+        return [
+            approval
+            for approval in self.approvals()
+            if approval.status != PENDING and approval.resumed_at is None
+        ]
+
+    def wait_time_report(self) -> dict[str, float | int]:
+        """Summarise how long approvals have waited in the queue, in seconds."""
+        approvals = self.approvals()
+        decided = [a.wait_seconds for a in approvals if a.status != PENDING]
+        pending = [a.wait_seconds for a in approvals if a.status == PENDING]
+        return {
+            "pending": len(pending),
+            "approved": sum(a.status == APPROVED for a in approvals),
+            "rejected": sum(a.status == REJECTED for a in approvals),
+            "mean_wait": statistics.fmean(decided) if decided else 0.0,
+            "median_wait": statistics.median(decided) if decided else 0.0,
+            "max_wait": max(decided, default=0.0),
+            "oldest_pending": max(pending, default=0.0),
+        }
+
+
+def resume_decided(portia: Portia, queue: ApprovalQueue, max_workers: int = 8) -> list[PlanRun]:
+    """Resolve the clarifications for every decided approval and resume the plan runs in parallel.
+
+    An approval is only marked as resumed once its plan run has been resumed, so approvals whose resume
+    failed are picked up again by the next call.
+    """
+
+    def resume(approval: PendingApproval) -> PlanRun | None:
+        plan_run = portia.storage.get_plan_run(approval.plan_run_id)
+        clarification = next(
+            (
+                c
+                for c in plan_run.get_outstanding_clarifications()
+                if str(c.id) == approval.clarification_id
+            ),
+            None,
+        )
+        if clarification is not None:
+            plan_run = portia.resolve_clarification(
+                clarification, approval.status == APPROVED, plan_run
+            )
+        elif plan_run.state != PlanRunState.READY_TO_RESUME:
+            # Already resolved and resumed elsewhere, or the plan run has moved on.
+            logger().warning(
+                f"Skipping approval {approval.clarification_id}: its clarification is not outstanding "
+                f"and plan run {approval.plan_run_id} is {plan_run.state}"
+            )
+            return None
+        # Otherwise an earlier attempt resolved the clarification but never resumed the plan run.
+        try:
+            plan_run = portia.resume(plan_run)
+        except Exception as e:
+            logger().error(f"Failed to resume plan run {approval.plan_run_id}, it will be retried: {e}")
+            return None
+        queue.mark_resumed(approval.clarification_id)
+        return plan_run
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        plan_runs = executor.map(resume, queue.to_resume())
+        return [plan_run for plan_run in plan_runs if plan_run is not None]
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queue-path", type=str, default=DEFAULT_QUEUE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the pending approvals.")
+    subparsers.add_parser("stats", help="Report approval queue wait times.")
+    for command in ("approve", "reject"):
+        subparser = subparsers.add_parser(
+            command, help=f"{command.capitalize()} approvals and resume their plan runs."
+        )
+        subparser.add_argument("clarification_ids", nargs="*")
+        subparser.add_argument("--all", action="store_true")
+        subparser.add_argument("--workers", type=int, default=8)
+
+    args = parser.parse_args()
+    queue = ApprovalQueue(args.queue_path)
+
+    if args.command == "list":
+        for approval in queue.approvals(PENDING):
+            print(approval)
+    elif args.command == "stats":
+        for key, value in queue.wait_time_report().items():
+            print(f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}")
+    else:
+        ids = (
+            [a.clarification_id for a in queue.approvals(PENDING)]
+            if args.all
+            else args.clarification_ids
+        )
+        status = APPROVED if args.command == "approve" else REJECTED
+        decided = queue.decide(ids, status)
+        print(f"{status.lower().capitalize()} {len(decided)} refund(s). Resuming plan runs...")
+
+        from refund_agent import get_portia
+
+        plan_runs = resume_decided(
+            get_portia(approval_queue=queue), queue, max_workers=args.workers
+        )
+        for plan_run in plan_runs:
+            print(f"{plan_run.id}: {plan_run.state}")
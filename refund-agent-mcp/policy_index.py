@@ -0,0 +1,227 @@
+"""
+policy_index - Split the refund policy into numbered sections and retrieve only the ones a request needs.
+
+Embedding the whole refund policy into every review prompt is fine for the short mock policy in this
+directory, but real policies are much longer and quickly dominate the prompt. The `PolicyIndex` splits a
+policy into its numbered `### N. Title` sections once (the index is cached by content hash) and scores each
+section against the refund request with a small keyword model, so the reviewer only sees the relevant parts.
+
+The assembled prompt is deterministic: the reviewer instructions always come first and the selected sections
+are rendered in policy order, so identical requests produce byte-identical prompts and the shared prefix is
+friendly to provider-side prompt caching.
+
+Run this file directly to compare the token count of the retrieved prompt against the full-policy prompt:
+
+    uv run policy_index.py --request "I dropped my hoverboard in the flux-capacitor, can I get a refund?"
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import tiktoken
+
+REVIEWER_INSTRUCTIONS = (
+    "You are a helpful assistant that carefully reviews refund requests from customers against "
+    "the refund policy, and provides a break down of your reasoning about what the decision should be.\n"
+    "Following your detailed analysis, you will respond with a single word: 'APPROVED' or 'REJECTED' on a new line.\n"
+)
+
+# Eligibility rules apply to every refund request, so the section is always sent to the reviewer.
+DEFAULT_PINNED_SECTIONS = (1,)
+DEFAULT_TOP_K = 3
+# The tokenizer used to size prompts in the token report.
+PROMPT_TOKENIZER = "cl100k_base"
+
+SECTION_HEADING = re.compile(r"^#{2,4}\s*(\d+)\.\s*(.+?)\s*$", re.MULTILINE)
+WORD = re.compile(r"[a-z]+")
+STOPWORDS = frozenset(
+    """
+    a about after all also an and any are as at be been before but by can do does for from get had has have
+    hi i if in into is it its may me my no not of on or our please so than that the their then there these
+    this those to up us was we were what when which will with within would you your thanks
+    """.split()
+)
+
+
+def _stem(word: str) -> str:
+    """A deliberately tiny suffix stripper - enough to match 'refunds'/'refunded'/'refund'."""
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def _terms(text: str) -> list[str]:
+    return [_stem(word) for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def prompt_tokens(prompt: str) -> int:
+    """The size of a reviewer prompt in PROMPT_TOKENIZER tokens."""
+    return len(tiktoken.get_encoding(PROMPT_TOKENIZER).encode(prompt))
+
+
+@dataclass(frozen=True)
+class PolicySection:
+    """A single numbered section of the refund policy."""
+
+    number: int
+    title: str
+    text: str
+
+    def __str__(self):
+        return self.text
+
+
+class PolicyIndex:
+    """A keyword index over the numbered sections of a refund policy."""
+
+    _cache: dict[str, "PolicyIndex"] = {}
+
+    def __init__(self, policy: str):
+        self.policy = policy
+        self.sections = self._split(policy)
+        self._section_terms = {
+            section.number: Counter(_terms(section.title) * 2 + _terms(section.text))
+            for section in self.sections
+        }
+        document_frequency = Counter(
+            term for terms in self._section_terms.values() for term in terms
+        )
+        self._idf = {
+            term: math.log(1 + len(self.sections) / frequency)
+            for term, frequency in document_frequency.items()
+        }
+
+    @classmethod
+    def from_text(cls, policy: str) -> "PolicyIndex":
+        """Return the (cached) index for the given policy text."""
+        key = hashlib.sha256(policy.encode("utf-8")).hexdigest()
+        if key not in cls._cache:
+            cls._cache[key] = cls(policy)
+        return cls._cache[key]
+
+    @classmethod
+    def from_file(cls, path: str) -> "PolicyIndex":
+        """Return the (cached) index for the policy stored in the given file."""
+        with open(path, encoding="utf-8") as f:
+            return cls.from_text(f.read())
+
+    @staticmethod
+    def _split(policy: str) -> list[PolicySection]:
+        matches = list(SECTION_HEADING.finditer(policy))
+        sections = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(policy)
+            text = policy[match.start() : end].strip().removesuffix("---").strip()
+            sections.append(
+                PolicySection(number=int(match.group(1)), title=match.group(2), text=text)
+            )
+        return sections
+
+    def score(self, refund_request: str) -> dict[int, float]:
+        """Score every section against the request (higher is more relevant)."""
+        request_terms = set(_terms(refund_request))
+        return {
+            number: sum(
+                self._idf[term] * (1 + math.log(terms[term]))
+                for term in request_terms
+                if term in terms
+            )
+            for number, terms in self._section_terms.items()
+        }
+
+    def retrieve(
+        self,
+        refund_request: str,
+        top_k: int = DEFAULT_TOP_K,
+        pinned: tuple[int, ...] = DEFAULT_PINNED_SECTIONS,
+    ) -> list[PolicySection]:
+        """Return the pinned sections plus the top_k best scoring ones, in policy order."""
+        if not self.sections:
+            # Unstructured policy - there is nothing to select from, so keep all of it.
+            return [PolicySection(number=0, title="Refund Policy", text=self.policy)]
+        scores = self.score(refund_request)
+        ranked = sorted(
+            (number for number, score in scores.items() if score > 0),
+            key=lambda number: (-scores[number], number),
+        )
+        selected = set(ranked[:top_k]) | {
+            number for number in pinned if number in scores
+        }
+        return [section for section in self.sections if section.number in selected]
+
+    def render(self, refund_request: str, top_k: int = DEFAULT_TOP_K) -> str:
+        """Render the relevant policy sections as text to be passed to the reviewer."""
+        return "\n\n".join(str(s) for s in self.retrieve(refund_request, top_k=top_k))
+
+
+def build_reviewer_prompt(
+    refund_policy: str, refund_request: str, top_k: int = DEFAULT_TOP_K
+) -> str:
+    """Build the system prompt for the refund reviewer from the relevant policy sections only."""
+    sections = PolicyIndex.from_text(refund_policy).render(refund_request, top_k=top_k)
+    return (
+        REVIEWER_INSTRUCTIONS
+        + "The relevant sections of the refund policy are as follows:\n"
+        + f"{sections}\n"
+    )
+
+
+def build_full_policy_prompt(refund_policy: str) -> str:
+    """Build the original system prompt, which embeds the whole refund policy."""
+    return REVIEWER_INSTRUCTIONS + "The refund policy is as follows:\n" + f"{refund_policy}\n"
+
+
+def retrieve_policy_sections(
+    policy_path: str, refund_request: str, top_k: int = DEFAULT_TOP_K
+) -> str:
+    """Read the policy file and return only the sections relevant to the refund request."""
+    return PolicyIndex.from_file(policy_path).render(refund_request, top_k=top_k)
+
+
+def token_report(
+    refund_policy: str, refund_request: str, top_k: int = DEFAULT_TOP_K
+) -> dict[str, int | float | list[int]]:
+    """Compare the size of the retrieved prompt with the full-policy prompt."""
+    index = PolicyIndex.from_text(refund_policy)
+    full_tokens = prompt_tokens(build_full_policy_prompt(refund_policy))
+    retrieved_tokens = prompt_tokens(
+        build_reviewer_prompt(refund_policy, refund_request, top_k=top_k)
+    )
+    return {
+        "sections": [s.number for s in index.retrieve(refund_request, top_k=top_k)],
+        "full_tokens": full_tokens,
+        "retrieved_tokens": retrieved_tokens,
+        "saving": round(1 - retrieved_tokens / full_tokens, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--policy",
+        type=str,
+        default=os.path.join(os.path.dirname(__file__), "refund_policy.txt"),
+    )
+    parser.add_argument(
+        "--request",
+        type=str,
+        default="I bought one of your hoverboards 3 days ago. "
+        "When I took it out of the box and turned it on, "
+        "it did not work. Please can I get a refund?",
+    )
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    args = parser.parse_args()
+
+    with open(args.policy, encoding="utf-8") as f:
+        report = token_report(f.read(), args.request, top_k=args.top_k)
+    print(f"Token counts use tiktoken's {PROMPT_TOKENIZER} encoding.")
+    print(f"Selected sections:         {report['sections']}")
+    print(f"Full-policy prompt tokens: {report['full_tokens']}")
+    print(f"Retrieved prompt tokens:   {report['retrieved_tokens']}")
+    print(f"Saving:                    {report['saving']:.1%}")
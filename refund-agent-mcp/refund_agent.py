@@ -5,9 +5,11 @@ from dotenv import load_dotenv
 
 from portia import (
     DefaultToolRegistry,
+    ExecutionHooks,
     InMemoryToolRegistry,
     Portia,
     Config,
+    StorageClass,
     Tool,
     ToolHardError,
     ToolRunContext,
@@ -17,6 +19,10 @@ from portia.cli import CLIExecutionHooks
 from pydantic import BaseModel, Field
 from portia.execution_hooks import clarify_on_tool_calls
 
+from approval_queue import ApprovalQueue
+from policy_index import build_reviewer_prompt
+from refund_ledger import with_refund_ledger
+
 
 class RefundReviewerInput(BaseModel):
     """Input for the RefundReviewerTool."""
@@ -63,11 +69,8 @@ class RefundReviewerTool(Tool[str]):
         messages = [
             Message(
                 role="system",
-                content="You are a helpful assistant that carefully reviews refund requests from customers against "
-                "the refund policy, and provides a break down of your reasoning about what the decision should be.\n"
-                "Following your detailed analysis, you will respond with a single word: 'APPROVED' or 'REJECTED' on a new line.\n"
-                "The refund policy is as follows:\n"
-                f"{refund_policy}\n",
+                # Only the policy sections relevant to this request are sent to the LLM.
+                content=build_reviewer_prompt(refund_policy, refund_request),
             ),
             Message(
                 role="user",
@@ -84,8 +87,15 @@ class RefundReviewerTool(Tool[str]):
             raise ToolHardError("Invalid LLM decision: " + llm_decision)
 
 
-def get_portia() -> Portia:
+def get_portia(approval_queue: ApprovalQueue | None = None) -> Portia:
     config = Config.from_default(default_log_level="INFO")
+    if approval_queue and config.storage_class == StorageClass.MEMORY:
+        # Queued plan runs are resumed from another process, so they must outlive this one.
+        config = Config.from_default(
+            default_log_level="INFO",
+            storage_class=StorageClass.DISK,
+            storage_dir=".portia/runs",
+        )
 
     tools = DefaultToolRegistry(
         config=config,
@@ -109,24 +119,36 @@ def get_portia() -> Portia:
             "`reason` is optional - if none of the above are valid, leave it out."
         ),
     )
+    # Retried or concurrent plan runs must never refund the same payment twice.
+    with_refund_ledger(tools, "portia:mcp:mcp.stripe.com:create_refund")
 
-    portia = Portia(
-        config=config,
-        tools=tools,
-        execution_hooks=CLIExecutionHooks(
+    if approval_queue:
+        # No clarification handler: the plan run suspends until the refund is approved in batch.
+        execution_hooks = ExecutionHooks(
+            before_tool_call=approval_queue.clarify_on_tool_calls(
+                "portia:mcp:mcp.stripe.com:create_refund"
+            )
+        )
+    else:
+        execution_hooks = CLIExecutionHooks(
             before_tool_call=clarify_on_tool_calls(
                 "portia:mcp:mcp.stripe.com:create_refund"
             )
-        ),
+        )
+
+    portia = Portia(
+        config=config,
+        tools=tools,
+        execution_hooks=execution_hooks,
     )
     return portia
 
 
-def main(customer_email: str):
+def main(customer_email: str, queue: bool = False):
     with open("inbox.txt", "w") as f:
         f.write(customer_email)
 
-    portia = get_portia()
+    portia = get_portia(approval_queue=ApprovalQueue() if queue else None)
     plan = portia.plan(
         """
 Read the customer's refund request email from the file "inbox.txt" and decide if it should be
@@ -142,7 +164,12 @@ Stripe instructions -- To process a refund in Stripe, you need to:
     )
     print("Plan:")
     print(plan.pretty_print())
-    portia.run_plan(plan)
+    plan_run = portia.run_plan(plan)
+    if queue and plan_run.get_outstanding_clarifications():
+        print(
+            f"Refund for plan run {plan_run.id} is waiting for approval. "
+            "Review it with `uv run approval_queue.py list`."
+        )
 
 
 if __name__ == "__main__":
@@ -162,6 +189,11 @@ if __name__ == "__main__":
         "When I took it out of the box and turned it on, "
         "it did not work. Please can I get a refund?",
     )
+    parser.add_argument(
+        "--queue",
+        action="store_true",
+        help="Park the refund in the approval queue instead of asking for approval on the command line.",
+    )
 
     args = parser.parse_args()
     main(f"""---header---
@@ -175,4 +207,6 @@ if __name__ == "__main__":
 
         Thanks,
         Marty McFly
-        ---body---""")
+        ---body---""",
+        queue=args.queue,
+    )
@@ -12,6 +12,9 @@ from portia.portia import Portia
 from portia.tool_registry import DefaultToolRegistry
 from pydantic import BaseModel, Field
 
+from policy_index import retrieve_policy_sections
+from refund_ledger import with_refund_ledger
+
 load_dotenv(override=True)
 
 
@@ -70,6 +73,8 @@ def main(customer_email: str):
         "The amount should be provided in cents without any decimal points, e.g 10.00 should be 1000. \
         The refund_reason should ONLY be one of the following:  duplicate, fraudulent, or requested_by_customer ",
     )
+    # Re-running this plan must never refund the same payment intent twice.
+    with_refund_ledger(tools, "portia:mcp:mcp.stripe.com:create_refund")
 
     portia = Portia(config=config, tools=tools, execution_hooks=CLIExecutionHooks())
     plan = (
@@ -79,11 +84,6 @@ def main(customer_email: str):
             description="The limit of the payment amount to be refunded.",
             default_value=1000,
         )
-        .invoke_tool_step(
-            step_name="read_refund_policy",
-            args={"filename": "./refund_policy.txt"},
-            tool="file_reader_tool",
-        )
         # Uncomment if you would instead like to read from an email
         # .single_tool_agent_step(
         #     step_name="read_refund_request",
@@ -95,6 +95,16 @@ def main(customer_email: str):
             args={"filename": "inbox.txt"},
             tool="file_reader_tool",
         )
+        # Rather than passing the whole policy file to the LLM, only pass the sections
+        # that are relevant to the refund request.
+        .function_step(
+            step_name="read_refund_policy",
+            function=retrieve_policy_sections,
+            args={
+                "policy_path": "./refund_policy.txt",
+                "refund_request": StepOutput("read_refund_request"),
+            },
+        )
         .llm_step(
             step_name="llm_refund_review",
             task="Review the refund request against the refund policy. \
@@ -19,6 +19,9 @@ from portia.cli import CLIExecutionHooks
 from pydantic import BaseModel, Field
 from portia.execution_hooks import clarify_on_tool_calls
 
+from policy_index import build_reviewer_prompt
+from refund_ledger import with_refund_ledger
+
 
 class RefundReviewerInput(BaseModel):
     """Input for the RefundReviewerTool."""
@@ -65,11 +68,8 @@ class RefundReviewerTool(Tool[str]):
         messages = [
             Message(
                 role="system",
-                content="You are a helpful assistant that carefully reviews refund requests from customers against "
-                "the refund policy, and provides a break down of your reasoning about what the decision should be.\n"
-                "Following your detailed analysis, you will respond with a single word: 'APPROVED' or 'REJECTED' on a new line.\n"
-                "The refund policy is as follows:\n"
-                f"{refund_policy}\n",
+                # Only the policy sections relevant to this request are sent to the LLM.
+                content=build_reviewer_prompt(refund_policy, refund_request),
             ),
             Message(
                 role="user",
@@ -110,6 +110,8 @@ def main(customer_email: str):
         )
         + InMemoryToolRegistry.from_local_tools([RefundReviewerTool()])
     )
+    # Retried or concurrent plan runs must never refund the same payment twice.
+    with_refund_ledger(tools, "mcp:stripe:create_refund")
 
     portia = Portia(
         config=config,
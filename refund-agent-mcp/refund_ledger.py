@@ -0,0 +1,240 @@
+"""
+refund_ledger - Make `create_refund` idempotent so retried or concurrent plan runs never refund twice.
+
+Re-running a refund plan (or running many of them concurrently with retries) can reach the `create_refund`
+step more than once for the same payment intent. The `RefundLedger` is a local SQLite record of every refund
+call, keyed by payment intent and a hash of the request arguments, and `IdempotentRefundTool` wraps the Stripe
+refund tool with it:
+
+- An identical request that has already completed returns the stored result without calling Stripe.
+- A request for a payment intent that is already being refunded (an in-flight lock held by another run) or
+  has already been refunded with different arguments fails with a `ToolHardError` rather than paying twice.
+- The arguments are validated against the refund tool's schema before the lock is taken, so a request that
+  could never be sent doesn't lock anything.
+- If the Stripe call fails once it has been sent, there's no telling whether Stripe made the refund (a timeout
+  or dropped connection can come after the refund went through), so the entry is marked UNKNOWN and further
+  refunds for that payment intent are refused until someone has checked.
+
+An UNKNOWN entry, or a lock left behind by a crashed process, must be checked against Stripe and released by
+hand:
+
+    uv run refund_ledger.py list
+    uv run refund_ledger.py release <payment-intent-id>
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Any
+
+from portia import Tool, ToolHardError, ToolRegistry, ToolRunContext
+from pydantic import ValidationError
+
+DEFAULT_LEDGER_PATH = ".portia/refund_ledger.sqlite"
+
+IN_FLIGHT = "IN_FLIGHT"
+COMPLETED = "COMPLETED"
+# The Stripe call failed after it was sent, so the refund may or may not have been made.
+UNKNOWN = "UNKNOWN"
+
+
+def request_hash(args: dict[str, Any]) -> str:
+    """A stable hash of the refund arguments, ignoring unset optional fields."""
+    canonical = json.dumps(
+        {key: value for key, value in args.items() if value is not None},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RefundLedger:
+    """A local SQLite record of refund calls and the in-flight locks protecting them."""
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS refunds (
+                    payment_intent TEXT NOT NULL,
+                    request_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    result TEXT,
+                    started_at REAL NOT NULL,
+                    completed_at REAL,
+                    PRIMARY KEY (payment_intent, request_hash)
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # isolation_level=None lets us take the write lock explicitly with BEGIN IMMEDIATE.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self, payment_intent: str, key: str) -> tuple[str, Any]:
+        """Take the in-flight lock for a refund.
+
+        Returns ("acquired", owner) when the caller should go ahead and call Stripe, or ("completed", result)
+        when the identical refund has already been made. Raises a ToolHardError if the payment intent is
+        locked by another run or has already been refunded with different arguments.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT * FROM refunds WHERE payment_intent = ?", (payment_intent,)
+                ).fetchall()
+                for row in rows:
+                    if row["request_hash"] == key and row["status"] == COMPLETED:
+                        conn.execute("COMMIT")
+                        return "completed", json.loads(row["result"])
+                    if row["status"] == IN_FLIGHT:
+                        raise ToolHardError(
+                            f"A refund for payment intent {payment_intent} is already in flight "
+                            f"(started {time.ctime(row['started_at'])}). Not refunding again."
+                        )
+                    if row["status"] == UNKNOWN:
+                        raise ToolHardError(
+                            f"An earlier refund for payment intent {payment_intent} failed after it was "
+                            "sent to Stripe, so it may have gone through. Check in Stripe, then run "
+                            f"`uv run refund_ledger.py release {payment_intent}` before retrying."
+                        )
+                    raise ToolHardError(
+                        f"Payment intent {payment_intent} has already been refunded with different "
+                        "arguments. Not refunding again."
+                    )
+                owner = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO refunds VALUES (?, ?, ?, ?, NULL, ?, NULL)",
+                    (payment_intent, key, IN_FLIGHT, owner, time.time()),
+                )
+                conn.execute("COMMIT")
+                return "acquired", owner
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def complete(self, payment_intent: str, key: str, owner: str, result: Any) -> None:
+        """Store the result of a refund and turn its lock into a completed entry."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE refunds SET status = ?, result = ?, completed_at = ? "
+                "WHERE payment_intent = ? AND request_hash = ? AND owner = ?",
+                (COMPLETED, json.dumps(result, default=str), time.time(), payment_intent, key, owner),
+            )
+
+    def mark_unknown(self, payment_intent: str, key: str, owner: str) -> None:
+        """Keep the lock of a refund whose outcome is unknown until it has been checked and released by hand."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE refunds SET status = ?, completed_at = ? "
+                "WHERE payment_intent = ? AND request_hash = ? AND owner = ?",
+                (UNKNOWN, time.time(), payment_intent, key, owner),
+            )
+
+    def release(self, payment_intent: str) -> int:
+        """Drop the in-flight and unknown entries for a payment intent, once Stripe shows no refund was made."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "DELETE FROM refunds WHERE payment_intent = ? AND status IN (?, ?)",
+                (payment_intent, IN_FLIGHT, UNKNOWN),
+            ).rowcount
+
+    def entries(self) -> list[dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            return [
+                dict(row)
+                for row in conn.execute("SELECT * FROM refunds ORDER BY started_at")
+            ]
+
+
+class IdempotentRefundTool(Tool[Any]):
+    """Wraps a refund tool so that each refund is made at most once, as recorded in the RefundLedger."""
+
+    refund_tool: Tool
+    ledger_path: str = DEFAULT_LEDGER_PATH
+
+    @classmethod
+    def wrap(cls, refund_tool: Tool, ledger_path: str = DEFAULT_LEDGER_PATH) -> "IdempotentRefundTool":
+        """Create a wrapper that presents exactly the same interface as the wrapped tool."""
+        return cls(
+            id=refund_tool.id,
+            name=refund_tool.name,
+            description=refund_tool.description,
+            args_schema=refund_tool.args_schema,
+            output_schema=refund_tool.output_schema,
+            refund_tool=refund_tool,
+            ledger_path=ledger_path,
+        )
+
+    def run(self, ctx: ToolRunContext, **kwargs: Any) -> Any:
+        payment_intent = kwargs.get("payment_intent")
+        if not payment_intent:
+            # The ledger is keyed by payment intent, so without one the refund can't be made idempotent.
+            raise ToolHardError("Refusing to refund without a payment_intent")
+        payment_intent = str(payment_intent)
+        try:
+            # Catch bad arguments here, where nothing has been locked or sent yet.
+            self.refund_tool.args_schema.model_validate(kwargs)
+        except ValidationError as e:
+            raise ToolHardError(f"Invalid refund arguments: {e}") from e
+        ledger = RefundLedger(self.ledger_path)
+        key = request_hash(kwargs)
+
+        status, value = ledger.acquire(payment_intent, key)
+        if status == "completed":
+            return value
+
+        try:
+            result = self.refund_tool.run(ctx, **kwargs)
+        except BaseException:
+            ledger.mark_unknown(payment_intent, key, value)
+            raise
+        ledger.complete(payment_intent, key, value, result)
+        return result
+
+
+def with_refund_ledger(
+    tools: ToolRegistry, tool_id: str, ledger_path: str = DEFAULT_LEDGER_PATH
+) -> ToolRegistry:
+    """Replace the refund tool in the registry with its idempotent wrapper."""
+    tools.with_tool(
+        IdempotentRefundTool.wrap(tools.get_tool(tool_id), ledger_path),
+        overwrite=True,
+    )
+    return tools
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ledger-path", type=str, default=DEFAULT_LEDGER_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List every refund recorded in the ledger.")
+    release_parser = subparsers.add_parser(
+        "release",
+        help="Release a stale in-flight or unknown entry. Check in Stripe that the refund was not made first!",
+    )
+    release_parser.add_argument("payment_intent")
+
+    args = parser.parse_args()
+    ledger = RefundLedger(args.ledger_path)
+    if args.command == "list":
+        for entry in ledger.entries():
+            print(
+                f"{entry['payment_intent']} [{entry['status']}] "
+                f"started {time.ctime(entry['started_at'])} "
+                f"request {entry['request_hash'][:12]}"
+            )
+    else:
+        print(f"Released {ledger.release(args.payment_intent)} lock(s).")
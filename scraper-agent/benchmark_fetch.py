@@ -0,0 +1,55 @@
+"""Compare fetching the scientist pages the old way (blocking httpx.get) with the shared async client.
+
+A blocking call inside a function step holds up the event loop, so gathering the plan runs fetches the pages
+one after another. The async client lets the fetches overlap, reusing pooled connections.
+
+    uv run benchmark_fetch.py
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+
+from fetch import USER_AGENT, close_client, retrieve_website, set_cache_mode
+from http_cache import OFF
+
+WEBSITES = [
+    "https://wikipedia.org/wiki/Ada_Lovelace",
+    "https://wikipedia.org/wiki/Nikola_Tesla",
+    "https://wikipedia.org/wiki/Albert_Einstein",
+    "https://wikipedia.org/wiki/Isaac_Newton",
+    "https://wikipedia.org/wiki/Galileo_Galilei",
+    "https://wikipedia.org/wiki/Marie_Curie",
+    "https://wikipedia.org/wiki/Richard_Feynman",
+    "https://en.wikipedia.org/wiki/Brian_Cox_(physicist)",
+]
+
+
+async def blocking_fetch(url: str) -> str:
+    # What the sync function step did: a fresh connection, and the event loop is blocked while it runs.
+    return httpx.get(url, follow_redirects=True, headers={"User-Agent": USER_AGENT}).text
+
+
+async def time_gather(fetch, urls: list[str]) -> tuple[float, int]:
+    start = time.perf_counter()
+    pages = await asyncio.gather(*[fetch(url) for url in urls])
+    return time.perf_counter() - start, sum(len(page) for page in pages)
+
+
+async def main(urls: list[str]) -> None:
+    sequential, size = await time_gather(blocking_fetch, urls)
+    print(f"Blocking httpx.get:     {sequential:.2f}s for {len(urls)} pages ({size / 1e6:.1f} MB)")
+    try:
+        concurrent, size = await time_gather(retrieve_website, urls)
+    finally:
+        await close_client()
+    print(f"Shared async client:    {concurrent:.2f}s for {len(urls)} pages ({size / 1e6:.1f} MB)")
+    print(f"Speed-up:               {sequential / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    # Measure real downloads, not the on-disk cache.
+    set_cache_mode(OFF)
+    asyncio.run(main(sys.argv[1:] or WEBSITES))
@@ -0,0 +1,58 @@
+"""Microbenchmark: parsing a Wikipedia page once per step versus once per page.
+
+Before the document cache, each of the three extraction steps parsed the page with `html.parser`. This times
+that against a single cached parse (with each parser backend) reused by all three steps.
+
+    uv run benchmark_parse.py                      # fetches the Albert Einstein page
+    uv run benchmark_parse.py --file page.html     # or use a saved page
+"""
+
+import argparse
+import time
+
+import httpx
+from bs4 import BeautifulSoup
+
+from documents import clear_cache, parse_html, select_one
+from fetch import USER_AGENT
+
+STEPS = 3  # extract text, check for #Publications, extract the publications block
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def parse_per_step(html: str) -> None:
+    for _ in range(STEPS):
+        select_one(BeautifulSoup(html, "html.parser"), "#Publications")
+
+
+def parse_once(html: str, parser: str) -> None:
+    clear_cache()
+    for _ in range(STEPS):
+        select_one(parse_html(html, parser), "#Publications")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default="https://en.wikipedia.org/wiki/Albert_Einstein")
+    parser.add_argument("--file", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            html = f.read()
+    else:
+        html = httpx.get(args.url, follow_redirects=True, headers={"User-Agent": USER_AGENT}).text
+    print(f"Page size: {len(html) / 1e6:.2f} MB, {STEPS} extraction steps, mean of {args.repeat} runs")
+
+    baseline = timed(lambda: parse_per_step(html), args.repeat)
+    print(f"{'html.parser, parse per step':<32} {baseline:>8.1f} ms")
+    for backend in ["html.parser", "lxml"]:
+        cached = timed(lambda: parse_once(html, backend), args.repeat)
+        print(f"{backend + ', parse once':<32} {cached:>8.1f} ms  ({baseline / cached:.1f}x faster)")
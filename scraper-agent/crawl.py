@@ -0,0 +1,300 @@
+"""Run the scientist scraper plan over a large list of URLs.
+
+`main.py` fires a handful of plan runs at once with `asyncio.gather`, which doesn't scale to thousands of pages.
+This crawler instead:
+
+- reads URLs (one per line) from a file, or from stdin when the file is `-`,
+- runs at most `--concurrency` plan runs at a time,
+- rate-limits how often a plan run is started against each host,
+- retries failed runs with exponential backoff and jitter, waiting at least as long as a 429 or 503's
+  Retry-After asks,
+- stops sending work to a host after repeated consecutive fetch failures (a per-host circuit breaker) until it has
+  cooled down; LLM and parsing failures are retried but don't count against the host,
+- fails a URL straight away, without retrying, when the host answers with any other error status (e.g. 404),
+- streams each result to a JSONL file as soon as it finishes, and records completed URLs in a checkpoint file so
+  an interrupted crawl can be resumed without redoing them.
+
+    uv run crawl.py scientists.txt --output results.jsonl
+    cat urls.txt | uv run crawl.py - --concurrency 16 --per-host-interval 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, TextIO
+
+import httpx
+from portia import PlanRun, PlanRunState
+
+from fetch import RetryableHTTPError, close_client, fetch_errors, response_cache, set_cache_mode
+from http_cache import CACHE_MODES
+from main import get_publications, plan, portia
+from publications import DEFAULT_MIN_CONFIDENCE, publication_stats
+from reduce import DEFAULT_TOKEN_BUDGET, reduction_stats
+
+# Upper bound on a server's Retry-After, so one misbehaving host can't park a worker indefinitely.
+MAX_RETRY_AFTER_SECONDS = 300.0
+
+
+@dataclass
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures, then allows a trial run once `cooldown` seconds have passed."""
+
+    threshold: int
+    cooldown: float
+    failures: int = 0
+    opened_at: float | None = None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        # Half-open: let a trial run through. Another failure re-opens the breaker straight away.
+        return time.monotonic() - self.opened_at >= self.cooldown
+
+    def record(self, success: bool) -> None:
+        if success:
+            self.failures = 0
+            self.opened_at = None
+        else:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class HostState:
+    breaker: CircuitBreaker
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_start: float = 0.0
+
+
+@dataclass
+class CrawlStats:
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    retries: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def __str__(self):
+        elapsed = time.monotonic() - self.started_at
+        return (
+            f"Crawl: {self.completed} completed, {self.failed} failed, {self.skipped} skipped "
+            f"(circuit open), {self.retries} retries in {elapsed:.1f}s "
+            f"({self.completed / elapsed * 60 if elapsed else 0:.1f} pages/min)"
+        )
+
+
+def to_json(value: Any) -> Any:
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+def plan_run_result(url: str, plan_run: PlanRun) -> dict[str, Any]:
+    outputs = plan_run.outputs
+    publications = get_publications(plan_run)
+    return {
+        "url": url,
+        "plan_run_id": str(plan_run.id),
+        "profile": to_json(outputs.final_output.get_value()) if outputs.final_output else None,
+        "publications": to_json(publications) if publications else None,
+    }
+
+
+class Crawler:
+    def __init__(
+        self,
+        output: TextIO,
+        checkpoint: TextIO,
+        token_budget: int,
+        publication_confidence: float,
+        concurrency: int,
+        per_host_interval: float,
+        retries: int,
+        backoff: float,
+        breaker_threshold: int,
+        breaker_cooldown: float,
+    ):
+        self.output = output
+        self.checkpoint = checkpoint
+        self.token_budget = token_budget
+        self.publication_confidence = publication_confidence
+        self.concurrency = concurrency
+        self.per_host_interval = per_host_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.hosts: dict[str, HostState] = {}
+        self.stats = CrawlStats()
+
+    def host(self, url: str) -> HostState:
+        host = httpx.URL(url).host
+        if host not in self.hosts:
+            self.hosts[host] = HostState(
+                breaker=CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            )
+        return self.hosts[host]
+
+    async def wait_for_turn(self, host: HostState) -> None:
+        """Space out the plan runs started against each host by at least per_host_interval seconds."""
+        async with host.lock:
+            delay = host.last_start + self.per_host_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            host.last_start = time.monotonic()
+
+    async def run_one(self, url: str) -> dict[str, Any]:
+        host = self.host(url)
+        error = None
+        retry_after = None
+        for attempt in range(self.retries + 1):
+            if not host.breaker.allow():
+                self.stats.skipped += 1
+                return {"url": url, "status": "skipped", "error": "circuit open"}
+            if attempt:
+                self.stats.retries += 1
+                delay = self.backoff * 2 ** (attempt - 1) + random.uniform(0, self.backoff)
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, MAX_RETRY_AFTER_SECONDS))
+                await asyncio.sleep(delay)
+            await self.wait_for_turn(host)
+            fetch_errors.pop(url, None)
+            try:
+                plan_run = await portia.arun_plan(
+                    plan,
+                    plan_run_inputs={
+                        "url": url,
+                        "token_budget": self.token_budget,
+                        "publication_confidence": self.publication_confidence,
+                    },
+                )
+            except Exception as e:  # noqa: BLE001 - any failure is retried
+                plan_run = None
+                error = str(e)
+            if plan_run is not None and plan_run.state == PlanRunState.COMPLETE:
+                host.breaker.record(success=True)
+                self.stats.completed += 1
+                return {"status": "completed", "attempts": attempt + 1, **plan_run_result(url, plan_run)}
+            if plan_run is not None:
+                error = f"plan run {plan_run.id} finished in state {plan_run.state}"
+
+            # Only the fetch says anything about the host's health; LLM and parse failures are retried
+            # without tripping its breaker.
+            retry_after = None
+            fetch_error = fetch_errors.pop(url, None)
+            if isinstance(fetch_error, RetryableHTTPError):
+                error = str(fetch_error)
+                retry_after = fetch_error.retry_after
+                host.breaker.record(success=False)
+            elif isinstance(fetch_error, httpx.HTTPStatusError):
+                # The host answered, it just has nothing useful at this URL: retrying won't change that.
+                self.stats.failed += 1
+                return {"url": url, "status": "failed", "attempts": attempt + 1, "error": str(fetch_error)}
+            elif fetch_error is not None:
+                error = f"{type(fetch_error).__name__}: {fetch_error}"
+                host.breaker.record(success=False)
+        self.stats.failed += 1
+        return {"url": url, "status": "failed", "attempts": self.retries + 1, "error": error}
+
+    def record(self, result: dict[str, Any]) -> None:
+        self.output.write(json.dumps(result, default=str) + "\n")
+        self.output.flush()
+        # Failed and skipped URLs are not checkpointed, so that a resumed crawl tries them again.
+        if result["status"] == "completed":
+            self.checkpoint.write(result["url"] + "\n")
+            self.checkpoint.flush()
+
+    async def worker(self, queue: asyncio.Queue[str | None]) -> None:
+        while (url := await queue.get()) is not None:
+            self.record(await self.run_one(url))
+
+    async def crawl(self, urls: TextIO, done: set[str]) -> None:
+        # A bounded queue keeps memory flat however long the input is.
+        queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self.worker(queue)) for _ in range(self.concurrency)]
+        try:
+            for line in urls:
+                url = line.strip()
+                if url and not url.startswith("#") and url not in done:
+                    done.add(url)  # also skips duplicates within the input
+                    await queue.put(url)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await close_client()
+
+
+def load_checkpoint(path: str) -> set[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("urls", help="A file with one URL per line, or '-' to read from stdin.")
+    parser.add_argument("--output", default="results.jsonl")
+    parser.add_argument(
+        "--checkpoint", default=None, help="Defaults to the output path with a .done suffix."
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--per-host-interval",
+        type=float,
+        default=0.25,
+        help="Minimum seconds between plan runs started against the same host.",
+    )
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=1.0, help="Base retry backoff in seconds.")
+    parser.add_argument("--breaker-threshold", type=int, default=5)
+    parser.add_argument("--breaker-cooldown", type=float, default=60.0)
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET)
+    parser.add_argument(
+        "--publication-confidence",
+        type=float,
+        default=DEFAULT_MIN_CONFIDENCE,
+        help="Send publication sections parsed with lower confidence than this to the LLM.",
+    )
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default=None)
+    args = parser.parse_args()
+    if args.cache_mode:
+        set_cache_mode(args.cache_mode)
+
+    checkpoint_path = args.checkpoint or f"{args.output}.done"
+    done = load_checkpoint(checkpoint_path)
+    if done:
+        print(f"Resuming: skipping {len(done)} URLs already completed", file=sys.stderr)
+
+    urls = sys.stdin if args.urls == "-" else open(args.urls, encoding="utf-8")
+    with (
+        urls,
+        open(args.output, "a", encoding="utf-8") as output,
+        open(checkpoint_path, "a", encoding="utf-8") as checkpoint,
+    ):
+        crawler = Crawler(
+            output=output,
+            checkpoint=checkpoint,
+            token_budget=args.token_budget,
+            publication_confidence=args.publication_confidence,
+            concurrency=args.concurrency,
+            per_host_interval=args.per_host_interval,
+            retries=args.retries,
+            backoff=args.backoff,
+            breaker_threshold=args.breaker_threshold,
+            breaker_cooldown=args.breaker_cooldown,
+        )
+        asyncio.run(crawler.crawl(urls, done))
+
+    print(crawler.stats, file=sys.stderr)
+    print(response_cache.stats, file=sys.stderr)
+    print(reduction_stats, file=sys.stderr)
+    print(publication_stats, file=sys.stderr)
@@ -0,0 +1,62 @@
+"""Parse-once HTML documents for the scraper's function steps.
+
+Several steps of the scraper plan look at the same multi-megabyte Wikipedia page. Rather than each step parsing
+the HTML again, `parse_html` keeps an LRU cache of parsed trees keyed by a hash of the page content, so every
+step reuses the same tree. The trees are shared, so callers must treat them as read-only.
+
+Parsing uses lxml, which is several times faster than Python's built-in `html.parser`. CSS selectors are
+compiled once with soupsieve and cached too.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+
+PARSER = "lxml"
+MAX_CACHED_DOCUMENTS = 32
+
+_documents: OrderedDict[str, BeautifulSoup] = OrderedDict()
+_lock = threading.Lock()
+
+
+def content_hash(html: str) -> str:
+    return hashlib.blake2b(html.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def parse_html(html: str, parser: str = PARSER) -> BeautifulSoup:
+    """Return the parsed tree for the HTML, parsing it only if it is not already cached."""
+    key = f"{parser}:{content_hash(html)}"
+    with _lock:
+        if key in _documents:
+            _documents.move_to_end(key)
+            return _documents[key]
+    # Parse outside the lock so that different pages can be parsed in parallel.
+    soup = BeautifulSoup(html, parser)
+    with _lock:
+        _documents[key] = soup
+        _documents.move_to_end(key)
+        while len(_documents) > MAX_CACHED_DOCUMENTS:
+            _documents.popitem(last=False)
+    return soup
+
+
+def clear_cache() -> None:
+    with _lock:
+        _documents.clear()
+
+
+@lru_cache(maxsize=256)
+def compile_selector(selector: str) -> soupsieve.SoupSieve:
+    return soupsieve.compile(selector)
+
+
+def select(soup: BeautifulSoup | Tag, selector: str) -> list[Tag]:
+    return compile_selector(selector).select(soup)
+
+
+def select_one(soup: BeautifulSoup | Tag, selector: str) -> Tag | None:
+    return compile_selector(selector).select_one(soup)
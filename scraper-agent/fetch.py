@@ -0,0 +1,134 @@
+"""Async HTTP fetching for the scraper plan.
+
+All plan runs share one `httpx.AsyncClient`, so connections (HTTP/2 where the server supports it) are pooled
+and reused across pages rather than opened fresh for every request. A per-host semaphore caps how many
+requests are in flight to any one site, so that gathering many plan runs overlaps network I/O without
+hammering a single host.
+
+Responses are cached on disk and revalidated with conditional requests (see `http_cache.py`), so pages that
+haven't changed since the last run are not downloaded again.
+
+Error responses are raised rather than returned as page text: 429 and 5xx as `RetryableHTTPError` (carrying the
+server's Retry-After), anything else with `raise_for_status`. Portia turns a raised step into a failed plan run
+without keeping the exception, so the last fetch error for each URL is also kept in `fetch_errors` for the
+crawler to decide whether to retry.
+"""
+
+import asyncio
+import os
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from http_cache import CACHE_MODES, CACHE_ONLY, OFF, REVALIDATE, CacheMissError, ResponseCache
+
+MAX_CONNECTIONS = 20
+MAX_CONCURRENCY_PER_HOST = 4
+TIMEOUT_SECONDS = 30.0
+# Wikipedia asks automated clients to identify themselves.
+USER_AGENT = "portia-scraper-agent/0.1 (https://github.com/portiaAI/portia-agent-examples)"
+
+_client: httpx.AsyncClient | None = None
+_host_limits: dict[str, asyncio.Semaphore] = {}
+fetch_errors: dict[str, httpx.HTTPError] = {}
+
+
+class RetryableHTTPError(httpx.HTTPStatusError):
+    """A 429 or 5xx response: the host is overloaded or failing, so the request is worth retrying later."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(
+            f"{response.status_code} {response.reason_phrase} for {response.url}",
+            request=response.request,
+            response=response,
+        )
+        self.retry_after = retry_after_seconds(response)
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """The delay asked for by a Retry-After header, given either in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+response_cache = ResponseCache()
+cache_mode = os.environ.get("SCRAPER_HTTP_CACHE", REVALIDATE)
+
+
+def set_cache_mode(mode: str) -> None:
+    global cache_mode
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode {mode!r}, expected one of {CACHE_MODES}")
+    cache_mode = mode
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            timeout=TIMEOUT_SECONDS,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+
+
+def host_limit(url: str) -> asyncio.Semaphore:
+    host = httpx.URL(url).host
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(MAX_CONCURRENCY_PER_HOST)
+    return _host_limits[host]
+
+
+async def retrieve_website(url: str) -> str:
+    cached = response_cache.get(url) if cache_mode != OFF else None
+    if cache_mode == CACHE_ONLY:
+        if cached is None:
+            raise CacheMissError(f"{url} is not cached and the HTTP cache is in cache-only mode")
+        response_cache.stats.cache_only_hits += 1
+        return cached.body
+
+    fetch_errors.pop(url, None)
+    try:
+        async with host_limit(url):
+            response = await get_client().get(
+                url, headers=cached.validators() if cached else None
+            )
+        if cached and response.status_code == httpx.codes.NOT_MODIFIED:
+            response_cache.stats.not_modified += 1
+            return cached.body
+        if response.status_code == httpx.codes.TOO_MANY_REQUESTS or response.is_server_error:
+            raise RetryableHTTPError(response)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        fetch_errors[url] = e
+        raise
+
+    response_cache.stats.full_downloads += 1
+    if cache_mode != OFF and response.status_code == httpx.codes.OK:
+        response_cache.put(url, response)
+    return response.text
@@ -0,0 +1,104 @@
+"""An on-disk HTTP response cache with conditional revalidation.
+
+Responses are stored per URL as a gzip-compressed body plus a small JSON file holding the `ETag` and
+`Last-Modified` validators. On the next fetch, the cached validators are sent as `If-None-Match` /
+`If-Modified-Since` headers, and a `304 Not Modified` response is served from the cache, so re-running the
+scraper doesn't download pages that haven't changed.
+
+The cache has three modes:
+- `revalidate` (the default): use the cache, revalidating every entry with a conditional request.
+- `cache-only`: never touch the network; a page that isn't cached is an error. Useful for development and tests.
+- `off`: always download, and don't store anything.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+
+import httpx
+
+REVALIDATE = "revalidate"
+CACHE_ONLY = "cache-only"
+OFF = "off"
+CACHE_MODES = [REVALIDATE, CACHE_ONLY, OFF]
+
+DEFAULT_CACHE_DIR = ".cache/http"
+
+
+class CacheMissError(LookupError):
+    """Raised in cache-only mode when a page has not been cached."""
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: str
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+
+    def validators(self) -> dict[str, str]:
+        """The headers that make a request conditional on the page having changed."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class CacheStats:
+    full_downloads: int = 0
+    not_modified: int = 0
+    cache_only_hits: int = 0
+
+    def __str__(self):
+        return (
+            f"HTTP cache: {self.full_downloads} full downloads, "
+            f"{self.not_modified} not modified, {self.cache_only_hits} served offline"
+        )
+
+
+class ResponseCache:
+    """Stores response bodies compressed on disk, keyed by URL."""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self.stats = CacheStats()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def get(self, url: str) -> CachedResponse | None:
+        path = self._path(url)
+        try:
+            with open(f"{path}.json", encoding="utf-8") as f:
+                metadata = json.load(f)
+            with gzip.open(f"{path}.html.gz", "rt", encoding="utf-8") as f:
+                body = f.read()
+        except (FileNotFoundError, json.JSONDecodeError, OSError, EOFError):
+            return None
+        return CachedResponse(body=body, **metadata)
+
+    def put(self, url: str, response: httpx.Response) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        metadata = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }
+        # Write to temporary files and rename, so concurrent runs never see a half-written entry.
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(f"{tmp}.html.gz", "wt", encoding="utf-8") as f:
+            f.write(response.text)
+        with open(f"{tmp}.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        os.replace(f"{tmp}.html.gz", f"{path}.html.gz")
+        os.replace(f"{tmp}.json", f"{path}.json")
@@ -1,28 +1,29 @@
 from portia import PlanBuilderV2, Config, Portia, StepOutput, Input, PlanRun
-from bs4 import BeautifulSoup
-import httpx
+import argparse
 import asyncio
 from pydantic import BaseModel
 
-def retrieve_website(url: str) -> str:
-    response = httpx.get(url, follow_redirects=True)
-    return response.text
+from documents import parse_html, select, select_one
+from fetch import close_client, response_cache, retrieve_website, set_cache_mode
+from http_cache import CACHE_MODES
+from publications import DEFAULT_MIN_CONFIDENCE, Publications, parse_publications, publication_stats
+from reduce import DEFAULT_TOKEN_BUDGET, extract_profile_text, reduction_stats
 
 
 def extract_text_from_html(html: str, selectors: list[str] | None = None) -> str:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = parse_html(html)
     if not selectors:
         return soup.get_text()
     else:
-        return "\n".join([soup.select(selector)[0].get_text() for selector in selectors])
+        return "\n".join([select(soup, selector)[0].get_text() for selector in selectors])
 
 def selector_is_in_html(html: str, selector: str) -> bool:
-    soup = BeautifulSoup(html, "html.parser")
-    return len(soup.select(selector)) > 0
+    soup = parse_html(html)
+    return select_one(soup, selector) is not None
 
 def extract_block_from_wikipedia_page(html: str, selector: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    start_element = soup.select_one(selector).parent # heading id is a child of the mw_heading div
+    soup = parse_html(html)
+    start_element = select_one(soup, selector).parent # heading id is a child of the mw_heading div
     if not start_element:
         return ""
     extracted_texts = []
@@ -53,40 +54,49 @@ class ScientistProfile(BaseModel):
         """
 
 
-class Publication(BaseModel):
-    title: str
-    year: str | None
-    
-    def __str__(self):
-        return f"""Title: {self.title}
-        Year: {self.year}
-        """
-
-class Publications(BaseModel):
-    publications: list[Publication]
-    
-    def __str__(self):
-        return "\n".join([str(publication) for publication in self.publications])
-
 portia = Portia(Config.from_default(storage_class="memory", default_log_level="CRITICAL"))
 
 
 plan = (
     PlanBuilderV2("Scientist Scraper")
     .input(name="url", description="The URL of the website to scrape")
+    .input(
+        name="token_budget",
+        description="The maximum number of tokens of page text to send to the profile LLM step",
+        default_value=DEFAULT_TOKEN_BUDGET,
+    )
+    .input(
+        name="publication_confidence",
+        description="The confidence below which the parsed publications are re-extracted by the LLM",
+        default_value=DEFAULT_MIN_CONFIDENCE,
+    )
     .function_step(
         function=retrieve_website,
         args={"url": Input("url")},
         step_name="Retrieve Website"
         
     ).function_step(
-        function=extract_text_from_html,
-        args={"html": StepOutput("Retrieve Website")},
+        # Only the title, infobox and lead (within the token budget) are needed for the profile.
+        function=extract_profile_text,
+        args={"html": StepOutput("Retrieve Website"), "token_budget": Input("token_budget")},
         step_name="Extract Text from HTML"
     )
     .if_(condition=selector_is_in_html,
          args={"html": StepOutput("Retrieve Website"), "selector": "#Publications"},
     )
+    .function_step(
+        # Most publication sections are plain lists, which parse without the LLM.
+        function=parse_publications,
+        args={
+            "html": StepOutput("Retrieve Website"),
+            "selector": "#Publications",
+            "min_confidence": Input("publication_confidence"),
+        },
+        step_name="Parse Publications"
+    )
+    .if_(condition=lambda extraction: not extraction.confident,
+         args={"extraction": StepOutput("Parse Publications")},
+    )
     .function_step(function=extract_block_from_wikipedia_page,
                    args={"html": StepOutput("Retrieve Website"), "selector": "#Publications"},
                    step_name="Retrieve Publications"
@@ -98,6 +108,7 @@ plan = (
         step_name="Analyze Publications"
     )
     .endif()
+    .endif()
     .llm_step(
         task="Determine the scientist's profile.",
         inputs=[StepOutput("Extract Text from HTML")],
@@ -107,7 +118,19 @@ plan = (
     .build()
 )
 
-async def main() -> list[PlanRun]:
+# Step outputs holding the publications: the parsed ones, and the LLM's when the parse wasn't confident enough.
+PARSED_PUBLICATIONS_OUTPUT = "$step_3_output"
+LLM_PUBLICATIONS_OUTPUT = "$step_6_output"
+
+
+def get_publications(plan_run: PlanRun) -> Publications | None:
+    if output := plan_run.outputs.step_outputs.get(LLM_PUBLICATIONS_OUTPUT):
+        return output.get_value()
+    if output := plan_run.outputs.step_outputs.get(PARSED_PUBLICATIONS_OUTPUT):
+        return output.get_value().publications
+    return None
+
+async def main(token_budget: int = DEFAULT_TOKEN_BUDGET) -> list[PlanRun]:
     websites = [
         "https://wikipedia.org/wiki/Ada_Lovelace",
         "https://wikipedia.org/wiki/Nikola_Tesla",
@@ -118,16 +141,41 @@ async def main() -> list[PlanRun]:
         "https://wikipedia.org/wiki/Richard_Feynman",
         "https://en.wikipedia.org/wiki/Brian_Cox_(physicist)",
         ]
-    results = await asyncio.gather(*[portia.arun_plan(plan, plan_run_inputs={"url": url}) for url in websites])
+    try:
+        # retrieve_website is async and shares a pooled client, so the plan runs overlap their network I/O.
+        results = await asyncio.gather(*[portia.arun_plan(plan, plan_run_inputs={"url": url, "token_budget": token_budget}) for url in websites])
+    finally:
+        await close_client()
     return results
 
 if __name__ == "__main__":
-    results = asyncio.run(main())
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cache-mode",
+        choices=CACHE_MODES,
+        default=None,
+        help="How to use the on-disk HTTP cache (defaults to $SCRAPER_HTTP_CACHE, or 'revalidate').",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=DEFAULT_TOKEN_BUDGET,
+        help="The maximum number of tokens of page text to send to the profile LLM step.",
+    )
+    args = parser.parse_args()
+    if args.cache_mode:
+        set_cache_mode(args.cache_mode)
+
+    results = asyncio.run(main(args.token_budget))
     for result in results:
         if result.outputs.final_output:
             print("--------------------------------")
             print(result.outputs.final_output.get_value())
-            if publications := result.outputs.step_outputs.get("$step_4_output"):
-                print(f"Number of publications: {len(publications.get_value().publications)}")
+            if publications := get_publications(result):
+                print(f"Number of publications: {len(publications.publications)}")
             else:
                 print("No publications found")
+    print("--------------------------------")
+    print(response_cache.stats)
+    print(reduction_stats)
+    print(publication_stats)
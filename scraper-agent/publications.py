@@ -0,0 +1,205 @@
+"""Parse a Wikipedia publications section without an LLM.
+
+Most Wikipedia "Publications" sections are plain `<ul>`/`<ol>` lists with one work per item and the year in
+parentheses, e.g. `"On Computable Numbers" (1936)` or `<i>Principia</i> (1687)`. `parse_publications` reads
+those lists directly into `Publication(title, year)` and scores how confident it is in the result:
+
+- every list item must yield a title, and items where the year is in a recognisable position score higher,
+- the score is scaled down when much of the section is prose rather than lists, since the lists then probably
+  don't capture everything.
+
+The plan only sends the section to the `Analyze Publications` LLM step when the confidence is below the
+threshold, which on most pages turns the most token-heavy step into a millisecond parse.
+
+    uv run publications.py https://en.wikipedia.org/wiki/Richard_Feynman
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+
+from bs4 import Tag
+from pydantic import BaseModel
+
+from documents import parse_html, select, select_one
+from reduce import clean_text
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+YEAR = r"(1[4-9]\d\d|20\d\d)"
+# "Title (1905)", "Title (c. 1687)", "Title (1905a)", "Title (1936–1937)"
+PARENTHESISED_YEAR = re.compile(rf"\((?:c\.\s*)?{YEAR}[a-z]?(?:\s*[–-]\s*\d{{2,4}})?\)")
+# "1905: Title", "1905 – Title", "1905. Title"
+LEADING_YEAR = re.compile(rf"^{YEAR}[a-z]?\s*[:.–-]\s*")
+ANY_YEAR = re.compile(rf"\b{YEAR}\b")
+QUOTED_TITLE = re.compile(r"[\"“](.+?)[\"”]")
+HEADING = re.compile(r"^h([1-6])$")
+HEADING_CLASS = re.compile(r"^mw-heading([1-6])$")
+
+# Item scores: a title with the year in a recognisable position, a title with a year found somewhere in the
+# item, and a title without a year.
+STRUCTURED_ITEM = 1.0
+LOOSE_YEAR_ITEM = 0.7
+NO_YEAR_ITEM = 0.5
+
+
+class Publication(BaseModel):
+    title: str
+    year: str | None
+
+    def __str__(self):
+        return f"""Title: {self.title}
+        Year: {self.year}
+        """
+
+
+class Publications(BaseModel):
+    publications: list[Publication]
+
+    def __str__(self):
+        return "\n".join([str(publication) for publication in self.publications])
+
+
+class PublicationExtraction(BaseModel):
+    """The output of the parse step: the parsed publications and whether they can be used without the LLM."""
+
+    publications: Publications
+    confidence: float
+    confident: bool
+
+
+def heading_level(element: Tag) -> int | None:
+    """The level of a heading element, or of a `<div class="mw-heading mw-headingN">` heading wrapper."""
+    if match := HEADING.match(element.name or ""):
+        return int(match.group(1))
+    for cls in element.get("class") or []:
+        if match := HEADING_CLASS.match(cls):
+            return int(match.group(1))
+    return None
+
+
+def section_elements(soup: Tag, selector: str) -> list[Tag]:
+    """The elements of the section whose heading matches the selector, up to the next heading of the same level."""
+    anchor = select_one(soup, selector)
+    if anchor is None:
+        return []
+    # The id is on the <h2> itself (wrapped in a mw-heading div) or, on older markup, on a span inside it.
+    heading = anchor
+    while heading.parent is not None and heading_level(heading) is None:
+        heading = heading.parent
+    if heading.parent is not None and heading_level(heading.parent) is not None:
+        heading = heading.parent
+    level = heading_level(heading) or 2
+
+    elements = []
+    for sibling in heading.find_next_siblings():
+        sibling_level = heading_level(sibling)
+        if sibling_level is not None and sibling_level <= level:
+            break
+        elements.append(sibling)
+    return elements
+
+
+def parse_item(item: Tag) -> tuple[Publication | None, float]:
+    text = clean_text(item)
+    if not text:
+        return None, 0.0
+
+    year = None
+    score = STRUCTURED_ITEM
+    after_year = ""
+    if match := PARENTHESISED_YEAR.search(text):
+        year = match.group(1)
+        before_year, after_year = text[: match.start()], text[match.end() :]
+    elif match := LEADING_YEAR.match(text):
+        year = match.group(1)
+        before_year = text[match.end() :]
+    elif match := ANY_YEAR.search(text):
+        year = match.group(1)
+        before_year = text
+        score = LOOSE_YEAR_ITEM
+    else:
+        before_year = text
+        score = NO_YEAR_ITEM
+
+    # Article titles are quoted and book titles italicised. Otherwise the title is the text before the year,
+    # or after it for citation-style "Author (1905). Title." items.
+    italic = item.find("i")
+    if quoted := QUOTED_TITLE.search(text):
+        title = quoted.group(1)
+    elif italic is not None and clean_text(italic):
+        title = clean_text(italic)
+    elif after_year.startswith("."):
+        title = after_year.lstrip(" .").split(". ")[0]
+    else:
+        title = before_year.split(". ")[0]
+    title = title.strip(" .,;:–-\"“”")
+    if not title:
+        return None, 0.0
+    return Publication(title=title, year=year), score
+
+
+def parse_publication_elements(elements: list[Tag]) -> tuple[Publications, float]:
+    items = []
+    for element in elements:
+        for item in [element] if element.name == "li" else select(element, "li"):
+            # An item holding a nested list is a grouping ("Books:"); the nested items are parsed instead.
+            if item.find(["ul", "ol"]) is None:
+                items.append(item)
+    publications = []
+    scores = []
+    for item in items:
+        publication, score = parse_item(item)
+        scores.append(score)
+        if publication is not None:
+            publications.append(publication)
+    if not scores:
+        return Publications(publications=[]), 0.0
+
+    list_chars = sum(len(clean_text(item)) for item in items)
+    section_chars = sum(len(clean_text(element)) for element in elements)
+    coverage = min(1.0, list_chars / section_chars) if section_chars else 0.0
+    return Publications(publications=publications), sum(scores) / len(scores) * coverage
+
+
+@dataclass
+class PublicationStats:
+    pages: int = 0
+    parsed: int = 0
+
+    def __str__(self):
+        if not self.pages:
+            return "Publications: no publication sections found"
+        return (
+            f"Publications: {self.parsed}/{self.pages} sections parsed without the LLM, "
+            f"{self.pages - self.parsed} sent to the LLM"
+        )
+
+
+publication_stats = PublicationStats()
+
+
+def parse_publications(
+    html: str, selector: str, min_confidence: float = DEFAULT_MIN_CONFIDENCE
+) -> PublicationExtraction:
+    """Function step: parse the publications section, recording whether the LLM step can be skipped."""
+    publications, confidence = parse_publication_elements(section_elements(parse_html(html), selector))
+    confident = confidence >= min_confidence
+    publication_stats.pages += 1
+    publication_stats.parsed += confident
+    return PublicationExtraction(
+        publications=publications, confidence=round(confidence, 3), confident=confident
+    )
+
+
+if __name__ == "__main__":
+    import httpx
+
+    from fetch import USER_AGENT
+
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://en.wikipedia.org/wiki/Richard_Feynman"
+    page = httpx.get(url, follow_redirects=True, headers={"User-Agent": USER_AGENT}).text
+    extraction = parse_publications(page, "#Publications")
+    print(extraction.publications)
+    print("--------------------------------")
+    print(f"Confidence: {extraction.confidence} ({'parsed' if extraction.confident else 'LLM fallback'})")
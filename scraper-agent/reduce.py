@@ -0,0 +1,160 @@
+"""Reduce a Wikipedia page to the text the profile LLM step actually needs.
+
+`soup.get_text()` of a whole Wikipedia page includes navigation, references, the table of contents and other
+boilerplate - tens of thousands of tokens per scientist. `reduce_wikipedia_page` keeps:
+
+- the page title,
+- the infobox, as `Key: value` lines (born, died, nationality, known for, ...),
+- the lead section,
+- and then as much of the article body as fits in the token budget, skipping reference-style sections.
+
+The parsed tree is shared with the other steps (see `documents.py`), so nothing is removed from it - unwanted
+elements are skipped while reading instead.
+
+    uv run reduce.py https://en.wikipedia.org/wiki/Ada_Lovelace
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from typing import Iterator
+
+import tiktoken
+from bs4 import Tag
+
+from documents import parse_html, select, select_one
+
+DEFAULT_TOKEN_BUDGET = 2000
+# The tokenizer the token budget and the reduction stats are counted in.
+TOKENIZER = "cl100k_base"
+
+CITATION = re.compile(r"\[(\d+|[a-z]|citation needed|note \d+)\]")
+WHITESPACE = re.compile(r"\s+")
+# Elements inside paragraphs, headings and infobox cells whose text is noise.
+SKIPPED_ELEMENTS = {"style", "script", "sup"}
+SKIPPED_CLASSES = {"mw-editsection", "reference", "noprint"}
+SKIPPED_SECTIONS = {
+    "references",
+    "notes",
+    "citations",
+    "sources",
+    "bibliography",
+    "see also",
+    "external links",
+    "further reading",
+}
+
+
+def page_tokens(text: str) -> int:
+    """How many tokens of the profile LLM step's budget the page text uses."""
+    return len(tiktoken.get_encoding(TOKENIZER).encode(text))
+
+
+def is_skipped(element: Tag) -> bool:
+    return element.name in SKIPPED_ELEMENTS or not SKIPPED_CLASSES.isdisjoint(
+        element.get("class") or []
+    )
+
+
+def clean_text(element: Tag) -> str:
+    parts = [
+        text
+        for text in element.find_all(string=True)
+        if not any(is_skipped(parent) for parent in text.parents)
+    ]
+    text = CITATION.sub("", " ".join(parts))
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def infobox_fields(content: Tag) -> list[str]:
+    infobox = select_one(content, "table.infobox")
+    if infobox is None:
+        return []
+    fields = []
+    for row in select(infobox, "tr"):
+        label = select_one(row, "th.infobox-label")
+        data = select_one(row, "td.infobox-data")
+        if label is not None and data is not None:
+            fields.append(f"{clean_text(label)}: {clean_text(data)}")
+    return fields
+
+
+def body_paragraphs(content: Tag) -> Iterator[tuple[str, str]]:
+    """Yield (section title, paragraph text) for each paragraph, with the lead section titled 'Lead'."""
+    section = "Lead"
+    for element in content.find_all(["div", "h2", "p"], recursive=False):
+        if element.name == "h2" or "mw-heading2" in element.get("class", []):
+            section = clean_text(element)
+        elif element.name == "p" and section.lower() not in SKIPPED_SECTIONS:
+            if text := clean_text(element):
+                yield section, text
+
+
+def reduce_wikipedia_page(html: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Reduce a Wikipedia page to its title, infobox and lead (plus body text within the token budget)."""
+    soup = parse_html(html)
+    content = select_one(soup, "#mw-content-text .mw-parser-output") or soup.body or soup
+    title = select_one(soup, "#firstHeading")
+
+    lines = []
+    if title is not None:
+        lines.append(f"Title: {clean_text(title)}")
+    if fields := infobox_fields(content):
+        lines += ["", "Infobox:", *fields]
+
+    current_section = None
+    tokens = page_tokens("\n".join(lines))
+    for section, paragraph in body_paragraphs(content):
+        heading = [] if section == current_section else ["", f"{section}:"]
+        paragraph_tokens = page_tokens("\n".join([*heading, paragraph]))
+        if tokens + paragraph_tokens > token_budget:
+            # Always keep as much of the lead as the budget allows.
+            if section == "Lead":
+                encoding = tiktoken.get_encoding(TOKENIZER)
+                remaining = encoding.encode(paragraph)[: max(0, token_budget - tokens)]
+                lines += [*heading, encoding.decode(remaining)]
+            break
+        lines += [*heading, paragraph]
+        tokens += paragraph_tokens
+        current_section = section
+    return "\n".join(lines).strip()
+
+
+@dataclass
+class ReductionStats:
+    pages: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    def __str__(self):
+        if not self.pages:
+            return "Page reduction: no pages reduced"
+        saving = 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0
+        return (
+            f"Page reduction: {self.tokens_before} -> {self.tokens_after} {TOKENIZER} tokens "
+            f"across {self.pages} pages ({saving:.0%} fewer)"
+        )
+
+
+reduction_stats = ReductionStats()
+
+
+def extract_profile_text(html: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Function step: reduce the page for the profile LLM step, recording tokens before and after."""
+    reduced = reduce_wikipedia_page(html, token_budget)
+    reduction_stats.pages += 1
+    reduction_stats.tokens_before += page_tokens(parse_html(html).get_text())
+    reduction_stats.tokens_after += page_tokens(reduced)
+    return reduced
+
+
+if __name__ == "__main__":
+    import httpx
+
+    from fetch import USER_AGENT
+
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://en.wikipedia.org/wiki/Ada_Lovelace"
+    page = httpx.get(url, follow_redirects=True, headers={"User-Agent": USER_AGENT}).text
+    print(extract_profile_text(page))
+    print("--------------------------------")
+    print(reduction_stats)
@@ -1,7 +1,11 @@
-from typing import Callable
+from dataclasses import dataclass, field
+from functools import cache
 
 import streamlit as st
+from context import ConversationContext
 from dotenv import load_dotenv
+from form_extraction import prefilled_details
+from intent_classifier import classifier
 from models import (
     CarTaxPayment,
     DrivingLicenseApplication,
@@ -10,22 +14,23 @@ from models import (
     VehicleAssistanceQueryType,
 )
 from portia import (
-    Clarification,
-    ClarificationHandler,
     Config,
-    ExecutionHooks,
-    InputClarification,
+    DefaultToolRegistry,
     LogLevel,
+    PlanRun,
+    PlanRunState,
     StepOutput,
     logger,
 )
 from portia.builder.plan_builder_v2 import PlanBuilderV2
+from portia.builder.plan_v2 import PlanV2
 from portia.builder.reference import Input
 from portia.portia import Portia
 from processing import (
     process_car_tax_payment,
     process_driving_license_application,
 )
+from search_cache import with_search_cache
 
 load_dotenv()
 
@@ -38,7 +43,8 @@ IMPORTANT:
 FORM_COLLECTION_GUIDELINES = (
     BASE_INTERACTION_GUIDELINES
     + """
-- Be patient and encouraging as you collect the information"""
+- Be patient and encouraging as you collect the information
+- Some details may already have been extracted from the conversation (the prefilled_details input, and after the user's answers to clarifications). Use them as they are and only ask the user for the missing ones"""
 )
 
 INSTRUCTION_GUIDELINES = (
@@ -47,24 +53,34 @@ INSTRUCTION_GUIDELINES = (
 - Focus on being helpful and clear in your explanations"""
 )
 
+CLASSIFICATION_TASK = f"""Analyze the conversation and classify it into one of these 3 categories by setting query_type to the appropriate value:
 
-class UserMessageClarificationHandler(ClarificationHandler):
-    """Handle user clarifications by sending a message to the user"""
+1. "question_for_instructions": User is asking for instructions on how they can do something related to vehicle services (e.g., "How do I renew my license?", "How do I book a driving test?", "What documents do I need?", "How to register a vehicle?" etc.)
+Choose this for any question that can be answered with a search of vehicle assistance documentation.
 
-    def handle_input_clarification(
-        self,
-        clarification: InputClarification,
-        on_resolution: Callable[[Clarification, object], None],
-        on_error: Callable[[Clarification, object], None],
-    ) -> None:
-        """Handle a user input clarification."""
-        clarification_msg = f"{clarification.user_guidance or 'I need some additional information from you.'}"
-        st.session_state.messages.append(
-            {"role": "assistant", "content": clarification_msg}
-        )
+2. "process_driving_licence_application": User wants to apply for a new driving license (e.g., "I want to apply for a driving license", "Help me get a new license", "Process my license application")
+
+3. "pay_vehicle_tax": User wants to pay vehicle/car tax (e.g., "I need to pay my car tax", "Help me tax my vehicle", "Vehicle tax payment")
+
+4. "other": If the conversation doesn't clearly fit into any of the above 3 categories
+
+If it's "other", use the clarification tool to politely explain that you can only help with those 3 specific services and ask them to rephrase their request.
+
+{BASE_INTERACTION_GUIDELINES}"""
+
+
+@dataclass
+class AgentSession:
+    """Per-chat state: the bounded conversation context, and the plan run waiting for the user to answer a
+    clarification, if any"""
+
+    plan: PlanV2 | None = None
+    plan_run: PlanRun | None = None
+    context: ConversationContext = field(default_factory=ConversationContext)
 
-        # Force UI update to show message immediately
-        st.rerun()
+    def clear(self):
+        self.plan = None
+        self.plan_run = None
 
 
 @st.cache_resource
@@ -74,42 +90,52 @@ def get_portia():
         default_log_level=LogLevel.DEBUG,
     )
 
-    return Portia(
-        config=config,
-        execution_hooks=ExecutionHooks(
-            clarification_handler=UserMessageClarificationHandler()
-        ),
-    )
+    # Repeated instruction questions are answered from cached search results
+    tools = with_search_cache(DefaultToolRegistry(config))
 
+    # No clarification handler: a run that needs the user's input stops in the NEED_CLARIFICATION state and is
+    # resumed with the user's next message
+    return Portia(config=config, tools=tools)
 
-@st.cache_resource
-def create_vehicle_assistance_plan():
-    return (
-        PlanBuilderV2("Vehicle Assistance Agent specialized in 3 key services")
-        .input(
-            name="previous_conversation",
-            description="The previous conversation with the user",
+
+# Cached with functools rather than st.cache_resource, as it is called from the app's background event loop
+@cache
+def create_vehicle_assistance_plan(
+    fast_classification: bool = False, plan_builder: type[PlanBuilderV2] = PlanBuilderV2
+):
+    """Build the plan, classifying the conversation with the LLM unless the intent classifier already has"""
+    builder = plan_builder(
+        "Vehicle Assistance Agent specialized in 3 key services"
+    ).input(
+        name="previous_conversation",
+        description="The previous conversation with the user",
+    ).input(
+        name="prefilled_details",
+        description="Form details already extracted from the user's messages",
+    )
+    if fast_classification:
+        # Same step name and position as the LLM step, so the rest of the plan is unchanged
+        builder.input(
+            name="query_type",
+            description="The query type decided by the intent classifier",
+        ).function_step(
+            step_name="classify_conversation",
+            function=lambda query_type: VehicleAssistanceQueryType(
+                query_type=query_type
+            ),
+            args={"query_type": Input("query_type")},
         )
-        .react_agent_step(
+    else:
+        builder.react_agent_step(
             step_name="classify_conversation",
-            task=f"""Analyze the conversation and classify it into one of these 3 categories by setting query_type to the appropriate value:
-            
-            1. "question_for_instructions": User is asking for instructions on how they can do something related to vehicle services (e.g., "How do I renew my license?", "How do I book a driving test?", "What documents do I need?", "How to register a vehicle?" etc.)
-            Choose this for any question that can be answered with a search of vehicle assistance documentation.
-            
-            2. "process_driving_licence_application": User wants to apply for a new driving license (e.g., "I want to apply for a driving license", "Help me get a new license", "Process my license application")
-            
-            3. "pay_vehicle_tax": User wants to pay vehicle/car tax (e.g., "I need to pay my car tax", "Help me tax my vehicle", "Vehicle tax payment")
-            
-            4. "other": If the conversation doesn't clearly fit into any of the above 3 categories
-            
-            If it's "other", use the clarification tool to politely explain that you can only help with those 3 specific services and ask them to rephrase their request.
-            
-            {BASE_INTERACTION_GUIDELINES}""",
+            task=CLASSIFICATION_TASK,
             inputs=[Input("previous_conversation")],
             allow_agent_clarifications=True,
             output_schema=VehicleAssistanceQueryType,
         )
+
+    return (
+        builder
         .if_(
             condition=lambda classification: classification.query_type
             == QueryType.INSTRUCTIONS,
@@ -135,7 +161,7 @@ def create_vehicle_assistance_plan():
             task=f"""Collect all necessary information for a driving license application. Ask the user for their full name, date of birth, current address, phone number, email and if they're replacing an existing license (and its number). Make sure you get all required information before proceeding.
 
             {FORM_COLLECTION_GUIDELINES}""",
-            inputs=[Input("previous_conversation")],
+            inputs=[Input("previous_conversation"), Input("prefilled_details")],
             allow_agent_clarifications=True,
             output_schema=DrivingLicenseApplication,
         )
@@ -154,7 +180,7 @@ def create_vehicle_assistance_plan():
             task=f"""Collect all necessary information for vehicle tax payment. Ask the user for their vehicle registration number, make and model, and the vehicle owner's name. Make sure you get all required information before proceeding.
 
             {FORM_COLLECTION_GUIDELINES}""",
-            inputs=[Input("previous_conversation")],
+            inputs=[Input("previous_conversation"), Input("prefilled_details")],
             allow_agent_clarifications=True,
             output_schema=CarTaxPayment,
         )
@@ -173,22 +199,76 @@ def create_vehicle_assistance_plan():
     )
 
 
-async def run_vehicle_assistance_agent(conversation_history):
-    """Run the Vehicle Assistance agent with the conversation history"""
-    portia = get_portia()
-    plan = create_vehicle_assistance_plan()
+async def start_plan_run(portia, session, conversation_history, plan_builder):
+    """Classify the conversation and start a new run of the plan"""
+    # Decide the easy classifications locally, and only run the LLM classification step when unsure
+    prediction = classifier.classify(conversation_history)
+    logger().info(
+        f"Intent classifier: {prediction.query_type} ({prediction.method}, "
+        f"similarity {prediction.similarity:.2f}, margin {prediction.margin:.2f})"
+    )
+    plan = create_vehicle_assistance_plan(
+        fast_classification=prediction.query_type is not None,
+        plan_builder=plan_builder,
+    )
 
-    conversation_text = "\n".join(
-        [
-            f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
-            for msg in conversation_history
-        ]
+    # Only recent messages go in verbatim, so the prompt size stays capped however long the chat gets
+    conversation_text = await session.context.render(
+        conversation_history, portia.config.get_default_model()
     )
+    plan_run_inputs = {
+        "previous_conversation": conversation_text,
+        # Fields with a distinctive format are read from the messages directly, so the LLM only asks for the rest
+        "prefilled_details": prefilled_details(conversation_history),
+    }
+    if prediction.query_type is not None:
+        plan_run_inputs["query_type"] = prediction.query_type.value
+    return plan, await portia.arun_plan(plan, plan_run_inputs=plan_run_inputs)
+
+
+async def resume_plan_run(portia, session, conversation_history):
+    """Answer the pending clarification with the user's message and carry on from the step that raised it"""
+    plan_run = session.plan_run
+    clarification = plan_run.get_outstanding_clarifications()[0]
+    # The reply usually carries the details the collection step asked for, so pre-extract them again, from the
+    # whole conversation, and pass them along with the reply
+    response = conversation_history[-1]["content"]
+    if (details := prefilled_details(conversation_history)) != "None":
+        response += f"\n\nDetails already extracted from the conversation:\n{details}"
+    plan_run = portia.resolve_clarification(clarification, response, plan_run)
+    return session.plan, await portia.resume_builder_plan(
+        session.plan, plan_run=plan_run
+    )
+
+
+async def run_vehicle_assistance_agent(
+    conversation_history, session, portia=None, plan_builder=PlanBuilderV2
+):
+    """Run the Vehicle Assistance agent for the latest message in the conversation
+
+    If the session's plan run is waiting on a clarification, the message answers it and that run resumes, so
+    each turn only does the new work rather than replaying the whole conversation. The load test passes its own
+    portia and plan_builder to run the agent against stubs.
+    """
+    portia = portia or get_portia()
 
     try:
-        plan_run = await portia.arun_plan(
-            plan, plan_run_inputs={"previous_conversation": conversation_text}
-        )
+        if session.plan_run is not None:
+            plan, plan_run = await resume_plan_run(portia, session, conversation_history)
+        else:
+            plan, plan_run = await start_plan_run(
+                portia, session, conversation_history, plan_builder
+            )
+        session.clear()
+
+        if plan_run.state == PlanRunState.NEED_CLARIFICATION:
+            session.plan, session.plan_run = plan, plan_run
+            clarification = plan_run.get_outstanding_clarifications()[0]
+            return (
+                clarification.user_guidance
+                or "I need some additional information from you."
+            )
+        session.context.pin_forms(plan_run)
 
         if "$step_2_output" in plan_run.outputs.step_outputs:
             value = plan_run.outputs.step_outputs["$step_2_output"].get_value().answer
@@ -202,5 +282,6 @@ async def run_vehicle_assistance_agent(conversation_history):
         return value + "\n\nPlease let me know if you need further assistance."
 
     except Exception as e:
+        session.clear()
         logger().error("Error processing request", e)
         return "I'm sorry, I encountered an issue processing your request. Please try again or rephrase your question."
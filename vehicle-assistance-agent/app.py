@@ -1,18 +1,51 @@
 import asyncio
+import threading
 
 import streamlit as st
-from agent import run_vehicle_assistance_agent
+from agent import AgentSession, get_portia, run_vehicle_assistance_agent
 from dotenv import load_dotenv
+from job_queue import WorkerPool, get_job_queue
+from processing import JOB_HANDLERS
+from search_cache import search_cache
 
 # Load environment variables at app startup
 load_dotenv()
 
 
+@st.cache_resource
+def get_event_loop():
+    """Start one long-lived event loop in a background thread, shared by every turn and user
+
+    Running each turn with asyncio.run would create and close an event loop per message, tearing down the
+    async HTTP clients and LLM connections of the Portia instance with it. Running every turn on this loop
+    keeps their connection pools warm.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=loop.run_forever, name="vehicle-assistance-event-loop", daemon=True
+    ).start()
+    return loop
+
+
+@st.cache_resource
+def start_job_workers():
+    """Process queued applications and payments in the background, on the app's event loop"""
+    return asyncio.run_coroutine_threadsafe(
+        WorkerPool(get_job_queue(), JOB_HANDLERS).run(), get_event_loop()
+    )
+
+
 def send_message(message, conversation_history):
     """Send a message and get response from the Vehicle Assistance agent"""
     conversation_history.append({"role": "user", "content": message})
 
-    response = asyncio.run(run_vehicle_assistance_agent(conversation_history))
+    future = asyncio.run_coroutine_threadsafe(
+        run_vehicle_assistance_agent(
+            conversation_history, st.session_state.agent_session, get_portia()
+        ),
+        get_event_loop(),
+    )
+    response = future.result()
 
     st.session_state.messages.append({"role": "assistant", "content": response})
 
@@ -20,6 +53,8 @@ def send_message(message, conversation_history):
 
 
 def main():
+    start_job_workers()
+
     st.title("🚗 Vehicle Assistance Specialized Assistant")
     st.write("I can help you with these 3 specific vehicle assistance services:")
 
@@ -40,6 +75,8 @@ def main():
 
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "agent_session" not in st.session_state:
+        st.session_state.agent_session = AgentSession()
 
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
@@ -84,10 +121,22 @@ def main():
 
         st.divider()
 
+        st.header("Check a Reference")
+        if reference := st.text_input("Application or payment reference"):
+            job = get_job_queue().status(reference.strip().upper())
+            if job is None:
+                st.text("Reference not found")
+            else:
+                st.text(f"{job.status.capitalize()}: {job.result or job.error or ''}")
+
+        st.divider()
+
         st.header("Chat Controls")
         if st.button("Clear Conversation"):
             st.session_state.messages = []
+            st.session_state.agent_session = AgentSession()
             st.rerun()
+        st.caption(str(search_cache.stats))
 
         st.subheader("Conversation History")
         if st.session_state.messages:
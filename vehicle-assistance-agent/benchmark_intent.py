@@ -0,0 +1,146 @@
+"""Measure the accuracy and latency of the local intent classifier on a labelled set of utterances.
+
+For each utterance the classifier either decides a query type or defers to the LLM. The benchmark reports:
+- coverage: the share of utterances decided locally,
+- accuracy: the share of those decisions that are correct. "Other" utterances should always be deferred, since
+  only the LLM step can ask the user to rephrase, so deciding one counts as a mistake,
+- latency of the local classifier, and with `--llm` the accuracy and latency of the LLM classification step.
+
+    uv run benchmark_intent.py
+    uv run benchmark_intent.py --llm
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from intent_classifier import classifier
+from models import QueryType
+
+# Held out from the classifier's training examples.
+LABELLED_UTTERANCES: list[tuple[str, QueryType]] = [
+    ("How do I renew my photocard licence?", QueryType.INSTRUCTIONS),
+    ("What documents do I need to tax a car?", QueryType.INSTRUCTIONS),
+    ("How can I book my practical driving test?", QueryType.INSTRUCTIONS),
+    ("How to tell the DVLA about a medical condition?", QueryType.INSTRUCTIONS),
+    ("What is the process for changing the name on my licence?", QueryType.INSTRUCTIONS),
+    ("Where do I report a change of address for my car?", QueryType.INSTRUCTIONS),
+    ("How do I get a replacement V5C logbook?", QueryType.INSTRUCTIONS),
+    ("Can I drive while my licence application is being processed?", QueryType.INSTRUCTIONS),
+    ("What happens if I don't tax my car?", QueryType.INSTRUCTIONS),
+    ("How much does a provisional licence cost?", QueryType.INSTRUCTIONS),
+    ("When should I renew my licence after turning 70?", QueryType.INSTRUCTIONS),
+    ("Is an MOT needed before I can tax my car?", QueryType.INSTRUCTIONS),
+    ("I want to apply for a provisional driving licence", QueryType.DRIVING_LICENSE),
+    ("Please process a new licence application for me", QueryType.DRIVING_LICENSE),
+    ("Help me apply for my driving licence", QueryType.DRIVING_LICENSE),
+    ("I need to get a driving licence", QueryType.DRIVING_LICENSE),
+    ("Can you help me get my first licence", QueryType.DRIVING_LICENSE),
+    ("Apply for a full licence", QueryType.DRIVING_LICENSE),
+    ("I'd like a new driving license please", QueryType.DRIVING_LICENSE),
+    ("Start a driving licence application", QueryType.DRIVING_LICENSE),
+    ("I want to pay my vehicle tax", QueryType.VEHICLE_TAX),
+    ("Pay the road tax for my motorbike", QueryType.VEHICLE_TAX),
+    ("Tax my car please", QueryType.VEHICLE_TAX),
+    ("I need to renew the tax on my van", QueryType.VEHICLE_TAX),
+    ("Help me pay car tax", QueryType.VEHICLE_TAX),
+    ("Can you sort my vehicle tax payment", QueryType.VEHICLE_TAX),
+    ("My road tax runs out tomorrow, pay it for me", QueryType.VEHICLE_TAX),
+    ("Car tax payment", QueryType.VEHICLE_TAX),
+    ("What's a good film to watch tonight?", QueryType.OTHER),
+    ("Book me a flight to Spain", QueryType.OTHER),
+    ("I want to sell my house", QueryType.OTHER),
+    ("How do I file my income tax return?", QueryType.OTHER),
+    ("Who won the football last night?", QueryType.OTHER),
+    ("Hi there", QueryType.OTHER),
+    ("Find me a cheap car insurance quote", QueryType.OTHER),
+    ("Write me a poem about cars", QueryType.OTHER),
+    # Taxes and licences that aren't about vehicles or driving
+    ("I need to pay my council tax", QueryType.OTHER),
+    ("I want to pay tax on my income", QueryType.OTHER),
+    ("I need to renew my tax", QueryType.OTHER),
+    ("I want a new licence plate", QueryType.OTHER),
+    ("Apply for a licence to sell alcohol", QueryType.OTHER),
+    ("I need a TV licence", QueryType.OTHER),
+    ("Help me get a fishing licence", QueryType.OTHER),
+]
+
+
+def benchmark_local(utterances: list[tuple[str, QueryType]]) -> None:
+    decided = correct = 0
+    latencies = []
+    mistakes = []
+    for utterance, label in utterances:
+        start = time.perf_counter()
+        prediction = classifier.classify([{"role": "user", "content": utterance}])
+        latencies.append(time.perf_counter() - start)
+        if prediction.query_type is None:
+            continue
+        decided += 1
+        if prediction.query_type == label:
+            correct += 1
+        else:
+            mistakes.append((utterance, label, prediction))
+
+    print(f"Local classifier on {len(utterances)} utterances")
+    print(f"  Coverage:  {decided / len(utterances):.0%} decided locally, the rest deferred to the LLM")
+    print(f"  Accuracy:  {correct / decided if decided else 0:.0%} of local decisions")
+    print(
+        f"  Latency:   median {statistics.median(latencies) * 1e3:.3f}ms, "
+        f"max {max(latencies) * 1e3:.3f}ms"
+    )
+    for utterance, label, prediction in mistakes:
+        print(f"  Wrong:     {utterance!r} -> {prediction.query_type.value} ({prediction.method}), expected {label.value}")
+
+
+async def benchmark_llm(utterances: list[tuple[str, QueryType]]) -> None:
+    from portia import Config, Portia
+    from portia.builder.plan_builder_v2 import PlanBuilderV2
+    from portia.builder.reference import Input
+
+    from agent import CLASSIFICATION_TASK
+    from models import VehicleAssistanceQueryType
+
+    portia = Portia(Config.from_default(default_model="openai/gpt-4o"))
+    plan = (
+        PlanBuilderV2("Classify a vehicle assistance conversation")
+        .input(name="previous_conversation", description="The previous conversation with the user")
+        .react_agent_step(
+            step_name="classify_conversation",
+            task=CLASSIFICATION_TASK,
+            inputs=[Input("previous_conversation")],
+            output_schema=VehicleAssistanceQueryType,
+        )
+        .build()
+    )
+    correct = 0
+    latencies = []
+    for utterance, label in utterances:
+        start = time.perf_counter()
+        plan_run = await portia.arun_plan(
+            plan, plan_run_inputs={"previous_conversation": f"User: {utterance}"}
+        )
+        latencies.append(time.perf_counter() - start)
+        output = plan_run.outputs.final_output
+        if output and output.get_value().query_type == label:
+            correct += 1
+
+    print(f"LLM classification step on {len(utterances)} utterances")
+    print(f"  Accuracy:  {correct / len(utterances):.0%}")
+    print(
+        f"  Latency:   median {statistics.median(latencies):.2f}s, "
+        f"max {max(latencies):.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--llm", action="store_true", help="Also benchmark the LLM classification step (needs API keys)."
+    )
+    args = parser.parse_args()
+
+    benchmark_local(LABELLED_UTTERANCES)
+    if args.llm:
+        asyncio.run(benchmark_llm(LABELLED_UTTERANCES))
@@ -0,0 +1,99 @@
+"""Bounded conversation context for the vehicle assistance plan.
+
+Every agent step of the plan gets the conversation as its `previous_conversation` input, so sending the whole
+chat makes prompts grow for as long as the user keeps talking. `ConversationContext` caps it:
+
+- the last few messages are kept verbatim (each trimmed to a maximum length),
+- older messages are folded into a running summary. The summary is cached, so each message is only
+  summarised once, when it drops out of the verbatim window,
+- form details the agent has already collected (`DrivingLicenseApplication`, `CarTaxPayment`) are pinned as
+  structured state, so they are never lost to summarisation.
+"""
+
+import json
+from dataclasses import dataclass, field
+
+from portia import PlanRun, logger
+from portia.model import Message
+from pydantic import BaseModel
+
+from models import CarTaxPayment, DrivingLicenseApplication
+
+RECENT_MESSAGES = 6
+MAX_MESSAGE_CHARS = 1000
+MAX_SUMMARY_CHARS = 1500
+
+SUMMARY_PROMPT = """You are keeping a running summary of a chat between a user and a UK vehicle assistance agent.
+Update the summary with the new messages below. Keep what the user wants, any details they have given and what
+the agent has already done. Write at most {max_chars} characters.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+PINNED_FORMS = {
+    "Driving license application": DrivingLicenseApplication,
+    "Vehicle tax payment": CarTaxPayment,
+}
+
+
+def format_message(message: dict[str, str]) -> str:
+    role = "User" if message["role"] == "user" else "Assistant"
+    content = message["content"]
+    if len(content) > MAX_MESSAGE_CHARS:
+        content = content[:MAX_MESSAGE_CHARS] + "..."
+    return f"{role}: {content}"
+
+
+@dataclass
+class ConversationContext:
+    """The running summary and pinned form details for one chat"""
+
+    summary: str = ""
+    summarised_messages: int = 0
+    pinned: dict[str, BaseModel] = field(default_factory=dict)
+
+    async def render(self, conversation_history: list[dict[str, str]], model) -> str:
+        """The conversation text for the plan: pinned details, the summary and the most recent messages"""
+        older = conversation_history[:-RECENT_MESSAGES] if RECENT_MESSAGES else conversation_history
+        if len(older) > self.summarised_messages:
+            await self._summarise(older[self.summarised_messages :], model)
+            self.summarised_messages = len(older)
+
+        sections = []
+        if self.pinned:
+            details = [f"- {name}: {json.dumps(form.model_dump())}" for name, form in self.pinned.items()]
+            sections.append("Details the user has already provided:\n" + "\n".join(details))
+        if self.summary:
+            sections.append(f"Summary of the earlier conversation:\n{self.summary}")
+        recent = conversation_history[len(older) :]
+        sections.append("\n".join(format_message(message) for message in recent))
+        return "\n\n".join(sections)
+
+    async def _summarise(self, messages: list[dict[str, str]], model) -> None:
+        prompt = SUMMARY_PROMPT.format(
+            max_chars=MAX_SUMMARY_CHARS,
+            summary=self.summary or "(none yet)",
+            messages="\n".join(format_message(message) for message in messages),
+        )
+        try:
+            response = await model.aget_response([Message(role="user", content=prompt)])
+            summary = str(response.content)
+        except Exception as e:
+            # Fall back to keeping the start of each user message rather than failing the turn
+            logger().warning(f"Could not summarise the conversation: {e}")
+            summary = "\n".join(
+                [self.summary]
+                + [f"User said: {m['content'][:200]}" for m in messages if m["role"] == "user"]
+            )
+        self.summary = summary.strip()[-MAX_SUMMARY_CHARS:]
+
+    def pin_forms(self, plan_run: PlanRun) -> None:
+        """Pin any form details the plan run collected"""
+        for output in plan_run.outputs.step_outputs.values():
+            value = output.get_value()
+            for name, form in PINNED_FORMS.items():
+                if isinstance(value, form):
+                    self.pinned[name] = value
@@ -0,0 +1,127 @@
+"""Deterministic pre-extraction of form fields from the user's messages.
+
+The collection steps ask the LLM to pull details like an email address or a vehicle registration out of free
+text, which often takes a few clarification round trips. Fields with a distinctive format can be matched
+reliably with a regular expression and a validator instead:
+
+- email addresses,
+- UK phone numbers (mobile and landline, with or without +44),
+- dates of birth as DD/MM/YYYY (also with - or . separators), checked to be real dates in a plausible range,
+- UK vehicle registrations in the current format (AB12 CDE), checked for a valid age identifier,
+- DVLA driving licence numbers,
+- names given as "my name is ...", and car makes followed by a model,
+- the vehicle owner's name, when it is given as "the owner is ..." or the user says they own the vehicle.
+
+Whatever is matched is given to the collection step as already known, so the LLM only asks for the rest.
+"""
+
+import re
+from datetime import date
+
+EMAIL = re.compile(r"\b[\w.+-]+@[\w-]+(\.[\w-]+)+\b")
+PHONE = re.compile(r"(?<![\d+])(?:\+44\s?|0)(?:\d\s?){9,10}(?!\d)")
+DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+# Two letters for the region, two digits for the age identifier and three random letters (no I, Q or Z).
+REGISTRATION = re.compile(r"\b([A-Z]{2})(\d{2})\s?([A-HJ-PR-Y]{3})\b")
+LICENCE_NUMBER = re.compile(r"\b[A-Z9]{5}\d{6}[A-Z9]{2}\d[A-Z]{2}\b")
+# Two or three capitalised words, which must end at punctuation, a lowercase word or the end of the line. A run of
+# capitalised words that goes on ("Jane Doe Lives Here") is left for the LLM rather than guessed at.
+PERSON = r"([A-Z][a-z'-]+(?:[ \t]+[A-Z][a-z'-]+){1,2})(?=[ \t]*(?:[.,;:!?)\n]|$)|[ \t]+[a-z])"
+NAME = re.compile(rf"\b(?i:my name is|name's|i am called)\s+{PERSON}")
+OWNER_NAME = re.compile(rf"\b(?i:owner is|owner's name is|registered keeper is|keeper is)\s+{PERSON}")
+# The user's own name is only the owner's when they say the vehicle is theirs.
+OWNERSHIP = re.compile(
+    r"\b(i own|i'm the (registered )?(owner|keeper)|i am the (registered )?(owner|keeper)"
+    r"|registered (to me|in my name))\b",
+    re.IGNORECASE,
+)
+CAR_MAKES = (
+    "Audi", "BMW", "Citroen", "Fiat", "Ford", "Honda", "Hyundai", "Jaguar", "Kia", "Land Rover", "Mazda",
+    "Mercedes", "Mini", "Nissan", "Peugeot", "Renault", "Seat", "Skoda", "Tesla", "Toyota", "Vauxhall",
+    "Volkswagen", "VW", "Volvo",
+)  # fmt: skip
+MAKE_MODEL = re.compile(rf"\b({'|'.join(CAR_MAKES)})\s+([A-Z0-9][\w-]*(?:\s+[A-Z0-9][\w-]*)?)\b")
+
+
+def valid_registration(match: re.Match) -> bool:
+    # Age identifiers run from 02 (March 2002) and 51 (September 2001) upwards.
+    age = int(match.group(2))
+    return 2 <= age <= 49 or 51 <= age <= 99
+
+
+def find_date_of_birth(text: str) -> str | None:
+    for day, month, year in DATE.findall(text):
+        try:
+            born = date(int(year), int(month), int(day))
+        except ValueError:
+            continue
+        # Anyone applying for a licence is between 15 and 120 years old.
+        if 15 <= date.today().year - born.year <= 120:
+            return born.strftime("%d/%m/%Y")
+    return None
+
+
+def find_phone_number(text: str) -> str | None:
+    for match in PHONE.finditer(text):
+        digits = re.sub(r"\D", "", match.group(0))
+        national = "0" + digits[2:] if digits.startswith("44") else digits
+        if len(national) == 11:
+            return match.group(0).strip()
+    return None
+
+
+def find_registration(text: str) -> str | None:
+    for match in REGISTRATION.finditer(text.upper()):
+        if valid_registration(match):
+            return f"{match.group(1)}{match.group(2)} {match.group(3)}"
+    return None
+
+
+def find_owner_name(text: str) -> str | None:
+    if match := OWNER_NAME.search(text):
+        return match.group(1)
+    if OWNERSHIP.search(text) and (match := NAME.search(text)):
+        return match.group(1)
+    return None
+
+
+def user_text(conversation_history: list[dict[str, str]]) -> str:
+    return "\n".join(m["content"] for m in conversation_history if m["role"] == "user")
+
+
+def prefill_driving_license_application(conversation_history: list[dict[str, str]]) -> dict[str, str]:
+    """The DrivingLicenseApplication fields that can be read from the user's messages with confidence"""
+    text = user_text(conversation_history)
+    fields = {
+        "email": (match.group(0) if (match := EMAIL.search(text)) else None),
+        "phone_number": find_phone_number(text),
+        "date_of_birth": find_date_of_birth(text),
+        "full_name": (match.group(1) if (match := NAME.search(text)) else None),
+        "previous_license_number": (
+            match.group(0) if (match := LICENCE_NUMBER.search(text.upper())) else None
+        ),
+    }
+    return {name: value for name, value in fields.items() if value}
+
+
+def prefill_car_tax_payment(conversation_history: list[dict[str, str]]) -> dict[str, str]:
+    """The CarTaxPayment fields that can be read from the user's messages with confidence"""
+    text = user_text(conversation_history)
+    fields = {
+        "vehicle_registration": find_registration(text),
+        "make_model": (" ".join(match.groups()) if (match := MAKE_MODEL.search(text)) else None),
+        "owner_name": find_owner_name(text),
+    }
+    return {name: value for name, value in fields.items() if value}
+
+
+def prefilled_details(conversation_history: list[dict[str, str]]) -> str:
+    """Describe the pre-extracted fields for the collection steps"""
+    sections = []
+    for form, fields in (
+        ("Driving license application", prefill_driving_license_application(conversation_history)),
+        ("Vehicle tax payment", prefill_car_tax_payment(conversation_history)),
+    ):
+        if fields:
+            sections.append(f"{form}: " + ", ".join(f"{name}={value}" for name, value in fields.items()))
+    return "\n".join(sections) or "None"
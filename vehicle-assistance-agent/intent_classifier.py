@@ -0,0 +1,213 @@
+"""A fast, local classifier for the vehicle assistance conversation.
+
+Classifying the conversation with a react agent step adds a whole agent loop to every chat turn. Most messages
+are easy to classify though, so this module tries two cheap methods first:
+
+- keyword rules for the common phrasings ("apply for a licence", "pay my car tax", "how do I ..."),
+- a nearest-centroid model over bags of words and word bigrams, trained on the example utterances below.
+
+When they agree, or one of them is confident and the other has no opinion, the classification is decided in
+well under a millisecond. Anything else - including every "other" query, which needs a clarification to ask the
+user to rephrase - is left to the LLM step.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from models import QueryType
+
+# The best centroid must be at least this similar, and this much more similar than the runner-up.
+MIN_SIMILARITY = 0.3
+MIN_MARGIN = 0.08
+
+WORD = re.compile(r"[a-z0-9']+")
+QUESTION = re.compile(
+    r"^(how|what|where|when|which|why|who|can i|do i|does|is|are|should|will|could i)\b|\?\s*$"
+)
+# Only licences qualified as driving licences, so "a licence to sell alcohol" or "a licence plate" don't match.
+LICENCE = r"(driving|provisional|full|first|photocard) licen[cs]e(?! plates?\b)"
+VEHICLE = r"(car|vehicle|van|motorbike|motorcycle)"
+RULES = {
+    QueryType.DRIVING_LICENSE: [
+        re.compile(rf"\b(apply|applying|application|get|need|want|process)\b.*\b{LICENCE}\b"),
+        re.compile(rf"\b{LICENCE} application\b"),
+    ],
+    QueryType.VEHICLE_TAX: [
+        re.compile(rf"\b(pay|paying|payment|renew|sort)\b.*\b({VEHICLE}|road|motor) tax\b"),
+        re.compile(rf"\b(pay|paying|renew|sort)\b.*\btax (on|for) (my|the|our|a) {VEHICLE}\b"),
+        re.compile(rf"\btax (my|the|our|a) {VEHICLE}\b"),
+        re.compile(r"\b(car|vehicle|road) tax payment\b"),
+    ],
+}
+# Asking *how* to do something about driving or vehicles is an instructions question.
+VEHICLE_TOPIC = re.compile(
+    r"\b((my|driving|provisional|full|first|photocard) licen[cs]es?(?! plates?\b)|driv\w*|cars?|vehicles?|"
+    r"vans?|motor\w*|mot|dvla|v5c|logbook|sorn|(road|car|vehicle) tax|tax (my|a|the) \w+)\b"
+)
+INSTRUCTION_RULES = [
+    re.compile(r"^(how (do|can|should|would) i|how to|what (documents|do i need|is the process))\b"),
+    re.compile(r"^(where|when) (do|can|should) i\b"),
+]
+
+TRAINING_EXAMPLES: dict[QueryType, list[str]] = {
+    QueryType.INSTRUCTIONS: [
+        "How do I renew my license?",
+        "How do I book a driving test?",
+        "What documents do I need?",
+        "How to register a vehicle?",
+        "How do I renew my driving license?",
+        "What documents do I need to register a vehicle?",
+        "How to change my address on my license?",
+        "How long does it take to get a licence back after a medical check?",
+        "What are the rules for learner drivers on motorways?",
+        "Can I drive abroad with a UK licence?",
+        "How do I report a vehicle as off the road (SORN)?",
+        "What happens if my MOT has expired?",
+        "How do I transfer ownership of a car I sold?",
+        "Where do I send my old licence?",
+    ],
+    QueryType.DRIVING_LICENSE: [
+        "I want to apply for a driving license",
+        "Help me get a new license",
+        "Process my license application",
+        "Help me get a provisional license",
+        "I'd like to apply for my first driving licence",
+        "Can you submit a licence application for me",
+        "I need a new driving licence please",
+        "Start my provisional licence application",
+        "I want to get my driving licence",
+    ],
+    QueryType.VEHICLE_TAX: [
+        "I need to pay my car tax",
+        "Help me tax my vehicle",
+        "Vehicle tax payment",
+        "I want to pay the road tax on my van",
+        "Pay my vehicle tax now",
+        "Can you tax my car for me",
+        "My car tax is due, can you pay it",
+        "I'd like to renew my vehicle tax",
+    ],
+    QueryType.OTHER: [
+        "What's the weather like today?",
+        "Tell me a joke",
+        "Can you book me a restaurant table?",
+        "What is the capital of France?",
+        "I want to buy a new car",
+        "Help me with my tax return",
+        "Recommend a good insurance company",
+        "Hello",
+    ],
+}
+
+
+@dataclass
+class IntentPrediction:
+    """A classification and how it was reached. `query_type` is None when the LLM should decide."""
+
+    query_type: QueryType | None
+    method: str
+    similarity: float = 0.0
+    margin: float = 0.0
+
+
+def features(text: str) -> list[str]:
+    words = WORD.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def feature_vector(text: str) -> dict[str, float]:
+    """The text's words and word bigrams, log-weighted by count and L2-normalised.
+
+    The training vocabulary is a few hundred features, so they are used as the vector's keys directly.
+    """
+    return normalise({feature: 1 + math.log(count) for feature, count in Counter(features(text)).items()})
+
+
+def normalise(vector: dict[str, float]) -> dict[str, float]:
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {feature: value / norm for feature, value in vector.items()}
+
+
+def cosine(a: dict[str, float], b: dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(feature, 0.0) for feature, value in a.items())
+
+
+class IntentClassifier:
+    """Keyword rules plus a nearest-centroid model, deciding only the cases it is confident about."""
+
+    def __init__(self, examples: dict[QueryType, list[str]] = TRAINING_EXAMPLES):
+        self.centroids: dict[QueryType, dict[str, float]] = {}
+        for query_type, utterances in examples.items():
+            centroid: Counter[str] = Counter()
+            for utterance in utterances:
+                centroid.update(feature_vector(utterance))
+            self.centroids[query_type] = normalise(centroid)
+
+    def rule_match(self, message: str) -> QueryType | None:
+        text = message.lower().strip()
+        # Rules skip the LLM, so they only decide messages that are about driving or vehicles.
+        if not VEHICLE_TOPIC.search(text):
+            return None
+        if any(rule.search(text) for rule in INSTRUCTION_RULES):
+            return QueryType.INSTRUCTIONS
+        matches = {
+            query_type
+            for query_type, rules in RULES.items()
+            if not QUESTION.search(text) and any(rule.search(text) for rule in rules)
+        }
+        return matches.pop() if len(matches) == 1 else None
+
+    def nearest_centroid(self, message: str) -> tuple[QueryType, float, float]:
+        vector = feature_vector(message)
+        ranked = sorted(
+            ((cosine(vector, centroid), query_type) for query_type, centroid in self.centroids.items()),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+        (best, query_type), (runner_up, _) = ranked[0], ranked[1]
+        return query_type, best, best - runner_up
+
+    def classify_message(self, message: str) -> IntentPrediction:
+        rule = self.rule_match(message)
+        query_type, similarity, margin = self.nearest_centroid(message)
+        confident = similarity >= MIN_SIMILARITY and margin >= MIN_MARGIN
+        if query_type == QueryType.OTHER and confident:
+            # Only the LLM step can ask the user to rephrase.
+            return IntentPrediction(None, "other", similarity, margin)
+        if rule is not None and (rule == query_type or not confident):
+            return IntentPrediction(rule, "rules", similarity, margin)
+        # The model alone only decides messages about vehicles, and questions only as instructions (questions
+        # are rarely applications or payments).
+        text = message.lower().strip()
+        about_vehicles = VEHICLE_TOPIC.search(text) is not None
+        is_question = QUESTION.search(text) is not None
+        if (
+            rule is None
+            and confident
+            and about_vehicles
+            and (query_type == QueryType.INSTRUCTIONS or not is_question)
+        ):
+            return IntentPrediction(query_type, "centroid", similarity, margin)
+        return IntentPrediction(None, "uncertain", similarity, margin)
+
+    def classify(self, conversation_history: list[dict]) -> IntentPrediction:
+        """Classify the conversation from its user messages, newest first.
+
+        A message that doesn't classify on its own, like a name given in answer to a clarification, defers to
+        the earlier messages. A new question that doesn't classify is left to the LLM.
+        """
+        user_messages = [m["content"] for m in conversation_history if m["role"] == "user"]
+        for i, message in enumerate(reversed(user_messages)):
+            prediction = self.classify_message(message)
+            if prediction.query_type is not None or prediction.method == "other":
+                return prediction
+            if i == 0 and QUESTION.search(message.lower().strip()):
+                return prediction
+        return IntentPrediction(None, "uncertain")
+
+
+classifier = IntentClassifier()
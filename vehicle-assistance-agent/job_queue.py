@@ -0,0 +1,354 @@
+"""A local job queue for the vehicle assistance back office.
+
+Processing a licence application or a tax payment takes a while, and the user shouldn't have to wait for it in
+the chat. The plan's processing steps submit a job to this queue and reply straight away with its reference.
+A pool of async workers picks the jobs up from a SQLite store and processes them in the background, so the
+chat stays fast however much back-office work is queued.
+
+Several pools can share a queue (the app runs one per process, and more can be started from the command line).
+Each claim is a lease held by one pool: the pool's workers renew it with a heartbeat while the job runs, and
+only the owner can finish the job. A job whose lease expires, because its pool stopped, is claimed again, up to
+MAX_ATTEMPTS claims in all; a job that has used them up (for example because it keeps crashing its worker) is
+marked FAILED instead.
+
+The app's queue is opened on first use (`get_job_queue()`), so importing this module creates no files.
+
+The app runs the workers on its background event loop. They can also run in their own process, and the queue
+can be inspected or fed from the command line:
+
+    uv run job_queue.py work --workers 8
+    uv run job_queue.py status VA-3F9C21A04B
+    uv run job_queue.py stats
+    uv run job_queue.py submit-demo --count 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+DEFAULT_QUEUE_PATH = ".portia/vehicle_jobs.sqlite"
+POLL_INTERVAL_SECONDS = 0.2
+# A running job is reclaimed if its owner hasn't renewed the lease for this long.
+LEASE_SECONDS = 60.0
+HEARTBEAT_INTERVAL_SECONDS = 10.0
+# How many times a job is claimed before an expired lease marks it FAILED rather than running it again.
+MAX_ATTEMPTS = 3
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+DONE = "DONE"
+FAILED = "FAILED"
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[str]]
+
+
+@dataclass
+class Job:
+    """A unit of back-office work and its progress"""
+
+    reference: str
+    kind: str
+    payload: dict[str, Any]
+    status: str
+    result: str | None
+    error: str | None
+    submitted_at: float
+    started_at: float | None
+    finished_at: float | None
+    owner: str | None = None
+    heartbeat_at: float | None = None
+    attempts: int = 0
+
+    def __str__(self):
+        detail = self.result or self.error or ""
+        return f"{self.reference} [{self.status}] {self.kind} {detail}".strip()
+
+
+class JobQueue:
+    """A SQLite-backed queue of back-office jobs, safe to share between threads and processes"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    reference TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    submitted_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    owner TEXT,
+                    heartbeat_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Queues created before leases were added lack the lease columns.
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("owner TEXT", "heartbeat_at REAL", "attempts INTEGER NOT NULL DEFAULT 0"):
+                if column.split()[0] not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, submitted_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation keeps the queue safe to use from any thread.
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, kind: str, payload: dict[str, Any], prefix: str = "JOB") -> str:
+        """Queue a job and return its reference"""
+        return self.submit_many(kind, [payload], prefix)[0]
+
+    def submit_many(
+        self, kind: str, payloads: list[dict[str, Any]], prefix: str = "JOB"
+    ) -> list[str]:
+        """Queue many jobs in one transaction and return their references"""
+        now = time.time()
+        rows = [
+            (f"{prefix}-{uuid.uuid4().hex[:10].upper()}", kind, json.dumps(payload), QUEUED, now)
+            for payload in payloads
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO jobs (reference, kind, payload, status, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return [row[0] for row in rows]
+
+    def claim(
+        self, owner: str, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS
+    ) -> Job | None:
+        """Lease the oldest queued job, or a running job whose lease has expired, to the owner.
+
+        A running job's lease runs from its last heartbeat, or from when it was claimed if it has none. Expired
+        jobs that have already been claimed max_attempts times are marked FAILED rather than claimed again.
+
+        Returns None if there is no job to claim.
+        """
+        with closing(self._connect()) as conn:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same job.
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            expired = "status = ? AND COALESCE(heartbeat_at, started_at, submitted_at) < ?"
+            conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE {expired} AND attempts >= ?",
+                (
+                    FAILED,
+                    f"Gave up after {max_attempts} attempts: the job's worker stopped each time",
+                    now,
+                    RUNNING,
+                    now - lease_seconds,
+                    max_attempts,
+                ),
+            )
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = ? OR ({expired}) ORDER BY submitted_at LIMIT 1",
+                (QUEUED, RUNNING, now - lease_seconds),
+            ).fetchone()
+            if row is None:
+                conn.commit()
+                return None
+            attempts = row["attempts"] + 1
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ?, attempts = ? "
+                "WHERE reference = ?",
+                (RUNNING, now, owner, now, attempts, row["reference"]),
+            )
+            conn.commit()
+        return self._job(
+            {
+                **dict(row),
+                "status": RUNNING,
+                "started_at": now,
+                "owner": owner,
+                "heartbeat_at": now,
+                "attempts": attempts,
+            }
+        )
+
+    def heartbeat(self, reference: str, owner: str) -> bool:
+        """Renew the owner's lease on a running job. Returns False if the owner no longer holds it."""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE reference = ? AND owner = ? AND status = ?",
+                (time.time(), reference, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def finish(
+        self, reference: str, owner: str, result: str | None = None, error: str | None = None
+    ) -> bool:
+        """Record the outcome of a job. Returns False, recording nothing, if the owner no longer holds it."""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE reference = ? AND owner = ? AND status = ?",
+                (FAILED if error else DONE, result, error, time.time(), reference, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def status(self, reference: str) -> Job | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE reference = ?", (reference,)).fetchone()
+        return self._job(dict(row)) if row else None
+
+    def jobs(self, status: str | None = None) -> list[Job]:
+        query = "SELECT * FROM jobs"
+        params: tuple[str, ...] = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query + " ORDER BY submitted_at", params).fetchall()
+        return [self._job(dict(row)) for row in rows]
+
+    def metrics(self, window_seconds: float = 300.0) -> dict[str, float | int]:
+        """Queue depth, plus throughput and timings for the jobs finished in the last window_seconds"""
+        jobs = self.jobs()
+        now = time.time()
+        recent = [j for j in jobs if j.finished_at and j.finished_at >= now - window_seconds]
+        waits = [j.started_at - j.submitted_at for j in recent if j.started_at]
+        durations = [j.finished_at - j.started_at for j in recent if j.started_at]
+        # Throughput over the time the workers were busy, rather than the whole window
+        busy = (
+            max(j.finished_at for j in recent) - min(j.started_at or j.finished_at for j in recent)
+            if recent
+            else 0.0
+        )
+        return {
+            "queued": sum(j.status == QUEUED for j in jobs),
+            "running": sum(j.status == RUNNING for j in jobs),
+            "done": sum(j.status == DONE for j in jobs),
+            "failed": sum(j.status == FAILED for j in jobs),
+            "jobs_per_minute": len(recent) / busy * 60 if busy else 0.0,
+            "mean_wait": statistics.fmean(waits) if waits else 0.0,
+            "mean_processing": statistics.fmean(durations) if durations else 0.0,
+        }
+
+    @staticmethod
+    def _job(row: dict[str, Any]) -> Job:
+        return Job(**{**row, "payload": json.loads(row["payload"])})
+
+
+class WorkerPool:
+    """Async workers that process queued jobs with the handler registered for their kind"""
+
+    def __init__(self, queue: JobQueue, handlers: dict[str, JobHandler], workers: int = 4):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        # Identifies this pool's leases, so other pools sharing the queue leave its jobs alone.
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def heartbeat(self, job: Job) -> None:
+        while await asyncio.to_thread(self.queue.heartbeat, job.reference, self.owner):
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+
+    async def work(self) -> None:
+        while True:
+            job = await asyncio.to_thread(self.queue.claim, self.owner)
+            if job is None:
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+                continue
+            heartbeat = asyncio.create_task(self.heartbeat(job))
+            try:
+                result = await self.handlers[job.kind](job.payload)
+            except Exception as e:
+                outcome = {"error": str(e)}
+            else:
+                outcome = {"result": result}
+            finally:
+                heartbeat.cancel()
+            await asyncio.to_thread(self.queue.finish, job.reference, self.owner, **outcome)
+
+    async def run(self) -> None:
+        """Run the workers until cancelled"""
+        await asyncio.gather(*[self.work() for _ in range(self.workers)])
+
+
+_job_queue: JobQueue | None = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the app's queue, opening it on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
+
+
+def set_job_queue(queue: JobQueue) -> None:
+    """Use another queue in place of the app's, e.g. to keep a load test's jobs out of it."""
+    global _job_queue
+    with _job_queue_lock:
+        _job_queue = queue
+
+
+if __name__ == "__main__":
+    from processing import CAR_TAX_PAYMENT, DRIVING_LICENSE_APPLICATION, JOB_HANDLERS
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queue-path", type=str, default=DEFAULT_QUEUE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    work = subparsers.add_parser("work", help="Process queued jobs until interrupted.")
+    work.add_argument("--workers", type=int, default=4)
+    status = subparsers.add_parser("status", help="Look up jobs by reference.")
+    status.add_argument("references", nargs="+")
+    subparsers.add_parser("stats", help="Report queue depth and throughput.")
+    demo = subparsers.add_parser("submit-demo", help="Queue a batch of sample jobs.")
+    demo.add_argument("--count", type=int, default=100)
+
+    args = parser.parse_args()
+    queue = JobQueue(args.queue_path)
+
+    if args.command == "work":
+        try:
+            asyncio.run(WorkerPool(queue, JOB_HANDLERS, args.workers).run())
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "status":
+        for reference in args.references:
+            print(queue.status(reference) or f"{reference} not found")
+    elif args.command == "stats":
+        for key, value in queue.metrics().items():
+            print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    else:
+        licences = [
+            {
+                "full_name": f"Applicant {i}",
+                "date_of_birth": "01/01/1990",
+                "address": f"{i} High Street, London",
+                "phone_number": "07700900000",
+                "email": f"applicant{i}@example.com",
+            }
+            for i in range(args.count // 2)
+        ]
+        payments = [
+            {"vehicle_registration": f"AB{i:02d} CDE", "make_model": "Ford Fiesta", "owner_name": f"Owner {i}"}
+            for i in range(args.count - len(licences))
+        ]
+        references = queue.submit_many(DRIVING_LICENSE_APPLICATION, licences, "VA")
+        references += queue.submit_many(CAR_TAX_PAYMENT, payments, "TAX")
+        print(f"Queued {len(references)} jobs")
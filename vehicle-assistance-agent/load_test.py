@@ -0,0 +1,250 @@
+"""A headless load test for the vehicle assistance agent.
+
+Drives `run_vehicle_assistance_agent` with many concurrent synthetic conversations, covering the three flows:
+
+- instructions: one question, answered after a search,
+- licence: ask to apply, get asked for details, give them, and the application is submitted,
+- tax: the same for a vehicle tax payment.
+
+Everything runs locally, with no network and no API keys. The plan is built with `StubPlanBuilder`, which
+replaces each react agent step with a function step of the same name that waits for a simulated LLM latency
+and returns a canned result (asking for the details with a clarification first in the collection steps).
+Searches go through the real search cache, in front of a stub search with a simulated latency. So the test
+measures the agent's own orchestration - classification, sessions, clarifications and resumption, plan
+execution, the job queue and the search cache - under concurrency, with the LLM and the web search stubbed
+out.
+
+    uv run load_test.py --users 50 --conversations 500
+    uv run load_test.py --users 200 --llm-latency 0 --search-latency 0   # orchestration overhead only
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any
+
+import search_cache
+from agent import AgentSession, run_vehicle_assistance_agent
+from intent_classifier import classifier
+from job_queue import JobQueue, set_job_queue
+from models import (
+    CarTaxPayment,
+    DrivingLicenseApplication,
+    InstructionResponse,
+    QueryType,
+    VehicleAssistanceQueryType,
+)
+from portia import Config, InputClarification, Portia, StorageClass
+from portia.builder.plan_builder_v2 import PlanBuilderV2
+from portia.model import GenerativeModel
+
+ERROR_PREFIX = "I'm sorry, I encountered an issue"
+
+INSTRUCTION_QUESTIONS = [
+    "How do I renew my driving licence?",
+    "What documents do I need to register a vehicle?",
+    "How do I change my address on my licence?",
+    "How can I book my practical driving test?",
+    "What happens if my MOT has expired?",
+    "How do I report a vehicle as off the road?",
+]
+FLOWS = {
+    "instructions": lambda user: [random.choice(INSTRUCTION_QUESTIONS)],
+    "licence": lambda user: [
+        f"I want to apply for a driving licence (load test user {user})",
+        f"Sam Driver {user}, 01/02/1990, {user} High Street London, 07700900000, sam{user}@example.com",
+    ],
+    "tax": lambda user: [
+        f"I need to pay my car tax (load test user {user})",
+        f"AB{user % 100:02d} CDE, Ford Fiesta, Sam Driver {user}",
+    ],
+}
+
+llm_latency = 0.8
+search_latency = 1.0
+
+
+async def simulated_latency(mean: float) -> None:
+    if mean:
+        await asyncio.sleep(random.uniform(0.5 * mean, 1.5 * mean))
+
+
+class UnstubbedLLMCallError(AssertionError):
+    """Raised when the plan reaches the LLM, which means one of its steps isn't stubbed"""
+
+
+class StubModel(GenerativeModel):
+    """A model that must never be called: every LLM step of the plan is stubbed"""
+
+    def __init__(self):
+        super().__init__(model_name="stub")
+
+    @staticmethod
+    def unstubbed(call: str, messages=None) -> UnstubbedLLMCallError:
+        prompt = str(messages[-1].content)[:200] if messages else ""
+        return UnstubbedLLMCallError(
+            f"The load test stubs every LLM step, but the plan called {call}. "
+            f"Stub the step with StubPlanBuilder. Last message: {prompt!r}"
+        )
+
+    def get_response(self, messages):
+        raise self.unstubbed("get_response", messages)
+
+    def get_structured_response(self, messages, schema, **kwargs):
+        raise self.unstubbed(f"get_structured_response for {schema.__name__}", messages)
+
+    async def aget_response(self, messages):
+        return self.get_response(messages)
+
+    async def aget_structured_response(self, messages, schema, **kwargs):
+        return self.get_structured_response(messages, schema, **kwargs)
+
+    def to_langchain(self):
+        raise self.unstubbed("to_langchain")
+
+
+async def stub_search(question: str) -> Any:
+    """Search through the real search cache, in front of a simulated web search"""
+    if (cached := search_cache.search_cache.get(question)) is not None:
+        return cached
+    start = time.perf_counter()
+    await simulated_latency(search_latency)
+    result = [{"title": "GOV.UK", "content": f"Official guidance about: {question}"}]
+    search_cache.search_cache.put(question, result, time.perf_counter() - start)
+    return result
+
+
+def last_user_message(conversation: str) -> str:
+    messages = [line[len("User: ") :] for line in conversation.splitlines() if line.startswith("User: ")]
+    return messages[-1] if messages else conversation
+
+
+def stub_agent_step(step_name: str, output_schema: type) -> Any:
+    """A function standing in for a react agent step, returning a canned result after a simulated latency"""
+    # Collection steps ask for the details once per conversation, then return them when resumed.
+    asked: set[str] = set()
+
+    async def run(conversation: str) -> Any:
+        await simulated_latency(llm_latency)
+        if output_schema is VehicleAssistanceQueryType:
+            prediction = classifier.classify_message(last_user_message(conversation))
+            return VehicleAssistanceQueryType(
+                query_type=prediction.query_type or QueryType.INSTRUCTIONS
+            )
+        if output_schema is InstructionResponse:
+            question = last_user_message(conversation)
+            results = await stub_search(question)
+            await simulated_latency(llm_latency)
+            return InstructionResponse(answer=f"{results[0]['content']}")
+        if conversation not in asked:
+            asked.add(conversation)
+            return InputClarification(
+                user_guidance="Please tell me the details I need to carry on.",
+                argument_name="details",
+                plan_run_id=None,
+            )
+        if output_schema is DrivingLicenseApplication:
+            return DrivingLicenseApplication(
+                full_name="Sam Driver",
+                date_of_birth="01/02/1990",
+                address="1 High Street, London",
+                phone_number="07700900000",
+                email="sam@example.com",
+            )
+        return CarTaxPayment(
+            vehicle_registration="AB12 CDE", make_model="Ford Fiesta", owner_name="Sam Driver"
+        )
+
+    run.__name__ = step_name
+    return run
+
+
+class StubPlanBuilder(PlanBuilderV2):
+    """Builds the agent's plan with every react agent step replaced by a stub function step of the same name"""
+
+    def react_agent_step(self, *, step_name, task, inputs, output_schema, **kwargs):
+        return self.function_step(
+            step_name=step_name,
+            function=stub_agent_step(step_name, output_schema),
+            args={"conversation": inputs[0]},
+        )
+
+
+async def run_conversation(
+    portia: Portia, flow: str, user: int, latencies: dict, errors: dict
+) -> None:
+    history: list[dict[str, str]] = []
+    session = AgentSession()
+    for message in FLOWS[flow](user):
+        history.append({"role": "user", "content": message})
+        start = time.perf_counter()
+        response = await run_vehicle_assistance_agent(
+            history, session, portia, plan_builder=StubPlanBuilder
+        )
+        latencies[flow].append(time.perf_counter() - start)
+        history.append({"role": "assistant", "content": response})
+        if response.startswith(ERROR_PREFIX):
+            errors[flow] += 1
+            return
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def main(users: int, conversations: int) -> None:
+    portia = Portia(
+        Config.from_default(storage_class=StorageClass.MEMORY, default_model=StubModel()),
+        tools=[],
+    )
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    limit = asyncio.Semaphore(users)
+    flows = list(FLOWS)
+
+    async def simulate_user(user: int) -> None:
+        async with limit:
+            await run_conversation(portia, flows[user % len(flows)], user, latencies, errors)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[simulate_user(user) for user in range(conversations)])
+    elapsed = time.perf_counter() - start
+
+    turns = sum(len(values) for values in latencies.values())
+    print(f"{conversations} conversations ({turns} turns) with {users} concurrent users in {elapsed:.1f}s")
+    print(f"Throughput: {turns / elapsed:.1f} turns/s, {conversations / elapsed:.1f} conversations/s")
+    print(f"{'flow':<14}{'turns':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for flow in flows:
+        values = latencies[flow]
+        if not values:
+            continue
+        print(
+            f"{flow:<14}{len(values):>7}{statistics.median(values):>8.2f}s"
+            f"{percentile(values, 95):>8.2f}s{percentile(values, 99):>8.2f}s{errors[flow]:>8}"
+        )
+    print(search_cache.search_cache.stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20, help="Conversations in flight at once.")
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=llm_latency, help="Mean stub LLM step seconds.")
+    parser.add_argument("--search-latency", type=float, default=search_latency)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    llm_latency, search_latency = args.llm_latency, args.search_latency
+
+    # Keep the load test's jobs and cached searches out of the app's own stores.
+    workdir = tempfile.mkdtemp(prefix="vehicle-load-test-")
+    set_job_queue(JobQueue(os.path.join(workdir, "jobs.sqlite")))
+    search_cache.search_cache = search_cache.SearchCache(os.path.join(workdir, "search_cache.sqlite"))
+
+    asyncio.run(main(args.users, args.conversations))
@@ -1,21 +1,26 @@
 import asyncio
-import time
 
+from job_queue import get_job_queue
 from models import CarTaxPayment, DrivingLicenseApplication
 
+DRIVING_LICENSE_APPLICATION = "driving_license_application"
+CAR_TAX_PAYMENT = "car_tax_payment"
+
 
 async def process_driving_license_application(
     application: DrivingLicenseApplication,
 ) -> str:
-    """Process a driving license application"""
-    # Simulate processing time
-    await asyncio.sleep(2)
+    """Submit a driving license application for processing"""
+    # Queue the application for the back office rather than making the user wait for it
+    reference = await asyncio.to_thread(
+        get_job_queue().submit, DRIVING_LICENSE_APPLICATION, application.model_dump(), "VA"
+    )
 
-    return f"""✅ **Driving License Application Processed Successfully!**
+    return f"""✅ **Driving License Application Submitted Successfully!**
 
 Your application has been submitted with the following details:
 - **Name**: {application.full_name}
-- **Date of Birth**: {application.date_of_birth}  
+- **Date of Birth**: {application.date_of_birth}
 - **Email**: {application.email}
 
 **Next Steps:**
@@ -23,25 +28,48 @@ Your application has been submitted with the following details:
 - Your new license will be processed within 10-15 working days
 - You'll be notified when it's ready for collection or posted to your address
 
-**Application Reference**: VA-{int(time.time())}"""
+**Application Reference**: {reference}"""
 
 
 async def process_car_tax_payment(payment: CarTaxPayment) -> str:
-    """Process a car tax payment"""
-    # Simulate processing time
-    await asyncio.sleep(2)
+    """Submit a car tax payment for processing"""
+    reference = await asyncio.to_thread(
+        get_job_queue().submit, CAR_TAX_PAYMENT, payment.model_dump(), "TAX"
+    )
 
-    return f"""✅ **Car Tax Payment Processed Successfully!**
+    return f"""✅ **Car Tax Payment Submitted Successfully!**
 
-Your vehicle tax has been paid for:
+Your vehicle tax payment has been submitted for:
 - **Vehicle**: {payment.vehicle_registration} ({payment.make_model})
 - **Owner**: {payment.owner_name}
-- **Amount Paid**: £165
+- **Amount**: £165
 
 **Important:**
-- Your new tax disc information has been updated in the vehicle assistance database
+- Your new tax disc information will be updated in the vehicle assistance database
 - You should receive confirmation within 2-3 working days
 - No physical tax disc will be sent (digital system)
-- Keep this confirmation for your records
+- Keep this reference for your records
+
+**Payment Reference**: {reference}"""
+
+
+async def run_driving_license_application_job(payload: dict) -> str:
+    """Back-office processing of a queued driving license application"""
+    application = DrivingLicenseApplication(**payload)
+    # Simulate processing time
+    await asyncio.sleep(2)
+    return f"Driving license application for {application.full_name} processed"
+
+
+async def run_car_tax_payment_job(payload: dict) -> str:
+    """Back-office processing of a queued car tax payment"""
+    payment = CarTaxPayment(**payload)
+    # Simulate processing time
+    await asyncio.sleep(2)
+    return f"Vehicle tax paid for {payment.vehicle_registration}"
+
 
-**Payment Reference**: TAX-{int(time.time())}"""
+JOB_HANDLERS = {
+    DRIVING_LICENSE_APPLICATION: run_driving_license_application_job,
+    CAR_TAX_PAYMENT: run_car_tax_payment_job,
+}
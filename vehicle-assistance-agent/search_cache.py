@@ -0,0 +1,199 @@
+"""A cache of web search results for the instructions step.
+
+Users ask the same instruction questions over and over ("How do I renew my driving licence?"), and each one
+sends the `answer_instruction_question` step off to search the web again. `CachedSearchTool` wraps the search
+tool under the same ID and keeps its results in a local SQLite cache for a day:
+
+- queries are normalised (case, punctuation, filler words and licence/license spellings), so trivially different
+  phrasings share an entry,
+- a query that isn't cached but is very similar to one that is (by the cosine similarity of their bags of words)
+  is served from the similar entry.
+
+The cache counts exact hits, near-duplicate hits and misses, and estimates the search time saved.
+
+    uv run search_cache.py list
+    uv run search_cache.py clear
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any
+
+from intent_classifier import cosine, feature_vector
+from portia import Tool, ToolRegistry, ToolRunContext
+
+DEFAULT_CACHE_PATH = ".portia/search_cache.sqlite"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Queries at least this similar to a cached query are answered from it.
+NEAR_DUPLICATE_SIMILARITY = 0.85
+
+WORD = re.compile(r"[a-z0-9]+")
+FILLER_WORDS = {
+    "a", "an", "the", "i", "me", "my", "do", "does", "can", "could", "should", "would", "how", "what", "is",
+    "are", "to", "for", "of", "on", "in", "please", "you", "uk", "gov",
+}  # fmt: skip
+SPELLINGS = {"license": "licence", "licenses": "licence", "licences": "licence", "cars": "car"}
+
+
+def normalise_query(query: str) -> str:
+    words = [SPELLINGS.get(word, word) for word in WORD.findall(query.lower())]
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    search_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.near_hits + self.misses
+        return (self.hits + self.near_hits) / lookups if lookups else 0.0
+
+    @property
+    def seconds_saved(self) -> float:
+        """Estimated from the mean time of the searches that did run"""
+        mean_search = self.search_seconds / self.misses if self.misses else 0.0
+        return (self.hits + self.near_hits) * mean_search
+
+    def __str__(self):
+        return (
+            f"Search cache: {self.hit_rate:.0%} hit rate ({self.hits} exact, {self.near_hits} similar, "
+            f"{self.misses} searched), ~{self.seconds_saved:.1f}s saved"
+        )
+
+
+class SearchCache:
+    """Search results stored in SQLite by normalised query, with a TTL"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stats = SearchCacheStats()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS searches (
+                    normalised_query TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation keeps the cache safe to use from any thread.
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def entries(self) -> list[sqlite3.Row]:
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT * FROM searches WHERE stored_at >= ? ORDER BY stored_at",
+                (time.time() - self.ttl_seconds,),
+            ).fetchall()
+
+    def get(self, query: str) -> Any | None:
+        normalised = normalise_query(query)
+        entries = self.entries()
+        for entry in entries:
+            if entry["normalised_query"] == normalised:
+                self.stats.hits += 1
+                return json.loads(entry["result"])
+
+        vector = feature_vector(normalised)
+        best, similarity = None, 0.0
+        for entry in entries:
+            entry_similarity = cosine(vector, feature_vector(entry["normalised_query"]))
+            if entry_similarity > similarity:
+                best, similarity = entry, entry_similarity
+        if best is not None and similarity >= NEAR_DUPLICATE_SIMILARITY:
+            self.stats.near_hits += 1
+            return json.loads(best["result"])
+
+        self.stats.misses += 1
+        return None
+
+    def put(self, query: str, result: Any, search_seconds: float) -> None:
+        self.stats.search_seconds += search_seconds
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+                (normalise_query(query), query, json.dumps(result, default=str), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM searches WHERE stored_at < ?", (time.time() - self.ttl_seconds,)
+            )
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM searches")
+
+
+search_cache = SearchCache()
+_lock = threading.Lock()
+
+
+class CachedSearchTool(Tool[Any]):
+    """Wraps the search tool so that repeated and near-duplicate searches are answered from the SearchCache"""
+
+    search_tool: Tool
+
+    @classmethod
+    def wrap(cls, search_tool: Tool) -> "CachedSearchTool":
+        """Create a wrapper that presents exactly the same interface as the wrapped tool"""
+        return cls(
+            id=search_tool.id,
+            name=search_tool.name,
+            description=search_tool.description,
+            args_schema=search_tool.args_schema,
+            output_schema=search_tool.output_schema,
+            search_tool=search_tool,
+        )
+
+    def run(self, ctx: ToolRunContext, **kwargs: Any) -> Any:
+        query = " ".join(str(value) for value in kwargs.values())
+        with _lock:
+            cached = search_cache.get(query)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        result = self.search_tool.run(ctx, **kwargs)
+        with _lock:
+            search_cache.put(query, result, time.perf_counter() - start)
+        return result
+
+
+def with_search_cache(tools: ToolRegistry, tool_id: str = "search_tool") -> ToolRegistry:
+    """Replace the search tool in the registry with its caching wrapper"""
+    tools.with_tool(CachedSearchTool.wrap(tools.get_tool(tool_id)), overwrite=True)
+    return tools
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cache-path", type=str, default=DEFAULT_CACHE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the cached searches.")
+    subparsers.add_parser("clear", help="Remove every cached search.")
+
+    args = parser.parse_args()
+    cache = SearchCache(args.cache_path)
+    if args.command == "list":
+        for entry in cache.entries():
+            print(f"{time.ctime(entry['stored_at'])}  {entry['query']}")
+    else:
+        cache.clear()
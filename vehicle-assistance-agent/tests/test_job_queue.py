@@ -0,0 +1,111 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from collections import Counter
+from pathlib import Path
+
+# Add the parent directory to the path to import the job queue module
+sys.path.append(str(Path(__file__).parent.parent))
+import job_queue
+from job_queue import DONE, FAILED, RUNNING, JobQueue, WorkerPool
+
+
+class TestJobQueueLeases(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmpdir.name, "jobs.sqlite"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_two_pools_process_each_job_once(self):
+        """Two pools sharing a queue run every job exactly once, even when one starts mid-run."""
+        runs = Counter()
+
+        async def handler(payload):
+            runs[payload["n"]] += 1
+            await asyncio.sleep(0.01)
+            return f"done {payload['n']}"
+
+        references = self.queue.submit_many("demo", [{"n": i} for i in range(40)])
+
+        async def run_pools():
+            first = asyncio.create_task(WorkerPool(self.queue, {"demo": handler}, workers=3).run())
+            # Start the second pool while the first has jobs in flight, as a second app process would.
+            await asyncio.sleep(0.05)
+            second = asyncio.create_task(WorkerPool(self.queue, {"demo": handler}, workers=3).run())
+            deadline = time.monotonic() + 20
+            while self.queue.metrics()["done"] < len(references) and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            first.cancel()
+            second.cancel()
+            await asyncio.gather(first, second, return_exceptions=True)
+
+        asyncio.run(run_pools())
+
+        self.assertEqual([self.queue.status(r).status for r in references], [DONE] * len(references))
+        self.assertEqual(runs, Counter({i: 1 for i in range(40)}), "Every job should run exactly once")
+
+    def test_expired_lease_is_reclaimed(self):
+        """A job left running by a pool that stopped is claimed again once its lease expires."""
+        reference = self.queue.submit("demo", {})
+        self.assertEqual(self.queue.claim("stopped-pool").reference, reference)
+
+        self.assertIsNone(self.queue.claim("other-pool"), "A live lease shouldn't be claimed")
+        job = self.queue.claim("other-pool", lease_seconds=0)
+        self.assertEqual((job.reference, job.owner), (reference, "other-pool"))
+
+        self.assertFalse(self.queue.finish(reference, "stopped-pool", result="late"))
+        self.assertFalse(self.queue.heartbeat(reference, "stopped-pool"))
+        self.assertEqual(self.queue.status(reference).status, RUNNING)
+        self.assertTrue(self.queue.finish(reference, "other-pool", result="ok"))
+        self.assertEqual(self.queue.status(reference).result, "ok")
+
+    def test_job_without_heartbeat_is_reclaimed(self):
+        """A running job with no heartbeat recorded (e.g. from before leases) is reclaimed by its lease expiry."""
+        reference = self.queue.submit("demo", {})
+        with self.queue._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = NULL WHERE reference = ?",
+                (RUNNING, time.time() - 3600, reference),
+            )
+        self.assertEqual(self.queue.claim("other-pool").reference, reference)
+
+    def test_job_is_failed_after_max_attempts(self):
+        """A job whose workers keep stopping is marked failed once it has used up its attempts."""
+        reference = self.queue.submit("demo", {})
+        for attempt in range(1, 4):
+            job = self.queue.claim(f"pool-{attempt}", lease_seconds=0, max_attempts=3)
+            self.assertEqual((job.reference, job.attempts), (reference, attempt))
+
+        self.assertIsNone(self.queue.claim("pool-4", lease_seconds=0, max_attempts=3))
+        job = self.queue.status(reference)
+        self.assertEqual(job.status, FAILED)
+        self.assertIn("3 attempts", job.error)
+
+    def test_heartbeat_keeps_long_job(self):
+        """A running job whose pool keeps heartbeating isn't claimed by another pool."""
+        original = job_queue.HEARTBEAT_INTERVAL_SECONDS
+        job_queue.HEARTBEAT_INTERVAL_SECONDS = 0.05
+        self.addCleanup(setattr, job_queue, "HEARTBEAT_INTERVAL_SECONDS", original)
+        reference = self.queue.submit("demo", {})
+        pool = WorkerPool(self.queue, {"demo": lambda payload: asyncio.sleep(0.5, "ok")}, workers=1)
+
+        async def run_pool():
+            task = asyncio.create_task(pool.run())
+            await asyncio.sleep(0.3)
+            claimed = await asyncio.to_thread(self.queue.claim, "other-pool", 0.2)
+            await asyncio.sleep(0.4)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return claimed
+
+        self.assertIsNone(asyncio.run(run_pool()))
+        self.assertEqual(self.queue.status(reference).status, DONE)
+
+
+if __name__ == "__main__":
+    unittest.main()